@@ -0,0 +1,91 @@
+"""
+Measure the memory allocated and the time taken by a single evaluation.
+
+Compares building a new universe and evaluator for each evaluation against
+reusing the cached ones. For each, the peak number of newly allocated memory
+blocks (the allocation count) and bytes during a call are reported.
+
+What remains for reused evaluators is allocated by the tree-walking evaluation
+itself (e.g. Python frames, and the argument getters passed to the universe for
+`and`, `or` and function calls), so it depends on the expression, not on reuse.
+
+Usage: python -m benchmarks.bench_allocations [iterations]
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+import tracemalloc
+from typing import Callable
+
+from leval.extras.common_boolean_evaluator import CommonBooleanEvaluator
+
+EXPRESSION = "(loss < 0.5 and accuracy > 0.8) or max(epochs, 10) > 50"
+VALUES = {"loss": 0.25, "accuracy": 0.9, "epochs": 12}
+
+
+def count_peak_blocks(func: Callable[[], object]) -> int:
+    """
+    Count the peak number of blocks allocated during a call.
+
+    The number of allocated blocks is sampled on each (Python or C) function call
+    and return, so allocations freed between those aren't seen.
+    """
+    get_blocks = sys.getallocatedblocks
+    peak = 0
+
+    def sample(frame: object, event: str, arg: object) -> None:
+        nonlocal peak
+        peak = max(peak, get_blocks())
+
+    base = get_blocks()
+    sys.setprofile(sample)
+    func()
+    sys.setprofile(None)
+    return peak - base
+
+
+def measure_peak_bytes(func: Callable[[], object]) -> int:
+    tracemalloc.start()  # The peak is reset when starting.
+    base, _ = tracemalloc.get_traced_memory()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak - base
+
+
+def measure(name: str, func: Callable[[], object], iterations: int) -> None:
+    func()  # Warm up caches.
+    # Subtract what sampling itself takes, as measured for a call doing nothing.
+    overhead = min(count_peak_blocks(lambda: None) for _ in range(5))
+    peak_blocks = min(count_peak_blocks(func) for _ in range(5))
+    peak_bytes = measure_peak_bytes(func)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    duration = time.perf_counter() - start
+    print(
+        f"{name:<10} blocks={peak_blocks - overhead:>4}/call  "
+        f"peak={peak_bytes:>6,} bytes/call  "
+        f"{duration / iterations * 1e6:>8.2f} us/call",
+    )
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    cbe = CommonBooleanEvaluator()
+    tree = cbe.compile(EXPRESSION)
+
+    def fresh() -> object:
+        return cbe._make_evaluator(VALUES).evaluate_tree(tree)
+
+    def reused() -> object:
+        return cbe.evaluate_compiled(tree, VALUES)
+
+    measure("fresh", fresh, iterations)
+    measure("reused", reused, iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Measure how batch evaluation scales with the number of worker processes.
+
+Usage: python -m benchmarks.bench_batch [rows] [max_workers]
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+
+from leval.extras.batch import evaluate_batch
+
+EXPRESSION = "(loss < 0.5 and accuracy > 0.8) or max(epochs, 10) > 50 or tag == 'x'"
+
+
+def make_rows(n: int) -> list[dict]:
+    return [
+        {
+            "loss": (i % 100) / 100,
+            "accuracy": (i % 37) / 37,
+            "epochs": i % 60,
+            "tag": "xyz"[i % 3],
+        }
+        for i in range(n)
+    ]
+
+
+def main() -> None:
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+    rows = make_rows(n_rows)
+    baseline = None
+    workers = 1
+    while workers <= max_workers:
+        start = time.perf_counter()
+        results = evaluate_batch(EXPRESSION, rows, workers=workers, chunk_size=2000)
+        duration = time.perf_counter() - start
+        assert len(results) == n_rows
+        baseline = baseline or duration
+        print(
+            f"workers={workers:<3} {n_rows / duration:>12,.0f} rows/s  "
+            f"speedup={baseline / duration:.2f}x",
+        )
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
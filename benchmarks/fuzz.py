@@ -0,0 +1,176 @@
+"""
+A harness for finding hostile expressions that take superlinear time to process.
+
+Each seed in `fuzz_corpus.jsonl` describes a family of expressions: `prefix`,
+`repeat` n times, `middle`, `close` n times, then `suffix`. Expressions are built
+from the seeds at growing sizes, the time taken by each stage (rewriting, parsing
+and evaluating; each including the previous ones) is measured, and stages whose
+time grows clearly faster than the size of the input are reported.
+
+Run `python -m benchmarks.fuzz_hostile` to look for superlinear growth; timings
+are too noisy to be checked by the test suite.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import time
+import warnings
+from pathlib import Path
+from typing import Callable, Iterable, NamedTuple
+
+from leval.evaluator import Evaluator
+from leval.rewriter_evaluator import RewriterEvaluator
+
+CORPUS_PATH = Path(__file__).with_name("fuzz_corpus.jsonl")
+
+
+class Seed(NamedTuple):
+    name: str
+    repeat: str
+    prefix: str = ""
+    middle: str = ""
+    close: str = ""
+    suffix: str = ""
+
+    def build(self, length: int) -> str:
+        """
+        Build an expression of (about) the given length from this seed.
+        """
+        fixed = len(self.prefix) + len(self.middle) + len(self.suffix)
+        n = max((length - fixed) // (len(self.repeat) + len(self.close)), 1)
+        return "".join(
+            (
+                self.prefix,
+                self.repeat * n,
+                self.middle,
+                self.close * n,
+                self.suffix,
+            ),
+        )
+
+
+class Measurement(NamedTuple):
+    seed: str
+    stage: str
+    length: int
+    seconds: float
+    #: Name of the exception class the stage raised, if any.
+    error: str | None
+
+
+def load_corpus(path: Path = CORPUS_PATH) -> list[Seed]:
+    """
+    Load the seeds from a JSON lines file.
+    """
+    with open(path, encoding="utf-8") as corpus_file:
+        return [Seed(**json.loads(line)) for line in corpus_file if line.strip()]
+
+
+def generate_seed(rng: random.Random, seeds: list[Seed]) -> Seed:
+    """
+    Generate a new seed by nesting one seed's repeated part within another's.
+    """
+    outer, inner = rng.sample(seeds, 2)
+    return Seed(
+        name=f"{outer.name}/{inner.name}",
+        prefix=outer.prefix + inner.prefix,
+        repeat=outer.repeat + inner.repeat,
+        middle=inner.middle + outer.middle,
+        close=inner.close + outer.close,
+        suffix=inner.suffix + outer.suffix,
+    )
+
+
+def _time(func: Callable[[], object], repeats: int) -> tuple[float, str | None]:
+    best = float("inf")
+    error = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        try:
+            with warnings.catch_warnings():
+                # Hostile inputs make the parser warn about e.g. invalid literals.
+                warnings.simplefilter("ignore", SyntaxWarning)
+                func()
+        except Exception as exc:  # noqa: BLE001
+            error = type(exc).__name__
+        best = min(best, time.perf_counter() - start)
+    return best, error
+
+
+def _get_stages(evaluator: Evaluator, expression: str) -> dict[str, Callable]:
+    stages: dict[str, Callable] = {}
+    if isinstance(evaluator, RewriterEvaluator):
+        stages["rewrite"] = lambda: evaluator.rewrite_expression(expression)
+
+    def parse() -> None:
+        evaluator.check_length(expression)
+        evaluator.check_depth(evaluator.parse(expression))
+
+    stages["parse"] = parse
+    stages["evaluate"] = lambda: evaluator.evaluate_expression(expression)
+    return stages
+
+
+def measure(
+    evaluator: Evaluator,
+    seeds: Iterable[Seed],
+    lengths: Iterable[int],
+    *,
+    repeats: int = 3,
+) -> list[Measurement]:
+    """
+    Measure the best time of each stage for expressions built from the seeds.
+    """
+    measurements = []
+    for seed in seeds:
+        for length in lengths:
+            expression = seed.build(length)
+            for stage, func in _get_stages(evaluator, expression).items():
+                seconds, error = _time(func, repeats)
+                measurements.append(
+                    Measurement(seed.name, stage, len(expression), seconds, error),
+                )
+    return measurements
+
+
+def find_superlinear(
+    measurements: list[Measurement],
+    *,
+    slack: float = 2.5,
+    min_seconds: float = 0.001,
+) -> list[str]:
+    """
+    Describe the stages whose time grows more than `slack` times faster than the input.
+
+    Times below `min_seconds` are considered noise, and treated as `min_seconds`.
+    """
+    by_stage: dict[tuple[str, str], list[Measurement]] = {}
+    for m in measurements:
+        by_stage.setdefault((m.seed, m.stage), []).append(m)
+    problems = []
+    for (seed, stage), series in by_stage.items():
+        series.sort(key=lambda m: m.length)
+        for small, big in zip(series, series[1:]):
+            growth = max(big.seconds, min_seconds) / max(small.seconds, min_seconds)
+            if growth > slack * big.length / small.length:
+                problems.append(
+                    f"{seed} ({stage}): {small.length} -> {big.length} chars took "
+                    f"{small.seconds:.4f} -> {big.seconds:.4f} s",
+                )
+    return problems
+
+
+def get_worst_times(
+    measurements: list[Measurement],
+) -> dict[tuple[str, int], Measurement]:
+    """
+    Find the slowest measurement for each stage and (rounded) input size.
+    """
+    worst: dict[tuple[str, int], Measurement] = {}
+    for m in measurements:
+        key = (m.stage, round(m.length, -3))
+        if key not in worst or m.seconds > worst[key].seconds:
+            worst[key] = m
+    return worst
@@ -0,0 +1,59 @@
+"""
+Look for hostile expressions whose processing time grows superlinearly.
+
+Measures the seed corpus and randomly generated seeds at growing sizes up to
+the default `max_length`, and prints the worst time per stage and size, and
+any superlinear growth found (in which case the exit status is 1).
+
+Usage: python -m benchmarks.fuzz_hostile [generated seeds] [random seed]
+"""
+
+from __future__ import annotations
+
+import random
+import sys
+
+from benchmarks.fuzz import (
+    find_superlinear,
+    generate_seed,
+    get_worst_times,
+    load_corpus,
+    measure,
+)
+from leval.extras.common_boolean_evaluator import CommonBooleanEvaluator
+from leval.iterative_evaluator import IterativeEvaluator
+from leval.universe.simple import SimpleUniverse
+
+LENGTHS = (1000, 4000, 16000, 64000, 99000)
+VALUES = {"x": True, "a": 1, "b": 1, ("a", "b"): 1}
+
+
+def main() -> None:
+    n_generated = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    rng = random.Random(int(sys.argv[2]) if len(sys.argv) > 2 else None)
+    corpus = load_corpus()
+    seeds = corpus + [generate_seed(rng, corpus) for _ in range(n_generated)]
+    evaluators = {
+        "common": CommonBooleanEvaluator()._make_evaluator(VALUES),
+        "iterative": IterativeEvaluator(
+            SimpleUniverse(functions={"f": lambda *args: 1}, values=VALUES),
+            max_depth=1_000_000,
+        ),
+    }
+    problems = []
+    for name, evaluator in evaluators.items():
+        measurements = measure(evaluator, seeds, LENGTHS)
+        print(f"{name}:")
+        for (stage, length), m in sorted(get_worst_times(measurements).items()):
+            print(
+                f"  {stage:<9} {length:>7} chars  {m.seconds:8.4f} s  "
+                f"{m.seed} ({m.error or 'ok'})",
+            )
+        problems.extend(f"{name}: {p}" for p in find_superlinear(measurements))
+    for problem in problems:
+        print(f"SUPERLINEAR {problem}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Canonicalization of expression trees, and interning of compiled expressions.
+"""
+
+from __future__ import annotations
+
+import ast
+import threading
+from typing import NamedTuple
+
+from leval.evaluator import Evaluator
+from leval.excs import InvalidAttribute
+from leval.memo import CacheStats, LRUCache
+from leval.nodes import FrozenValue
+from leval.utils import expand_name
+
+
+def canonical_key(tree: ast.AST) -> str:
+    """
+    Get a string that is equal for structurally equal trees.
+    """
+    return ast.dump(tree)
+
+
+def _is_lookup_or_constant(node: ast.AST) -> bool:
+    if isinstance(node, (ast.Constant, ast.Name)):
+        return True
+    if isinstance(node, ast.Attribute):
+        try:
+            expand_name(node)
+        except InvalidAttribute:
+            return False
+        return True
+    return False
+
+
+class Canonicalizer(ast.NodeTransformer):
+    """
+    Rewrite a tree into a normal form.
+
+    * Nested `and`s (and `or`s) are flattened: `a and (b and c)` -> `a and b and c`.
+    * Runs of adjacent `and`/`or` operands that can neither raise errors nor have
+      side effects are sorted. With loose `is` operators, these are comparisons
+      between names and constants with `is`/`is not`, constants, and `and`/`or`
+      operations consisting of them. Other operands keep their position, so errors
+      and short-circuiting happen exactly as they would have.
+
+    This assumes that `and`/`or` are evaluated with the usual short-circuiting
+    semantics of `EvaluationUniverse`.
+    """
+
+    def __init__(self, *, loose_is_operator: bool = True) -> None:  # noqa: D107
+        self.loose_is_operator = loose_is_operator
+
+    def _is_safe(self, node: ast.AST) -> bool:
+        if isinstance(node, (ast.Constant, FrozenValue)):
+            return True
+        if isinstance(node, ast.BoolOp):
+            return all(self._is_safe(value) for value in node.values)
+        if (
+            self.loose_is_operator
+            and isinstance(node, ast.Compare)
+            and len(node.ops) == 1
+            and isinstance(node.ops[0], (ast.Is, ast.IsNot))
+        ):
+            return _is_lookup_or_constant(node.left) and _is_lookup_or_constant(
+                node.comparators[0],
+            )
+        return False
+
+    def visit_BoolOp(self, node: ast.BoolOp) -> ast.AST:  # noqa: D102
+        self.generic_visit(node)
+        values: list[ast.expr] = []
+        for value in node.values:
+            if isinstance(value, ast.BoolOp) and type(value.op) is type(node.op):
+                values.extend(value.values)
+            else:
+                values.append(value)
+        node.values = []
+        run: list[ast.expr] = []
+        for value in values:
+            if self._is_safe(value):
+                run.append(value)
+                continue
+            node.values.extend(sorted(run, key=canonical_key))
+            node.values.append(value)
+            run = []
+        node.values.extend(sorted(run, key=canonical_key))
+        return node
+
+
+def canonicalize(tree: ast.AST, *, loose_is_operator: bool = True) -> ast.AST:
+    """
+    Rewrite the tree (in place) into its normal form; see `Canonicalizer`.
+    """
+    return Canonicalizer(loose_is_operator=loose_is_operator).visit(tree)
+
+
+class InternerStats(NamedTuple):
+    #: Statistics for the mapping of expression strings to canonical forms.
+    sources: CacheStats
+    #: Statistics for the compiled programs by canonical form.
+    programs: CacheStats
+
+
+class ProgramInterner:
+    def __init__(
+        self,
+        evaluator: Evaluator,
+        *,
+        maxsize: int = 1024,
+        max_sources: int | None = None,
+        verify: bool = False,
+    ) -> None:
+        """
+        Initialize an interner for compiled expressions.
+
+        Expressions that have the same canonical form share a single compiled tree.
+
+        :param evaluator: The evaluator to parse and compile expressions with.
+        :param maxsize: Maximum number of compiled trees to keep.
+        :param max_sources: Maximum number of expression strings to remember
+                            the canonical forms of; defaults to 4 * maxsize.
+        :param verify: Whether to verify new programs by evaluating them with the
+                       evaluator (whose universe should then be a verifier universe).
+        """
+        self.evaluator = evaluator
+        self.verify = verify
+        # The evaluator keeps per-evaluation state (e.g. its depth) while verifying
+        # or folding constants, so it can only compile one expression at a time.
+        self._lock = threading.Lock()
+        self._sources = LRUCache(max_sources or maxsize * 4)
+        self._programs = LRUCache(maxsize)
+
+    def intern(self, expression: str) -> ast.AST:
+        """
+        Compile the expression, or return an already compiled equivalent tree.
+
+        The returned tree is shared, and must not be modified.
+        This can be called from several threads.
+        """
+        key = self._sources.get(expression)
+        if key is not None:
+            tree = self._programs.get(key)
+            if tree is not None:
+                return tree
+        with self._lock:
+            return self._compile(expression)
+
+    def _compile(self, expression: str) -> ast.AST:
+        evaluator = self.evaluator
+        evaluator.check_length(expression)
+        tree = evaluator.parse(expression)
+        evaluator.check_depth(tree)
+        tree = canonicalize(tree, loose_is_operator=evaluator.loose_is_operator)
+        key = canonical_key(tree)
+        self._sources.put(expression, key)
+        existing_tree = self._programs.get(key)
+        if existing_tree is not None:
+            return existing_tree
+        tree = evaluator.optimize(tree)
+        if self.verify:
+            evaluator.evaluate_tree(tree)
+        self._programs.put(key, tree)
+        return tree
+
+    def stats(self) -> InternerStats:  # noqa: D102
+        return InternerStats(
+            sources=self._sources.stats(),
+            programs=self._programs.stats(),
+        )
@@ -0,0 +1,489 @@
+"""
+Command-line interface for verifying, evaluating and benchmarking expressions.
+
+Expressions are read one per line (blank lines and lines starting with `#` are
+skipped), and values as JSON lines, one object per row; nested objects can be
+referred to with dotted names. Input is streamed, and output is written as JSON
+lines (or tab-separated text with `--format text`) as soon as it is ready.
+"""
+
+from __future__ import annotations
+
+import argparse
+import ast
+import json
+import sys
+import time
+from typing import IO, Any, Iterable, Iterator, NamedTuple
+
+from leval.evaluator import Evaluator
+from leval.extras.batch import chunked, map_chunks, verify_expression
+from leval.extras.common_boolean_evaluator import CommonBooleanEvaluator, ValuesDict
+from leval.simple import simple_eval
+from leval.universe.simple import SimpleUniverse
+from leval.universe.verifier import VerifierUniverse
+
+MODES = ("common", "simple")
+
+
+class Engine:
+    def __init__(self, mode: str = "common", *, max_depth: int | None = None) -> None:
+        """
+        Initialize the verification and evaluation machinery for a mode.
+
+        In the `common` mode, expressions are evaluated to booleans with
+        `CommonBooleanEvaluator`. In the `simple` mode, they are evaluated like
+        `simple_eval` does, with no functions, and the results are returned as is.
+
+        :param mode: One of `MODES`.
+        :param max_depth: Maximum expression depth; defaults to that of the mode.
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode {mode!r}")
+        self.mode = mode
+        self.common = CommonBooleanEvaluator()
+        if max_depth is not None:
+            self.common.max_depth = max_depth
+        else:
+            max_depth = Evaluator.default_max_depth
+        self.max_depth = max_depth
+
+    def verify(self, expression: str) -> None:
+        """
+        Verify the expression, raising an error if it is not valid.
+        """
+        if self.mode == "common":
+            self.common.verify(expression)
+        else:
+            simple_eval(expression, max_depth=self.max_depth, verify_only=True)
+
+    def report(self, expression: str) -> dict[str, Any]:
+        """
+        Verify the expression, returning a report (see `VerificationReport`).
+        """
+        return verify_expression(self.verify, expression)._asdict()
+
+    def compile(self, expression: str) -> ast.AST:
+        """
+        Verify and compile the expression for `evaluate`.
+        """
+        if self.mode == "common":
+            return self.common.compile(expression)
+        evaluator = Evaluator(VerifierUniverse(), max_depth=self.max_depth)
+        tree = evaluator.compile_expression(expression)
+        evaluator.evaluate_tree(tree)
+        return tree
+
+    def evaluate(self, tree: ast.AST, values: ValuesDict) -> Any:
+        """
+        Evaluate a compiled expression against the values.
+        """
+        if self.mode == "common":
+            return self.common.evaluate_compiled(tree, values)
+        universe = SimpleUniverse(functions={}, values=values)
+        return Evaluator(universe, max_depth=self.max_depth).evaluate_tree(tree)
+
+
+class LatencyStats(NamedTuple):
+    expression: str
+    #: Number of evaluations.
+    evaluations: int
+    #: Number of evaluations that raised an error.
+    errors: int
+    #: Latencies in microseconds.
+    mean_us: float
+    p50_us: float
+    p90_us: float
+    p99_us: float
+    max_us: float
+    #: Evaluations per second, on one core.
+    per_second: float
+
+
+def flatten_values(row: dict[str, Any]) -> ValuesDict:
+    """
+    Flatten nested objects of a JSON row to tuple keys (`a.b` is `("a", "b")`).
+    """
+    values: ValuesDict = {}
+    stack: list[tuple[tuple[str, ...], dict[str, Any]]] = [((), row)]
+    while stack:
+        prefix, mapping = stack.pop()
+        for key, value in mapping.items():
+            path = (*prefix, key)
+            if isinstance(value, dict):
+                stack.append((path, value))
+            else:
+                values[path if prefix else key] = value
+    return values
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """
+    Get the given percentile (by the nearest-rank method) of sorted values.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(int(-(-fraction * len(sorted_values) // 1)), 1)
+    return sorted_values[rank - 1]
+
+
+def read_expressions(lines: Iterable[str]) -> Iterator[str]:
+    """
+    Read expressions one per line, skipping blank lines and `#` comments.
+    """
+    for line in lines:
+        expression = line.strip()
+        if expression and not expression.startswith("#"):
+            yield expression
+
+
+def read_rows(lines: Iterable[str]) -> Iterator[ValuesDict]:
+    """
+    Read rows of values from JSON lines, flattening them with `flatten_values`.
+    """
+    for lineno, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            raise SystemExit(
+                f"error: invalid JSON on values line {lineno}: {exc}",
+            ) from None
+        if not isinstance(row, dict):
+            raise SystemExit(f"error: values line {lineno} is not a JSON object")
+        yield flatten_values(row)
+
+
+def _to_json(value: Any) -> Any:
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=repr)
+    return repr(value)
+
+
+# State of a worker process; set up once by `_init_worker`.
+_worker_engine: Engine | None = None
+_worker_trees: list[tuple[str, ast.AST | Exception]] = []
+
+
+def _compile_all(
+    engine: Engine,
+    expressions: list[str],
+) -> list[tuple[str, ast.AST | Exception]]:
+    compiled: list[tuple[str, ast.AST | Exception]] = []
+    for expression in expressions:
+        try:
+            compiled.append((expression, engine.compile(expression)))
+        except Exception as exc:  # noqa: BLE001
+            compiled.append((expression, exc))
+    return compiled
+
+
+def _init_worker(engine: Engine, expressions: list[str]) -> None:
+    global _worker_engine, _worker_trees
+    _worker_engine = engine
+    _worker_trees = _compile_all(engine, expressions)
+
+
+def _verify_chunk(expressions: list[str]) -> list[dict[str, Any]]:
+    assert _worker_engine is not None
+    return [_worker_engine.report(expression) for expression in expressions]
+
+
+def _evaluate_rows(
+    engine: Engine,
+    trees: list[tuple[str, ast.AST | Exception]],
+    rows: list[tuple[int, ValuesDict]],
+) -> list[dict[str, Any]]:
+    results = []
+    for index, values in rows:
+        for expression, tree in trees:
+            result: dict[str, Any] = {"row": index, "expression": expression}
+            error: Exception | None = None
+            if isinstance(tree, Exception):
+                error = tree
+            else:
+                try:
+                    result["value"] = engine.evaluate(tree, values)
+                except Exception as exc:  # noqa: BLE001
+                    error = exc
+            if error is not None:
+                # The compile error is shared by all rows; it's not re-raised,
+                # so its traceback doesn't grow with each row.
+                result["error_class"] = type(error).__name__
+                result["error_message"] = str(error)
+            results.append(result)
+    return results
+
+
+def _evaluate_chunk(rows: list[tuple[int, ValuesDict]]) -> list[dict[str, Any]]:
+    assert _worker_engine is not None
+    return _evaluate_rows(_worker_engine, _worker_trees, rows)
+
+
+def _bench_expression(
+    engine: Engine,
+    expression: str,
+    rows: list[ValuesDict],
+    iterations: int,
+) -> LatencyStats:
+    latencies = []
+    errors = 0
+    try:
+        tree = engine.compile(expression)
+    except Exception:  # noqa: BLE001
+        tree = None
+    clock = time.perf_counter
+    for _ in range(iterations):
+        for values in rows:
+            start = clock()
+            try:
+                if tree is None:
+                    raise ValueError("Invalid expression")
+                engine.evaluate(tree, values)
+            except Exception:  # noqa: BLE001
+                errors += 1
+            latencies.append((clock() - start) * 1e6)
+    latencies.sort()
+    total = sum(latencies)
+    return LatencyStats(
+        expression=expression,
+        evaluations=len(latencies),
+        errors=errors,
+        mean_us=total / len(latencies) if latencies else 0.0,
+        p50_us=percentile(latencies, 0.5),
+        p90_us=percentile(latencies, 0.9),
+        p99_us=percentile(latencies, 0.99),
+        max_us=latencies[-1] if latencies else 0.0,
+        per_second=len(latencies) / total * 1e6 if total else 0.0,
+    )
+
+
+# Rows and iterations of a benchmark worker process; see `_init_bench_worker`.
+_worker_bench: tuple[list[ValuesDict], int] = ([], 0)
+
+
+def _init_bench_worker(engine: Engine, rows: list[ValuesDict], iterations: int) -> None:
+    global _worker_engine, _worker_bench
+    _worker_engine = engine
+    _worker_bench = (rows, iterations)
+
+
+def _bench_chunk(expressions: list[str]) -> list[LatencyStats]:
+    assert _worker_engine is not None
+    rows, iterations = _worker_bench
+    return [
+        _bench_expression(_worker_engine, expression, rows, iterations)
+        for expression in expressions
+    ]
+
+
+class _Output:
+    def __init__(self, stream: IO[str], output_format: str) -> None:
+        self.stream = stream
+        self.format = output_format
+
+    def write(self, record: dict[str, Any], text_fields: Iterable[str]) -> None:
+        if self.format == "text":
+            line = "\t".join(str(record.get(field, "")) for field in text_fields)
+        else:
+            line = json.dumps(record, default=_to_json, ensure_ascii=False)
+        self.stream.write(line + "\n")
+
+
+def _cmd_verify(args: argparse.Namespace, engine: Engine, output: _Output) -> int:
+    expressions = read_expressions(args.expressions)
+    reports: Iterable[dict[str, Any]]
+    if args.workers <= 1:
+        reports = (engine.report(expression) for expression in expressions)
+    else:
+        reports = map_chunks(
+            _verify_chunk,
+            chunked(expressions, args.chunk_size),
+            workers=args.workers,
+            initializer=_init_worker,
+            initargs=(engine, []),
+        )
+    n_invalid = 0
+    for report in reports:
+        n_invalid += not report["ok"]
+        output.write(report, ("ok", "expression", "error_class", "message"))
+    return 1 if n_invalid else 0
+
+
+def _get_expressions(args: argparse.Namespace) -> list[str]:
+    expressions = list(args.expression or ())
+    if args.expressions_file:
+        with open(args.expressions_file, encoding="utf-8") as expressions_file:
+            expressions.extend(read_expressions(expressions_file))
+    if not expressions:
+        raise SystemExit("error: no expressions given (use -e or -f)")
+    return expressions
+
+
+def _cmd_evaluate(args: argparse.Namespace, engine: Engine, output: _Output) -> int:
+    expressions = _get_expressions(args)
+    rows = enumerate(read_rows(args.values))
+    results: Iterable[dict[str, Any]]
+    if args.workers <= 1:
+        trees = _compile_all(engine, expressions)
+        results = (
+            result
+            for chunk in chunked(rows, args.chunk_size)
+            for result in _evaluate_rows(engine, trees, chunk)
+        )
+    else:
+        results = map_chunks(
+            _evaluate_chunk,
+            chunked(rows, args.chunk_size),
+            workers=args.workers,
+            initializer=_init_worker,
+            initargs=(engine, expressions),
+        )
+    fields = ("row", "expression", "value", "error_class", "error_message")
+    for result in results:
+        output.write(result, fields)
+    return 0
+
+
+def _cmd_bench(args: argparse.Namespace, engine: Engine, output: _Output) -> int:
+    expressions = _get_expressions(args)
+    rows = list(read_rows(args.values)) if args.values is not None else []
+    if args.max_rows:
+        rows = rows[: args.max_rows]
+    if not rows:
+        rows = [{}]
+    stats: Iterable[LatencyStats]
+    if args.workers <= 1:
+        stats = (
+            _bench_expression(engine, expression, rows, args.iterations)
+            for expression in expressions
+        )
+    else:
+        stats = map_chunks(
+            _bench_chunk,
+            chunked(expressions, 1),
+            workers=args.workers,
+            initializer=_init_bench_worker,
+            initargs=(engine, rows, args.iterations),
+        )
+    for stat in stats:
+        output.write(stat._asdict(), LatencyStats._fields)
+    return 0
+
+
+def _open_input(path: str) -> IO[str]:
+    if path == "-":
+        return sys.stdin
+    return open(path, encoding="utf-8")
+
+
+def build_parser() -> argparse.ArgumentParser:  # noqa: D103
+    parser = argparse.ArgumentParser(
+        prog="leval",
+        description="Verify, evaluate and benchmark leval expressions.",
+    )
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "--mode",
+        choices=MODES,
+        default="common",
+        help="evaluate with CommonBooleanEvaluator (default), or like simple_eval",
+    )
+    common.add_argument("--max-depth", type=int, help="maximum expression depth")
+    common.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="number of worker processes (default: 1)",
+    )
+    common.add_argument(
+        "--chunk-size",
+        type=int,
+        default=1000,
+        help="number of items sent to a worker at a time",
+    )
+    common.add_argument(
+        "--format",
+        choices=("jsonl", "text"),
+        default="jsonl",
+        help="output format (default: jsonl)",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    verify = subparsers.add_parser(
+        "verify",
+        parents=[common],
+        help="verify a file of expressions; exits with 1 if any are invalid",
+    )
+    verify.add_argument(
+        "expressions",
+        nargs="?",
+        default="-",
+        help="file of expressions, one per line (default: stdin)",
+    )
+    verify.set_defaults(func=_cmd_verify)
+
+    for name, func, help_text in (
+        ("evaluate", _cmd_evaluate, "evaluate expressions against rows of values"),
+        ("bench", _cmd_bench, "measure the evaluation latency of expressions"),
+    ):
+        subparser = subparsers.add_parser(name, parents=[common], help=help_text)
+        subparser.add_argument(
+            "-e",
+            "--expression",
+            action="append",
+            help="an expression (may be repeated)",
+        )
+        subparser.add_argument(
+            "-f",
+            "--expressions-file",
+            help="file of expressions, one per line",
+        )
+        if name == "bench":
+            subparser.add_argument(
+                "values",
+                nargs="?",
+                help="JSON lines file of values, one object per row "
+                "(default: a single empty row; use - for stdin)",
+            )
+            subparser.add_argument(
+                "--iterations",
+                type=int,
+                default=100,
+                help="number of times to evaluate each row (default: 100)",
+            )
+            subparser.add_argument(
+                "--max-rows",
+                type=int,
+                default=0,
+                help="maximum number of rows to use (default: all)",
+            )
+        else:
+            subparser.add_argument(
+                "values",
+                nargs="?",
+                default="-",
+                help="JSON lines file of values, one object per row (default: stdin)",
+            )
+        subparser.set_defaults(func=func)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    Run the command line interface; returns the exit code.
+    """
+    args = build_parser().parse_args(argv)
+    engine = Engine(args.mode, max_depth=args.max_depth)
+    output = _Output(sys.stdout, args.format)
+    for attr in ("expressions", "values"):
+        if getattr(args, attr, None) is not None:
+            setattr(args, attr, _open_input(getattr(args, attr)))
+    try:
+        return args.func(args, engine, output)
+    finally:
+        for attr in ("expressions", "values"):
+            stream = getattr(args, attr, None)
+            if stream is not None and stream is not sys.stdin:
+                stream.close()
@@ -0,0 +1,262 @@
+"""
+Compilation of boolean expressions into reduced ordered binary decision diagrams.
+"""
+
+from __future__ import annotations
+
+import ast
+from typing import Dict, Tuple
+
+from leval.evaluator import Evaluator
+from leval.excs import TooComplex
+from leval.nodes import FrozenValue, SharedSubexpression
+
+# The terminal nodes of every diagram.
+FALSE = 0
+TRUE = 1
+
+# A non-terminal node: the index of the atom to test,
+# and the nodes to continue from when it is falsy and truthy.
+DiagramNode = Tuple[int, int, int]
+_OpCache = Dict[Tuple[str, int, int], int]
+
+
+class DecisionDiagram:
+    """
+    A reduced ordered binary decision diagram for a boolean expression.
+
+    The `and`/`or`/`not` structure of the expression is compiled away;
+    what remains are the atoms (comparisons, lookups, calls, ...) whose
+    truth values the expression depends on. Evaluation walks from the root,
+    evaluating one atom per step, so each atom is evaluated at most once,
+    and atoms whose values can't affect the result are never evaluated.
+
+    Atoms are ordered by their first appearance in the expression.
+    """
+
+    def __init__(
+        self,
+        tree: ast.AST,
+        atoms: list[ast.expr],
+        atom_depths: list[int],
+        nodes: list[DiagramNode],
+        root: int,
+    ) -> None:
+        """
+        Initialize a diagram; see `compile_decision_diagram`.
+
+        :param tree: The expression tree the diagram was compiled from.
+        :param atoms: The atomic subtrees, in diagram order.
+        :param atom_depths: The depths of the atoms within `tree`.
+        :param nodes: The nodes of the diagram; the first two are the terminals.
+        :param root: The index of the root node.
+        """
+        self.tree = tree
+        self.atoms = atoms
+        self.atom_depths = atom_depths
+        self.nodes = nodes
+        self.root = root
+
+    @property
+    def size(self) -> int:
+        """
+        The number of non-terminal nodes reachable from the root.
+        """
+        seen = set()
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node > TRUE and node not in seen:
+                seen.add(node)
+                stack.extend(self.nodes[node][1:])
+        return len(seen)
+
+    @property
+    def is_constant(self) -> bool:
+        """
+        Whether the result does not depend on any atom (e.g. `a or not a`).
+        """
+        return self.root <= TRUE
+
+    def evaluate(self, evaluator: Evaluator) -> bool:
+        """
+        Evaluate the diagram, using the evaluator (and its universe) for the atoms.
+
+        The evaluator should have the configuration the diagram was compiled with.
+        """
+        evaluator.begin_evaluation()
+        nodes, atoms, atom_depths = self.nodes, self.atoms, self.atom_depths
+        node = self.root
+        while node > TRUE:
+            atom, low, high = nodes[node]
+            evaluator.depth = atom_depths[atom]
+            node = high if evaluator.visit(atoms[atom]) else low
+        return node == TRUE
+
+
+class _DiagramBuilder:
+    def __init__(
+        self,
+        evaluator: Evaluator,
+        tree: ast.AST,
+        *,
+        max_nodes: int,
+    ) -> None:
+        self.evaluator = evaluator
+        self.tree = tree
+        self.max_nodes = max_nodes
+        self.atoms: list[ast.expr] = []
+        self.atom_depths: list[int] = []
+        self.atom_indices: dict[str, int] = {}
+        self.nodes: list[DiagramNode] = [(-1, FALSE, FALSE), (-1, TRUE, TRUE)]
+        self.unique: dict[DiagramNode, int] = {}
+        self.op_cache: _OpCache = {}
+
+    def build(self) -> DecisionDiagram:
+        try:
+            root = self.visit(self.tree, 0)
+        except RecursionError:
+            raise TooComplex("Expression has too many atoms") from None
+        return DecisionDiagram(
+            tree=self.tree,
+            atoms=self.atoms,
+            atom_depths=self.atom_depths,
+            nodes=self.nodes,
+            root=root,
+        )
+
+    def visit(self, node: ast.AST, depth: int) -> int:
+        if isinstance(node, SharedSubexpression):
+            # The wrapper doesn't count towards the depth; see `Evaluator`.
+            return self.visit(node.value, depth)
+        if isinstance(node, ast.Expression):
+            return self.visit(node.body, depth + 1)
+        if isinstance(node, ast.BoolOp) and isinstance(node.op, (ast.And, ast.Or)):
+            op = "and" if isinstance(node.op, ast.And) else "or"
+            result = self.visit(node.values[0], depth + 1)
+            for value in node.values[1:]:
+                result = self.apply(op, result, self.visit(value, depth + 1))
+            return result
+        if (
+            isinstance(node, ast.UnaryOp)
+            and isinstance(node.op, ast.Not)
+            # With loose `not`s, `not x` is true if `x` can't be evaluated,
+            # so it isn't the negation of `x`; it is an atom of its own.
+            and (
+                not self.evaluator.loose_not_operator
+                or isinstance(node.operand, (ast.Constant, FrozenValue))
+            )
+        ):
+            return self.negate(self.visit(node.operand, depth + 1))
+        if isinstance(node, (ast.Constant, FrozenValue)):
+            return TRUE if node.value else FALSE
+        assert isinstance(node, ast.expr)
+        return self.make_node(self.get_atom(node, depth), FALSE, TRUE)
+
+    def get_atom(self, node: ast.expr, depth: int) -> int:
+        """
+        Get the index of the atom for the node, registering it if it's new.
+
+        Structurally equal atoms are the same atom, unless they call impure
+        functions, in which case every occurrence is an atom of its own.
+        """
+        key = ast.dump(node)
+        if not self._is_pure(node):
+            key = f"{key}#{len(self.atoms)}"
+        index = self.atom_indices.get(key)
+        if index is None:
+            index = self.atom_indices[key] = len(self.atoms)
+            self.atoms.append(node)
+            self.atom_depths.append(depth)
+        else:
+            self.atom_depths[index] = min(self.atom_depths[index], depth)
+        return index
+
+    def _is_pure(self, node: ast.AST) -> bool:
+        is_pure_function = self.evaluator.universe.is_pure_function
+        return all(
+            isinstance(kid.func, ast.Name) and is_pure_function(kid.func.id)
+            for kid in ast.walk(node)
+            if isinstance(kid, ast.Call)
+        )
+
+    def make_node(self, atom: int, low: int, high: int) -> int:
+        if low == high:
+            return low
+        key = (atom, low, high)
+        node = self.unique.get(key)
+        if node is None:
+            if len(self.nodes) >= self.max_nodes:
+                raise TooComplex(
+                    f"Decision diagram is too large (> {self.max_nodes} nodes)",
+                )
+            node = self.unique[key] = len(self.nodes)
+            self.nodes.append(key)
+        return node
+
+    def negate(self, node: int) -> int:
+        if node <= TRUE:
+            return TRUE - node
+        key = ("not", node, node)
+        result = self.op_cache.get(key)
+        if result is None:
+            atom, low, high = self.nodes[node]
+            result = self.make_node(atom, self.negate(low), self.negate(high))
+            self.op_cache[key] = result
+        return result
+
+    def apply(self, op: str, left: int, right: int) -> int:
+        # The value that decides an `and` (false) or an `or` (true) on its own.
+        absorbing = FALSE if op == "and" else TRUE
+        if left == absorbing or right == absorbing:
+            return absorbing
+        if left == TRUE - absorbing or left == right:
+            return right
+        if right == TRUE - absorbing:
+            return left
+        key = (op, min(left, right), max(left, right))
+        result = self.op_cache.get(key)
+        if result is None:
+            left_atom, left_low, left_high = self.nodes[left]
+            right_atom, right_low, right_high = self.nodes[right]
+            atom = min(left_atom, right_atom)
+            if left_atom != atom:
+                left_low = left_high = left
+            if right_atom != atom:
+                right_low = right_high = right
+            result = self.make_node(
+                atom,
+                self.apply(op, left_low, right_low),
+                self.apply(op, left_high, right_high),
+            )
+            self.op_cache[key] = result
+        return result
+
+
+def compile_decision_diagram(
+    evaluator: Evaluator,
+    expression: str | ast.AST,
+    *,
+    max_nodes: int = 10_000,
+) -> DecisionDiagram:
+    """
+    Compile a boolean expression into a decision diagram.
+
+    The result of evaluating the diagram is the truth value of the expression,
+    assuming the usual short-circuiting semantics of `and` and `or`.
+    As atoms are evaluated in diagram order and only when needed,
+    an expression whose evaluation would fail (e.g. due to a missing value)
+    may evaluate successfully as a diagram, and vice versa.
+
+    :param evaluator: The evaluator to compile (and later evaluate) the expression
+                      with. With loose `not` operators, negations of non-constant
+                      subexpressions are atoms instead of being compiled away.
+    :param expression: The expression, or a tree compiled with `compile_expression`.
+    :param max_nodes: Maximum number of nodes in the diagram; `TooComplex` is raised
+                      if the expression would need more.
+    """
+    if isinstance(expression, str):
+        tree = evaluator.compile_expression(expression)
+    else:
+        tree = expression
+    return _DiagramBuilder(evaluator, tree, max_nodes=max_nodes).build()
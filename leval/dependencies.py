@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from typing import Any, NamedTuple, Tuple, Union
+
+from leval.evaluator import Evaluator
+from leval.universe.dependency import DependencyRecordingUniverse
+
+Name = Union[str, Tuple[str, ...]]
+
+
+class Dependencies(NamedTuple):
+    #: Plain (string) and dotted (tuple of strings) value names.
+    names: frozenset[Name]
+    #: Names of called functions.
+    functions: frozenset[str]
+
+
+def get_dependencies(
+    expression: str,
+    *,
+    evaluator_class: type[Evaluator] = Evaluator,
+    **evaluator_kwargs: Any,
+) -> Dependencies:
+    """
+    Find the values and functions the given expression refers to.
+
+    The expression is walked like verification would walk it,
+    so it is also verified in the process.
+
+    :param expression: The expression to analyze.
+    :param evaluator_class: Evaluator class to parse and walk the expression with.
+    :param evaluator_kwargs: Additional arguments for the evaluator (e.g. limits).
+    """
+    universe = DependencyRecordingUniverse()
+    evaluator_class(universe, **evaluator_kwargs).evaluate_expression(expression)
+    return Dependencies(
+        names=frozenset(universe.names),
+        functions=frozenset(universe.functions),
+    )
@@ -3,7 +3,7 @@ from __future__ import annotations
 import ast
 import time
 from functools import partial
-from typing import Any, Iterable
+from typing import Any, Callable, Iterable, Mapping
 
 from leval.excs import (
     InvalidConstant,
@@ -13,7 +13,10 @@ from leval.excs import (
     Timeout,
     TooComplex,
 )
-from leval.universe.base import BaseEvaluationUniverse
+from leval.nodes import FrozenValue
+from leval.optimize import hoist_constant_containers, share_common_subexpressions
+from leval.specialize import fold_constants, specialize_tree
+from leval.universe.base import MISSING, BaseEvaluationUniverse
 from leval.utils import expand_name
 
 try:
@@ -52,6 +55,7 @@ class Evaluator(ast.NodeTransformer):
     default_allowed_container_types: Iterable[type] = DEFAULT_ALLOWED_CONTAINER_TYPES
     default_max_depth = 10
     default_max_length = 100_000
+    default_max_folded_size = 4096
 
     def __init__(
         self,
@@ -64,18 +68,39 @@ class Evaluator(ast.NodeTransformer):
         allowed_container_types: Iterable[type] | None = None,
         loose_is_operator: bool = True,
         loose_not_operator: bool = True,
+        fold_constants: bool = False,
+        max_folded_size: int | None = None,
+        share_subexpressions: bool = False,
     ):
         """
         Initialize an evaluator with access to the given evaluation universe.
+
+        If `fold_constants` is set, `compile_expression` evaluates subtrees that
+        only consist of constants ahead of time, as long as the results' estimated
+        sizes don't exceed `max_folded_size` bytes.
+
+        If `share_subexpressions` is set, `compile_expression` arranges for
+        structurally identical subtrees to be computed only once per evaluation,
+        unless they call functions the universe doesn't consider pure.
         """
         self.depth: int | None = None
         self.start_time: float | None = None
+        # Results of `SharedSubexpression`s during the current evaluation.
+        self.shared_results: dict[int, Any] = {}
+        # The `visit_*` methods (unbound) by node type; see `visit`.
+        self._visitors: dict[type, Callable[[Any, Any], Any] | None] = {}
         self.universe = universe
         self.max_depth = _default_if_none(max_depth, self.default_max_depth)
         self.max_time = float(max_time or 0)
         self.max_length = _default_if_none(max_length, self.default_max_length)
         self.loose_is_operator = bool(loose_is_operator)
         self.loose_not_operator = bool(loose_not_operator)
+        self.fold_constants = bool(fold_constants)
+        self.share_subexpressions = bool(share_subexpressions)
+        self.max_folded_size = _default_if_none(
+            max_folded_size,
+            self.default_max_folded_size,
+        )
         self.allowed_constant_types = frozenset(
             _default_if_none(
                 allowed_constant_types,
@@ -93,45 +118,159 @@ class Evaluator(ast.NodeTransformer):
         """
         Evaluate the given expression and return the ultimate result.
         """
+        self.check_length(expression)
+        return self.evaluate_tree(self.parse(expression))
+
+    def compile_expression(self, expression: str) -> ast.AST:
+        """
+        Parse and optimize the given expression for repeated evaluation.
+
+        The returned tree can be evaluated with `evaluate_tree`
+        (also by other evaluators with the same configuration).
+        """
+        self.check_length(expression)
+        tree = self.parse(expression)
+        self.check_depth(tree)
+        return self.optimize(tree)
+
+    def specialize(
+        self,
+        expression: str,
+        known_values: Mapping[str | tuple, Any],
+    ) -> ast.AST:
+        """
+        Compile the expression, folding everything that only depends on known values.
+
+        Subtrees that only refer to `known_values` and pure functions are evaluated
+        ahead of time, and `and`/`or` operations are simplified where their constant
+        operands allow. The residual tree can be evaluated with `evaluate_tree`
+        against the rest of the values; if everything was known, its body is a
+        constant.
+        """
+        return specialize_tree(self, self.compile_expression(expression), known_values)
+
+    def evaluate_tree(self, tree: ast.AST) -> Any:
+        """
+        Evaluate an already parsed (or compiled) expression tree.
+        """
+        self.begin_evaluation()
+        return self.visit(tree)
+
+    def begin_evaluation(self) -> None:
+        """
+        Reset the per-evaluation state before evaluating a tree.
+        """
+        self.depth = 0
+        self.start_time = time.time()
+        if self.shared_results:
+            self.shared_results.clear()
+        self.universe.begin_evaluation()
+
+    def check_length(self, expression: str) -> None:
+        """
+        Raise if the given expression is too long to be parsed.
+        """
         if self.max_length and len(expression) > self.max_length:
             raise TooComplex(
                 f"Expression is too long ({len(expression)} > {self.max_length})",
             )
-        self.depth = 0
-        self.start_time = time.time()
-        return self.visit(self.parse(expression))
+
+    def check_depth(self, tree: ast.AST) -> None:
+        """
+        Raise if the tree is deeper than evaluation would allow.
+        """
+        stack = [(tree, 0)]
+        while stack:
+            node, depth = stack.pop()
+            if depth >= self.max_depth:
+                raise TooComplex(
+                    f"Expression is too complex ({depth} > {self.max_depth})",
+                    node=node,
+                )
+            stack.extend(
+                (kid, depth + 1)
+                for kid in ast.iter_child_nodes(node)
+                if isinstance(kid, ast.expr)
+            )
+
+    def optimize(self, tree: ast.AST) -> ast.AST:
+        """
+        Run optimization passes on a parsed tree.
+        """
+        if self.fold_constants:
+            tree = fold_constants(self, tree, max_size=self.max_folded_size)
+        tree = hoist_constant_containers(
+            tree,
+            allowed_constant_types=self.allowed_constant_types,
+        )
+        if self.share_subexpressions:
+            tree = share_common_subexpressions(
+                tree,
+                is_pure_function=self.universe.is_pure_function,
+            )
+        return tree
 
     def parse(self, expression: str) -> ast.AST:
         """
         Parse the given expression and return the AST.
         """
-        return ast.parse(expression, "<expression>", "eval")
+        try:
+            return ast.parse(expression, "<expression>", "eval")
+        except (RecursionError, MemoryError):
+            # The parser gives up on deeply nested expressions this way.
+            raise TooComplex("Expression is too deeply nested to parse") from None
 
     def visit(self, node):  # noqa: D102
+        self.check_limits(node)
+        node_type = type(node)
+        try:
+            visitor = self._visitors[node_type]
+        except KeyError:
+            # Looked up only once per node type, so no method name string or bound
+            # method needs to be allocated for each node visited.
+            visitor = getattr(type(self), f"visit_{node_type.__name__}", None)
+            self._visitors[node_type] = visitor
+        if not visitor:
+            raise InvalidNode(
+                f"Operation {node_type.__name__} is not allowed",
+                node=node,
+            )
+        try:
+            self.depth += 1
+            return visitor(self, node)
+        finally:
+            self.depth -= 1
+
+    def check_limits(self, node: ast.AST) -> None:
+        """
+        Raise if visiting the given node would exceed the depth or time limits.
+        """
         if self.depth >= self.max_depth:
             raise TooComplex(
                 f"Expression is too complex ({self.depth} > {self.max_depth})",
                 node=node,
             )
         if self.max_time > 0:
+            assert self.start_time is not None
             elapsed_time = time.time() - self.start_time
             if elapsed_time > self.max_time:
                 raise Timeout(
                     f"Expression reached time limit {self.max_time}",
                     node=node,
                 )
-        node_name = node.__class__.__name__
-        method = f"visit_{node_name}"
-        visitor = getattr(self, method, None)
-        if not visitor:
-            raise InvalidNode(f"Operation {node_name} is not allowed", node=node)
-        try:
-            self.depth += 1
-            return visitor(node)
-        finally:
-            self.depth -= 1
+
+    def _get_value_or_missing(self, node: ast.Name | ast.Attribute) -> Any:
+        # Like visiting the node, but returns `MISSING` instead of raising
+        # `NoSuchValue`, since raising is expensive when values are often missing.
+        self.check_limits(node)
+        if isinstance(node, ast.Name):
+            return self.universe.get_value_or_missing(node.id)
+        return self.universe.get_value_or_missing(expand_name(node))
 
     def _visit_or_none(self, value: ast.AST) -> Any:
+        if isinstance(value, (ast.Name, ast.Attribute)):
+            value = self._get_value_or_missing(value)
+            return None if value is MISSING else value
         try:
             return self.visit(value)
         except NoSuchValue:
@@ -194,12 +333,22 @@ class Evaluator(ast.NodeTransformer):
         return self.universe.evaluate_bool_op(node.op, value_getters)
 
     def visit_UnaryOp(self, node):  # noqa: D102
+        loose_not = self.loose_not_operator and isinstance(node.op, ast.Not)
+        if loose_not and isinstance(node.operand, (ast.Name, ast.Attribute)):
+            operand = self._get_value_or_missing(node.operand)
+            return True if operand is MISSING else not operand
         try:
             operand = self.visit(node.operand)
         except NoSuchValue:
-            if self.loose_not_operator and isinstance(node.op, ast.Not):
+            if loose_not:
                 return True
             raise
+        return self.apply_unary_op(node, operand)
+
+    def apply_unary_op(self, node: ast.UnaryOp, operand: Any) -> Any:
+        """
+        Apply the operator of the given unary operation node to an evaluated operand.
+        """
         if isinstance(node.op, ast.UAdd):
             return +operand
         if isinstance(node.op, ast.USub):
@@ -214,12 +363,38 @@ class Evaluator(ast.NodeTransformer):
     def visit_Set(self, node):  # noqa: D102
         if set not in self.allowed_container_types:
             raise InvalidOperation("Set construction not allowed", node=node)
-        return {self.visit(n) for n in node.elts}
+        return self.universe.build_container(set, [self.visit(n) for n in node.elts])
 
     def visit_Tuple(self, node):  # noqa: D102
         if tuple not in self.allowed_container_types:
             raise InvalidOperation("Tuple construction not allowed", node=node)
-        return tuple(self.visit(n) for n in node.elts)
+        return self.universe.build_container(
+            tuple,
+            [self.visit(n) for n in node.elts],
+        )
+
+    def visit_FrozenValue(self, node: FrozenValue):  # noqa: D102
+        for container_type in node.container_types:
+            if container_type not in self.allowed_container_types:
+                raise InvalidOperation(
+                    f"{container_type.__name__.capitalize()} construction not allowed",
+                    node=node,
+                )
+        return node.value
+
+    def visit_SharedSubexpression(self, node):  # noqa: D102
+        results = self.shared_results
+        try:
+            return results[node.key]
+        except KeyError:
+            pass
+        self.depth -= 1  # The shared node itself doesn't count towards the depth.
+        try:
+            value = self.visit(node.value)
+        finally:
+            self.depth += 1
+        results[node.key] = value
+        return value
 
     def visit_Expression(self, node):  # noqa: D102
         return self.visit(node.body)
@@ -46,5 +46,13 @@ class TooComplex(EvaluatorError):
     pass
 
 
+class MemoryBudgetExceeded(TooComplex):
+    pass
+
+
 class Timeout(EvaluatorError, TimeoutError):
     pass
+
+
+class Untranslatable(InvalidOperation):
+    pass
@@ -0,0 +1,259 @@
+"""
+Evaluation and verification of many rows or expressions, optionally in parallel.
+"""
+
+from __future__ import annotations
+
+import ast
+import hashlib
+import itertools
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, MutableMapping, NamedTuple
+
+from leval.extras.common_boolean_evaluator import CommonBooleanEvaluator, ValuesDict
+
+
+class BatchResult(NamedTuple):
+    #: The result of the evaluation, or None if it failed.
+    value: bool | None
+    #: Name of the exception class if the evaluation failed.
+    error_class: str | None = None
+    #: Message of the exception if the evaluation failed.
+    error_message: str | None = None
+
+
+def _evaluate_row(
+    evaluator: CommonBooleanEvaluator,
+    tree: ast.AST,
+    values: ValuesDict,
+) -> BatchResult:
+    try:
+        return BatchResult(evaluator.evaluate_compiled(tree, values))
+    except Exception as exc:  # noqa: BLE001
+        return BatchResult(None, type(exc).__name__, str(exc))
+
+
+# State of a worker process; set up once by `_init_worker`.
+_worker_job: tuple[CommonBooleanEvaluator, ast.AST] | None = None
+
+
+def _init_worker(evaluator: CommonBooleanEvaluator, expression: str) -> None:
+    global _worker_job
+    _worker_job = (evaluator, evaluator.compile(expression))
+
+
+def _evaluate_chunk(rows: list[ValuesDict]) -> list[BatchResult]:
+    assert _worker_job is not None
+    evaluator, tree = _worker_job
+    return [_evaluate_row(evaluator, tree, row) for row in rows]
+
+
+def chunked(rows: Iterable[Any], chunk_size: int) -> Iterator[list[Any]]:
+    """
+    Split an iterable into lists of at most `chunk_size` items, lazily.
+    """
+    row_iter = iter(rows)
+    while True:
+        chunk = list(itertools.islice(row_iter, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def map_chunks(
+    func: Callable[[list[Any]], list[Any]],
+    chunks: Iterable[list[Any]],
+    *,
+    workers: int,
+    initializer: Callable[..., None],
+    initargs: tuple[Any, ...],
+) -> Iterator[Any]:
+    """
+    Apply `func` to each chunk in a pool of processes, yielding the results in order.
+
+    Chunks are consumed lazily, so only a bounded number of them are in flight.
+    """
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=initializer,
+        initargs=initargs,
+    ) as executor:
+        pending: deque[Future[list[Any]]] = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(func, chunk))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def iter_evaluate_batch(
+    expression: str,
+    rows: Iterable[ValuesDict],
+    *,
+    evaluator: CommonBooleanEvaluator | None = None,
+    workers: int = 1,
+    chunk_size: int = 1000,
+) -> Iterator[BatchResult]:
+    """
+    Evaluate the expression against each row of values, yielding results in order.
+
+    The expression is verified and compiled before anything else, so e.g. syntax errors
+    are raised immediately. Errors evaluating a single row are reported in that row's
+    result instead.
+
+    With more than one worker, rows are sent to a pool of processes in chunks.
+    Each worker compiles the expression once. Rows are consumed lazily, so only
+    a bounded number of chunks are in flight at a time.
+
+    :param expression: The expression to evaluate.
+    :param rows: Iterable of values dictionaries.
+    :param evaluator: The evaluator to use; it must be picklable if workers are used.
+    :param workers: Number of worker processes (e.g. `os.cpu_count()`). With 1
+                    (the default) or fewer, rows are evaluated in this process.
+    :param chunk_size: Number of rows sent to a worker at a time.
+    """
+    if evaluator is None:
+        evaluator = CommonBooleanEvaluator()
+    # Compile here, not in the generator, so errors are raised by this call.
+    tree = evaluator.compile(expression)
+    if workers <= 1:
+        return (_evaluate_row(evaluator, tree, row) for row in rows)
+    return map_chunks(
+        _evaluate_chunk,
+        chunked(rows, chunk_size),
+        workers=workers,
+        initializer=_init_worker,
+        initargs=(evaluator, expression),
+    )
+
+
+def evaluate_batch(
+    expression: str,
+    rows: Iterable[ValuesDict],
+    **kwargs: Any,
+) -> list[BatchResult]:
+    """
+    Evaluate the expression against each row of values, returning results in order.
+
+    See `iter_evaluate_batch` for the parameters.
+    """
+    return list(iter_evaluate_batch(expression, rows, **kwargs))
+
+
+class VerificationReport(NamedTuple):
+    expression: str
+    #: Whether the expression was verified to be valid.
+    ok: bool
+    #: Name of the exception class if the verification failed.
+    error_class: str | None = None
+    #: Message of the exception if the verification failed.
+    message: str | None = None
+    #: Type of the offending AST node, if known.
+    node: str | None = None
+    #: Line number (1-based) of the problem, if known.
+    lineno: int | None = None
+    #: Column offset (0-based) of the problem, if known.
+    col_offset: int | None = None
+
+
+def verify_expression(
+    verify: Callable[[str], object],
+    expression: str,
+) -> VerificationReport:
+    """
+    Verify an expression with the `verify` callable, reporting any error it raises.
+    """
+    try:
+        verify(expression)
+    except Exception as exc:  # noqa: BLE001
+        node = getattr(exc, "node", None)
+        lineno = getattr(node, "lineno", None)
+        col_offset = getattr(node, "col_offset", None)
+        if isinstance(exc, SyntaxError):
+            lineno = exc.lineno
+            col_offset = max(exc.offset - 1, 0) if exc.offset is not None else None
+        return VerificationReport(
+            expression=expression,
+            ok=False,
+            error_class=type(exc).__name__,
+            message=str(exc.msg if isinstance(exc, SyntaxError) else exc),
+            node=type(node).__name__ if node is not None else None,
+            lineno=lineno,
+            col_offset=col_offset,
+        )
+    return VerificationReport(expression=expression, ok=True)
+
+
+# Evaluator of a verification worker process; set up once by `_init_verifier`.
+_worker_verifier: CommonBooleanEvaluator | None = None
+
+
+def _init_verifier(evaluator: CommonBooleanEvaluator) -> None:
+    global _worker_verifier
+    _worker_verifier = evaluator
+
+
+def _verify_chunk(expressions: list[str]) -> list[VerificationReport]:
+    assert _worker_verifier is not None
+    return [verify_expression(_worker_verifier.verify, expr) for expr in expressions]
+
+
+def get_expression_hash(expression: str) -> str:
+    """
+    Get the key used for an expression in verification caches.
+    """
+    return hashlib.sha256(expression.encode("utf-8")).hexdigest()
+
+
+def verify_many(
+    expressions: Iterable[str],
+    *,
+    evaluator: CommonBooleanEvaluator | None = None,
+    workers: int = 1,
+    chunk_size: int = 100,
+    cache: MutableMapping[str, VerificationReport] | None = None,
+) -> list[VerificationReport]:
+    """
+    Verify many expressions, collecting a report for each of them.
+
+    Verification never stops at the first failure; each report states whether the
+    expression is valid, and if not, why and where.
+
+    :param expressions: The expressions to verify.
+    :param evaluator: The evaluator to verify with; it must be picklable if workers
+                      are used.
+    :param workers: Number of worker processes (e.g. `os.cpu_count()`). With 1
+                    (the default) or fewer, expressions are verified in this process.
+    :param chunk_size: Number of expressions sent to a worker at a time.
+    :param cache: Optional mapping of expression hashes to earlier reports.
+                  Only expressions not found in it are verified, and new reports
+                  are stored in it. The cache must only be shared between
+                  evaluators with the same configuration.
+    """
+    if evaluator is None:
+        evaluator = CommonBooleanEvaluator()
+    if cache is None:
+        cache = {}
+    expressions = list(expressions)
+    hashes = [get_expression_hash(expr) for expr in expressions]
+    to_verify = {h: expr for (h, expr) in zip(hashes, expressions) if h not in cache}
+
+    if workers <= 1 or len(to_verify) <= chunk_size:
+        reports = [
+            verify_expression(evaluator.verify, expr) for expr in to_verify.values()
+        ]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_verifier,
+            initargs=(evaluator,),
+        ) as executor:
+            chunks = chunked(to_verify.values(), chunk_size)
+            reports = list(
+                itertools.chain.from_iterable(executor.map(_verify_chunk, chunks)),
+            )
+    for h, report in zip(to_verify, reports):
+        cache[h] = report
+    return [cache[h] for h in hashes]
@@ -1,18 +1,29 @@
 from __future__ import annotations
 
+import ast
+import contextlib
+import itertools
 import keyword
+import sys
+import threading
 import tokenize
-from typing import Any, Dict, Tuple, Union
+from typing import Any, Dict, Iterator, NamedTuple, Tuple, Union
 
-from leval.excs import NoSuchFunction
+from leval.canonical import ProgramInterner
+from leval.dependencies import Dependencies, get_dependencies
+from leval.evaluator import Evaluator
+from leval.memo import CacheStats, FunctionMemo, LRUCache
+from leval.result_cache import ResultCache
 from leval.rewriter_evaluator import RewriterEvaluator
 from leval.rewriter_utils import (
     convert_dash_identifiers,
     get_parts_from_dashed_identifier_tokens,
     make_glued_name_token,
 )
+from leval.universe.budget import MemoryBudgetMixin
 from leval.universe.verifier import VerifierUniverse
 from leval.universe.weakly_typed import WeaklyTypedSimpleUniverse
+from leval.utils import estimate_size
 
 DEFAULT_FUNCTIONS = {
     "abs": abs,
@@ -45,6 +56,21 @@ def _prepare_name(name: str) -> str:
     return DASH_SEP.join(_rewrite_keyword(p) for p in name.split("-"))
 
 
+def _unrewrite_keyword(name: str) -> str:
+    if name.startswith(KEYWORD_PREFIX):
+        kw = name[len(KEYWORD_PREFIX) :]
+        if keyword.iskeyword(kw):
+            return kw
+    return name
+
+
+def _unprepare_name(name: str) -> str:
+    """
+    Undo `_prepare_name`, i.e. turn an internal name back to what the user wrote.
+    """
+    return "-".join(_unrewrite_keyword(p) for p in name.split(DASH_SEP))
+
+
 class _CommonEvaluator(RewriterEvaluator):
     def rewrite_keyword(self, kw: str) -> str:
         return _rewrite_keyword(kw)
@@ -53,42 +79,145 @@ class _CommonEvaluator(RewriterEvaluator):
         return convert_dash_identifiers(tokens, _convert_dash_tokens)
 
 
-class _CommonUniverse(WeaklyTypedSimpleUniverse):
-    def evaluate_function(self, name, arg_getters):
-        func = self.functions.get(name)
-        if not func:
-            raise NoSuchFunction(f"No function {name}")
-        args = [getter() for getter in arg_getters]
+class _CommonUniverse(MemoryBudgetMixin, WeaklyTypedSimpleUniverse):
+    def call_function(self, name, func, args):
         for arg in args:
             # This is using `type(...)` on purpose; we don't want to allow subclasses.
             if type(arg) not in (int, float, str, bool):
                 raise TypeError(f"Invalid argument for {name}: {type(arg)}")
-        return func(*args)
+        return super().call_function(name, func, args)
+
+
+class _CommonVerifierUniverse(VerifierUniverse):
+    # Use the same operations as `_CommonUniverse`, so constant folding
+    # at compile time computes the same results.
+    ops = _CommonUniverse.ops
+
+
+def _prepare_key(key: str | tuple[str, ...]) -> str | tuple[str, ...]:
+    if isinstance(key, tuple):
+        return tuple(_prepare_name(p) for p in key)
+    if isinstance(key, str):
+        return _prepare_name(key)
+    raise TypeError(f"Invalid key type: {type(key)}")
 
 
-def _prepare_values(values: ValuesDict) -> ValuesDict:
+class PreparedNameCacheStats(NamedTuple):
+    cache: CacheStats
+    #: Estimated memory used by the cached keys and prepared names, in bytes.
+    memory: int
+
+
+class PreparedNameCache:
+    """
+    A bounded cache of prepared value keys.
+
+    Preparing keys is relatively expensive, but the set of keys in use tends to be
+    small and stable, so each distinct key is only prepared once. The prepared names
+    are interned, so equal names share a single string.
+    """
+
+    def __init__(self, maxsize: int = 4096) -> None:  # noqa: D107
+        self._cache = LRUCache(maxsize)
+
+    def __reduce__(self) -> tuple[Any, ...]:  # noqa: D105
+        # Pickled caches (e.g. with their evaluator) start out empty.
+        return (type(self), (self._cache.maxsize,))
+
+    def prepare_key(self, key: str | tuple[str, ...]) -> str | tuple[str, ...]:
+        """
+        Prepare a key (a name or a tuple of names) like the evaluation would.
+        """
+        prepared = self._cache.get(key)
+        if prepared is None:
+            prepared = _prepare_key(key)
+            if isinstance(prepared, tuple):
+                prepared = tuple(sys.intern(p) for p in prepared)
+            else:
+                prepared = sys.intern(prepared)
+            self._cache.put(key, prepared)
+        return prepared
+
+    def clear(self) -> None:  # noqa: D102
+        self._cache.clear()
+
+    def stats(self) -> PreparedNameCacheStats:  # noqa: D102
+        items = self._cache.items()
+        return PreparedNameCacheStats(
+            cache=self._cache.stats(),
+            memory=estimate_size(dict(items)),
+        )
+
+
+def _prepare_values(
+    values: ValuesDict,
+    name_cache: PreparedNameCache | None = None,
+) -> ValuesDict:
     """
     Prepare a values dictionary by rewriting names like the evaluation would.
+
+    If no names need rewriting (the usual case), the dictionary is returned as is.
     """
-    prepared_values = {}
+    prepare_key = name_cache.prepare_key if name_cache else _prepare_key
+    prepared: ValuesDict | None = None
+    unchanged = 0
     for key, value in values.items():
-        if isinstance(key, tuple):
-            key = tuple(_prepare_name(p) for p in key)
-        elif isinstance(key, str):
-            key = _prepare_name(key)
-        else:
-            raise TypeError(f"Invalid key type: {type(key)}")
-        prepared_values[key] = value
-    return prepared_values
+        prepared_key = prepare_key(key)
+        if prepared is None:
+            if prepared_key == key:
+                unchanged += 1
+                continue
+            prepared = dict(itertools.islice(values.items(), unchanged))
+        prepared[prepared_key] = value
+    return values if prepared is None else prepared
+
+
+# Bound to cached universes between evaluations; never modified.
+_NO_VALUES: ValuesDict = {}
+
+
+_unset = object()
 
 
 class CommonBooleanEvaluator:
+    """
+    Evaluate boolean expressions with commonly useful rewriting and limits.
+
+    The configuration (the class attributes below) may be overridden in subclasses
+    or on instances, but must not be changed after the first evaluation, since
+    evaluators and universes are cached and reused (per thread) between evaluations.
+    """
+
     functions: dict = DEFAULT_FUNCTIONS
+    memo: FunctionMemo | None = None
+    interner: ProgramInterner | None = None
+    result_cache: ResultCache | None = None
     max_depth: int = 8
     max_time: float = 0.2
-    verifier_universe_class = VerifierUniverse
+    # Memory budget per evaluation in bytes (see `MemoryBudgetMixin`); off by default.
+    max_memory: int | None = None
+    fold_constants: bool = False
+    verifier_universe_class = _CommonVerifierUniverse
     universe_class = _CommonUniverse
     evaluator_class = _CommonEvaluator
+    _local: threading.local | None = None
+    _name_cache: PreparedNameCache | None | object = _unset
+
+    @property
+    def name_cache(self) -> PreparedNameCache | None:
+        """
+        The cache of prepared value keys; created for each instance on first use.
+
+        Set to None (in a subclass or on an instance) to not cache prepared keys.
+        """
+        cache = self._name_cache
+        if cache is _unset:
+            cache = self._name_cache = PreparedNameCache()
+        return cache  # type: ignore[return-value]
+
+    @name_cache.setter
+    def name_cache(self, cache: PreparedNameCache | None) -> None:
+        self._name_cache = cache
 
     def evaluate(self, expr: str | None, values: ValuesDict) -> bool | None:
         """
@@ -98,23 +227,140 @@ class CommonBooleanEvaluator:
         """
         if not expr:
             return None
+        evaluator = self._acquire_evaluator(values)
+        try:
+            return bool(evaluator.evaluate_expression(expr))
+        finally:
+            self._release_evaluator(evaluator)
+
+    def compile(self, expression: str) -> ast.AST:
+        """
+        Verify and compile the given expression for use with `evaluate_compiled`.
+
+        If an interner has been set, equivalent expressions share one compiled tree.
+        """
+        if self.interner is not None:
+            return self.interner.intern(expression)
+        evl = self._make_verifier()
+        tree = evl.compile_expression(expression)
+        evl.evaluate_tree(tree)
+        return tree
+
+    def make_interner(self, **kwargs: Any) -> ProgramInterner:
+        """
+        Create an interner suitable for setting as `interner` on this evaluator.
+
+        The interner can be shared by all evaluators with the same configuration.
+        Keyword arguments are passed to `ProgramInterner`.
+        """
+        return ProgramInterner(self._make_verifier(), verify=True, **kwargs)
+
+    def evaluate_compiled(self, tree: ast.AST, values: ValuesDict) -> bool:
+        """
+        Evaluate an expression compiled with `compile` against the given values.
+
+        If a result cache has been set, results are reused for values that are
+        equal in the names the expression refers to.
+        """
+        # Not using `bound`, to avoid allocating a context manager for each call.
+        evaluator = self._acquire_evaluator(values)
+        try:
+            if self.result_cache is not None:
+                return bool(self.result_cache.evaluate_tree(evaluator, tree))
+            return bool(evaluator.evaluate_tree(tree))
+        finally:
+            self._release_evaluator(evaluator)
+
+    @contextlib.contextmanager
+    def bound(self, values: ValuesDict) -> Iterator[Evaluator]:
+        """
+        Get an evaluator bound to the given values, for the duration of the block.
+
+        This is useful for evaluating several compiled expressions (with
+        `Evaluator.evaluate_tree`) against the same values without preparing
+        them again. The evaluator must not be used after the block.
+        """
+        evaluator = self._acquire_evaluator(values)
+        try:
+            yield evaluator
+        finally:
+            self._release_evaluator(evaluator)
+
+    def _acquire_evaluator(self, values: ValuesDict) -> _CommonEvaluator:
+        """
+        Get an evaluator for the given values, reusing this thread's cached one.
+
+        The evaluator must be returned with `_release_evaluator` after use.
+        """
+        local = self._local
+        if local is None:
+            local = self._local = threading.local()
+        evaluator = getattr(local, "evaluator", None)
+        if evaluator is None:
+            return self._make_evaluator(values)
+        # Take the evaluator out of the cache while it's in use,
+        # in case e.g. a function re-entrantly evaluates another expression.
+        local.evaluator = None
+        evaluator.universe.bind_values(  # type: ignore[attr-defined]
+            _prepare_values(values, self.name_cache),
+        )
+        return evaluator
+
+    def _release_evaluator(self, evaluator: _CommonEvaluator) -> None:
+        # Don't keep the values alive until the next evaluation.
+        evaluator.universe.bind_values(_NO_VALUES)  # type: ignore[attr-defined]
+        self._local.evaluator = evaluator  # type: ignore[union-attr]
+
+    def __getstate__(self) -> dict[str, Any]:  # noqa: D105
+        # The per-thread cache can't (and shouldn't) be pickled.
+        state = self.__dict__.copy()
+        state.pop("_local", None)
+        return state
+
+    def _make_evaluator(self, values: ValuesDict) -> _CommonEvaluator:
         universe = self.universe_class(
             functions=self.functions,
-            values=_prepare_values(values),
+            values=_prepare_values(values, self.name_cache),
+            memo=self.memo,
+            max_memory=self.max_memory,
         )
-        evl = self.evaluator_class(
+        return self.evaluator_class(
             universe,
             max_depth=self.max_depth,
             max_time=self.max_time,
         )
-        return bool(evl.evaluate_expression(expr))
 
-    def verify(self, expression: str) -> bool:
+    def _make_verifier(self) -> _CommonEvaluator:
+        return self.evaluator_class(
+            self.verifier_universe_class(),
+            max_depth=self.max_depth,
+            fold_constants=self.fold_constants,
+        )
+
+    def get_dependencies(self, expression: str) -> Dependencies:
         """
-        Verify that the given expression is technically valid.
+        Find the values and functions the given expression refers to.
+
+        Names are returned as they would be keyed in the values dictionary
+        passed to `evaluate`, i.e. with keyword and dash rewriting undone.
         """
-        evl = self.evaluator_class(
-            self.verifier_universe_class(),
+        deps = get_dependencies(
+            expression,
+            evaluator_class=self.evaluator_class,
             max_depth=self.max_depth,
         )
-        return evl.evaluate_expression(expression)
+        return Dependencies(
+            names=frozenset(
+                tuple(_unprepare_name(p) for p in name)
+                if isinstance(name, tuple)
+                else _unprepare_name(name)
+                for name in deps.names
+            ),
+            functions=deps.functions,
+        )
+
+    def verify(self, expression: str) -> bool:
+        """
+        Verify that the given expression is technically valid.
+        """
+        return self._make_verifier().evaluate_expression(expression)
@@ -0,0 +1,260 @@
+"""
+Incremental re-evaluation of expressions as values change.
+"""
+
+from __future__ import annotations
+
+import ast
+import math
+from typing import Any, Callable, Dict, Mapping, Tuple, Union
+
+from leval.evaluator import Evaluator
+from leval.universe.simple import SimpleUniverse
+from leval.utils import expand_name
+
+Name = Union[str, Tuple[str, ...]]
+ValuesDict = Dict[Name, Any]
+Callback = Callable[[str, Union[bool, None]], None]
+
+_missing = object()
+
+# Types whose equal values behave the same (for floats, if their signs are the same).
+_SCALAR_TYPES = frozenset((type(None), bool, int, str, bytes))
+
+
+def _is_unchanged(old: Any, new: Any) -> bool:
+    """
+    Return whether `new` can't behave differently from `old` in an expression.
+
+    Equal values of different types (e.g. `1` and `True`) or equal containers
+    (e.g. `(1,)` and `(True,)`) may behave differently, so they are changes.
+    """
+    if old is new:
+        return True
+    new_type = type(new)
+    if type(old) is not new_type:
+        return False
+    if new_type is float:
+        return old == new and math.copysign(1.0, old) == math.copysign(1.0, new)
+    return new_type in _SCALAR_TYPES and old == new
+
+
+class NodeCachingEvaluator(Evaluator):
+    """
+    An evaluator that remembers results of subtrees between evaluations.
+
+    Only results of nodes listed in `cacheable` are stored. It is up to the owner
+    to evict results from `node_cache` when the values they depend on change.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:  # noqa: D107
+        super().__init__(*args, **kwargs)
+        self.node_cache: dict[int, Any] = {}
+        self.cacheable: set[int] = set()
+
+    def visit(self, node):  # noqa: D102
+        key = id(node)
+        try:
+            return self.node_cache[key]
+        except KeyError:
+            pass
+        value = super().visit(node)
+        if key in self.cacheable:
+            self.node_cache[key] = value
+        return value
+
+
+def _analyze_nodes(
+    tree: ast.AST,
+    universe: SimpleUniverse,
+) -> tuple[dict[int, frozenset[Name]], set[int]]:
+    """
+    Find the value names each node depends on, and which nodes can be cached.
+
+    Nodes that contain calls to impure functions can't be cached.
+    """
+    names_by_node: dict[int, frozenset[Name]] = {}
+    cacheable: set[int] = set()
+
+    def walk(node: ast.AST) -> tuple[frozenset[Name], bool]:
+        names: frozenset[Name]
+        pure = True
+        if isinstance(node, ast.Name):
+            names = frozenset((node.id,))
+        elif isinstance(node, ast.Attribute):
+            names = frozenset((expand_name(node),))
+        else:
+            kids = [
+                walk(kid)
+                for kid in ast.iter_child_nodes(node)
+                if isinstance(kid, ast.expr)
+                and not (isinstance(node, ast.Call) and kid is node.func)
+            ]
+            names = frozenset().union(*(kid_names for (kid_names, _) in kids))
+            pure = all(kid_pure for (_, kid_pure) in kids)
+            if isinstance(node, ast.Call):
+                func_name = getattr(node.func, "id", None)
+                pure = pure and universe.is_pure_function(func_name)  # type: ignore[arg-type]
+        names_by_node[id(node)] = names
+        if pure:
+            cacheable.add(id(node))
+        return names, pure
+
+    walk(tree)
+    return names_by_node, cacheable
+
+
+class _WatchedExpression:
+    def __init__(self, expression: str, tree: ast.AST, universe: SimpleUniverse):
+        self.expression = expression
+        self.tree = tree
+        self.names_by_node, self.cacheable = _analyze_nodes(tree, universe)
+        self.names = self.names_by_node[id(tree)]
+        self.result: bool | None = None
+        self.error: Exception | None = None
+        self.subscribers: list[Callback] = []
+
+
+class ReactiveEvaluator:
+    evaluator_class: type[NodeCachingEvaluator] = NodeCachingEvaluator
+    universe_class: type[SimpleUniverse] = SimpleUniverse
+
+    def __init__(
+        self,
+        *,
+        functions: dict[str, Callable] | None = None,
+        values: ValuesDict | None = None,
+        **evaluator_kwargs: Any,
+    ) -> None:
+        """
+        Initialize a reactive evaluator.
+
+        Expressions added with `add` are re-evaluated whenever values they depend on
+        change (and only then), reusing cached results for subtrees that do not
+        depend on the changed values. Subscribers are notified when the boolean
+        result of an expression changes.
+
+        :param functions: Mapping of function names to functions.
+        :param values: Initial mapping of value names to values.
+        :param evaluator_kwargs: Additional arguments for the evaluator (e.g. limits).
+        """
+        self.values: ValuesDict = dict(values or {})
+        self.universe = self.universe_class(
+            functions=(functions or {}),
+            values=self.values,
+        )
+        self.evaluator = self.evaluator_class(self.universe, **evaluator_kwargs)
+        self._watched: dict[str, _WatchedExpression] = {}
+
+    def add(
+        self,
+        key: str,
+        expression: str,
+        callback: Callback | None = None,
+    ) -> bool | None:
+        """
+        Start watching an expression under the given key, and return its result.
+
+        The result is `None` if the evaluation failed; see `get_error`.
+        """
+        if key in self._watched:
+            self.remove(key)
+        tree = self.evaluator.compile_expression(expression)
+        watched = self._watched[key] = _WatchedExpression(
+            expression,
+            tree,
+            self.universe,
+        )
+        self.evaluator.cacheable |= watched.cacheable
+        if callback:
+            watched.subscribers.append(callback)
+        self._evaluate(watched)
+        return watched.result
+
+    def remove(self, key: str) -> None:
+        """
+        Stop watching the expression with the given key.
+        """
+        watched = self._watched.pop(key)
+        for node_id in watched.names_by_node:
+            self.evaluator.node_cache.pop(node_id, None)
+            self.evaluator.cacheable.discard(node_id)
+
+    def subscribe(self, key: str, callback: Callback) -> None:
+        """
+        Call `callback(key, result)` when the result of the given expression changes.
+        """
+        self._watched[key].subscribers.append(callback)
+
+    def unsubscribe(self, key: str, callback: Callback) -> None:  # noqa: D102
+        self._watched[key].subscribers.remove(callback)
+
+    def get_result(self, key: str) -> bool | None:
+        """
+        Get the current result of the given expression.
+        """
+        return self._watched[key].result
+
+    def get_error(self, key: str) -> Exception | None:
+        """
+        Get the error the last evaluation of the given expression raised, if any.
+        """
+        return self._watched[key].error
+
+    def set_value(self, name: Name, value: Any) -> list[str]:
+        """
+        Set a single value; see `update`.
+        """
+        return self.update({name: value})
+
+    def delete_value(self, name: Name) -> list[str]:
+        """
+        Remove a value, re-evaluating the expressions that depend on it.
+        """
+        if name not in self.values:
+            return []
+        del self.values[name]
+        return self._values_changed({name})
+
+    def update(self, values: Mapping[Name, Any]) -> list[str]:
+        """
+        Update values, re-evaluating the expressions that depend on changed ones.
+
+        Returns the keys of the expressions whose results changed.
+        """
+        changed = set()
+        for name, value in values.items():
+            if _is_unchanged(self.values.get(name, _missing), value):
+                continue
+            self.values[name] = value
+            changed.add(name)
+        return self._values_changed(changed)
+
+    def _values_changed(self, names: set[Name]) -> list[str]:
+        if not names:
+            return []
+        node_cache = self.evaluator.node_cache
+        flipped = []
+        for key, watched in self._watched.items():
+            if watched.names.isdisjoint(names):
+                continue
+            for node_id, node_names in watched.names_by_node.items():
+                if not node_names.isdisjoint(names):
+                    node_cache.pop(node_id, None)
+            old_result = watched.result
+            self._evaluate(watched)
+            if watched.result != old_result:
+                flipped.append(key)
+        for key in flipped:
+            watched = self._watched[key]
+            for callback in list(watched.subscribers):
+                callback(key, watched.result)
+        return flipped
+
+    def _evaluate(self, watched: _WatchedExpression) -> None:
+        try:
+            watched.result = bool(self.evaluator.evaluate_tree(watched.tree))
+            watched.error = None
+        except Exception as exc:  # noqa: BLE001
+            watched.result = None
+            watched.error = exc
@@ -0,0 +1,144 @@
+"""
+A registry of rule sets that can be reloaded without pausing evaluation.
+"""
+
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future
+from typing import Hashable, Mapping
+
+from leval.extras.common_boolean_evaluator import CommonBooleanEvaluator, ValuesDict
+from leval.extras.rules import Rules, RuleSet, RuleStats
+
+
+class RuleRegistry:
+    def __init__(
+        self,
+        rules: Rules | None = None,
+        *,
+        evaluator: CommonBooleanEvaluator | None = None,
+        raise_errors: bool = False,
+    ) -> None:
+        """
+        Initialize a registry of versioned rule sets.
+
+        New versions of the rules are verified and compiled in full before they
+        replace the current version, so evaluation never pays for compilation, and
+        a version with an invalid rule never replaces a working one. Expressions that
+        are unchanged from the current version are not compiled again.
+
+        :param rules: The initial rules, loaded (and compiled) immediately;
+                      see `RuleSet`.
+        :param evaluator: The evaluator to compile and evaluate the rules with.
+        :param raise_errors: Whether errors evaluating a rule are raised.
+        """
+        self.evaluator = evaluator or CommonBooleanEvaluator()
+        self.raise_errors = raise_errors
+        self._lock = threading.Lock()
+        self._last_version = 0
+        self._version = 0
+        self._rule_set: RuleSet | None = None
+        if rules is not None:
+            self.load(rules)
+
+    @property
+    def version(self) -> int:
+        """
+        The version of the rules currently in use; 0 if nothing has been loaded.
+        """
+        return self._version
+
+    @property
+    def rule_set(self) -> RuleSet:
+        """
+        The rule set currently in use.
+
+        Hold on to the returned rule set to evaluate several times
+        against the same version of the rules.
+        """
+        rule_set = self._rule_set
+        if rule_set is None:
+            raise LookupError("No rules have been loaded")
+        return rule_set
+
+    def load(self, rules: Rules) -> int:
+        """
+        Compile the rules, and start using them once done; returns the new version.
+
+        Errors compiling the rules are raised, and the current version is kept.
+        """
+        return self._build(self._next_version(), _copy_rules(rules))
+
+    def reload(self, rules: Rules) -> Future[int]:
+        """
+        Compile the rules in a background thread, and start using them once done.
+
+        The current version is used until then. The returned future resolves to
+        the new version, or to the error raised compiling the rules (in which
+        case the current version is kept).
+
+        If reloads overlap, the most recently started one wins, even if it finishes
+        before an earlier one.
+        """
+        version = self._next_version()
+        rules = _copy_rules(rules)
+        future: Future[int] = Future()
+
+        def run() -> None:
+            if not future.set_running_or_notify_cancel():  # pragma: no cover
+                return
+            try:
+                future.set_result(self._build(version, rules))
+            except BaseException as exc:  # noqa: BLE001
+                future.set_exception(exc)
+
+        threading.Thread(
+            target=run,
+            name=f"leval-reload-{version}",
+            daemon=True,
+        ).start()
+        return future
+
+    def _next_version(self) -> int:
+        with self._lock:
+            self._last_version += 1
+            return self._last_version
+
+    def _build(self, version: int, rules: Rules) -> int:
+        current = self._rule_set
+        rule_set = RuleSet(
+            rules,
+            evaluator=self.evaluator,
+            raise_errors=self.raise_errors,
+            compiled=current.get_compiled() if current is not None else None,
+        )
+        with self._lock:
+            if version > self._version:
+                # Evaluations read `_rule_set` once, so they see
+                # either the old or the new version, never a mix.
+                self._rule_set = rule_set
+                self._version = version
+        return version
+
+    def first_match(self, values: ValuesDict) -> Hashable | None:  # noqa: D102
+        return self.rule_set.first_match(values)
+
+    def all_matches(self, values: ValuesDict) -> list[Hashable]:  # noqa: D102
+        return self.rule_set.all_matches(values)
+
+    def top_matches(self, values: ValuesDict, k: int) -> list[Hashable]:  # noqa: D102
+        return self.rule_set.top_matches(values, k)
+
+    def stats(self) -> dict[Hashable, RuleStats]:
+        """
+        Get match statistics for the current version of the rules.
+
+        Statistics start from zero for each new version.
+        """
+        return self.rule_set.stats()
+
+
+def _copy_rules(rules: Rules) -> Rules:
+    # Take a copy, so the caller can't change the rules while they are compiled.
+    return list(rules.items()) if isinstance(rules, Mapping) else list(rules)
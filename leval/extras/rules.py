@@ -0,0 +1,166 @@
+"""
+Evaluation of ordered lists of rules against a single set of values.
+"""
+
+from __future__ import annotations
+
+import ast
+from typing import Hashable, Iterable, Mapping, NamedTuple, Tuple, Union
+
+from leval.evaluator import Evaluator
+from leval.extras.common_boolean_evaluator import CommonBooleanEvaluator, ValuesDict
+
+Rules = Union[Mapping[Hashable, str], Iterable[Tuple[Hashable, str]]]
+
+
+class RuleStats(NamedTuple):
+    #: Number of times the rule was evaluated.
+    evaluations: int
+    #: Number of times the rule matched.
+    matches: int
+    #: Number of times evaluating the rule raised an error.
+    errors: int
+
+
+class _Rule:
+    __slots__ = ("errors", "evaluations", "expression", "key", "matches", "tree")
+
+    def __init__(self, key: Hashable, expression: str, tree: ast.AST) -> None:
+        self.key = key
+        self.expression = expression
+        self.tree = tree
+        self.evaluations = 0
+        self.matches = 0
+        self.errors = 0
+
+
+class RuleSet:
+    def __init__(
+        self,
+        rules: Rules,
+        *,
+        evaluator: CommonBooleanEvaluator | None = None,
+        raise_errors: bool = False,
+        compiled: Mapping[str, ast.AST] | None = None,
+    ) -> None:
+        """
+        Initialize an ordered set of rules.
+
+        All rules are verified and compiled up front. When matching, the values
+        are prepared once, and all rules are evaluated in order with the same
+        universe, stopping as soon as enough rules have matched.
+
+        :param rules: Mapping (or iterable of pairs) of rule keys to expressions,
+                      in the order they should be evaluated in.
+        :param evaluator: The evaluator to compile and evaluate the rules with.
+        :param raise_errors: Whether errors evaluating a rule are raised.
+                             By default, rules that fail to evaluate don't match.
+        :param compiled: Optional mapping of expressions to trees already compiled
+                         (and verified) with the same evaluator configuration,
+                         e.g. from an earlier rule set; see `get_compiled`.
+        """
+        self.evaluator = evaluator or CommonBooleanEvaluator()
+        self.raise_errors = raise_errors
+        compiled = compiled or {}
+        items = rules.items() if isinstance(rules, Mapping) else rules
+        self._rules = [
+            _Rule(
+                key,
+                expression,
+                compiled.get(expression) or self.evaluator.compile(expression),
+            )
+            for (key, expression) in items
+        ]
+
+    def __len__(self) -> int:  # noqa: D105
+        return len(self._rules)
+
+    @property
+    def keys(self) -> list[Hashable]:
+        """
+        The keys of the rules, in evaluation order.
+        """
+        return [rule.key for rule in self._rules]
+
+    def get_compiled(self) -> dict[str, ast.AST]:
+        """
+        Get the compiled trees of the rules, keyed by expression.
+        """
+        return {rule.expression: rule.tree for rule in self._rules}
+
+    def first_match(self, values: ValuesDict) -> Hashable | None:
+        """
+        Get the key of the first rule that matches the values, or None.
+        """
+        matches = self._match(values, limit=1)
+        return matches[0] if matches else None
+
+    def all_matches(self, values: ValuesDict) -> list[Hashable]:
+        """
+        Get the keys of all rules that match the values, in order.
+        """
+        return self._match(values, limit=None)
+
+    def top_matches(self, values: ValuesDict, k: int) -> list[Hashable]:
+        """
+        Get the keys of (at most) the first `k` rules that match the values.
+        """
+        if k <= 0:
+            return []
+        return self._match(values, limit=k)
+
+    def _match(self, values: ValuesDict, *, limit: int | None) -> list[Hashable]:
+        with self.evaluator.bound(values) as evaluator:
+            return self._match_with(evaluator, limit=limit)
+
+    def _match_with(
+        self,
+        evaluator: Evaluator,
+        *,
+        limit: int | None,
+    ) -> list[Hashable]:
+        matches = []
+        for rule in self._rules:
+            rule.evaluations += 1
+            error: Exception | None = None
+            try:
+                matched = bool(evaluator.evaluate_tree(rule.tree))
+            except Exception as exc:  # noqa: BLE001
+                # Any error evaluating a rule (e.g. a missing value or a type
+                # error) just means it doesn't match, unless asked to raise.
+                error = exc
+            if error is not None:
+                rule.errors += 1
+                if self.raise_errors:
+                    raise error
+                continue
+            if matched:
+                rule.matches += 1
+                matches.append(rule.key)
+                if len(matches) == limit:
+                    break
+        return matches
+
+    def stats(self) -> dict[Hashable, RuleStats]:
+        """
+        Get match statistics for each rule, in evaluation order.
+        """
+        return {
+            rule.key: RuleStats(rule.evaluations, rule.matches, rule.errors)
+            for rule in self._rules
+        }
+
+    def reset_stats(self) -> None:  # noqa: D102
+        for rule in self._rules:
+            rule.evaluations = rule.matches = rule.errors = 0
+
+    def get_hot_keys(self) -> list[Hashable]:
+        """
+        Get the rule keys ordered by how often they have matched, most often first.
+
+        Moving frequently matching rules earlier makes first-match evaluation faster,
+        but only do so if the rules are mutually exclusive, or their order doesn't
+        otherwise matter.
+        """
+        ordered = sorted(self._rules, key=lambda rule: rule.matches, reverse=True)
+        return [rule.key for rule in ordered]
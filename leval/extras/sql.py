@@ -0,0 +1,326 @@
+"""
+Translation of expressions to parameterized SQL predicates.
+"""
+
+from __future__ import annotations
+
+import ast
+from typing import Any, Mapping, NamedTuple, Tuple, Union
+
+from leval.evaluator import Evaluator
+from leval.excs import Untranslatable
+from leval.nodes import FrozenValue
+from leval.universe.verifier import VerifierUniverse
+from leval.utils import expand_name
+
+Name = Union[str, Tuple[str, ...]]
+
+
+class JsonColumn(NamedTuple):
+    #: Name of the column holding JSON documents.
+    column: str
+    #: Path of keys to the value within the documents.
+    path: tuple[str, ...] = ()
+
+
+#: Mapping of value names to column names or JSON paths.
+#: A `JsonColumn` also covers the dotted names it is a prefix of, e.g. with
+#: `{"meta": JsonColumn("meta")}`, `meta.lr` maps to the `$.lr` path of `meta`.
+Schema = Mapping[Name, Union[str, JsonColumn]]
+
+
+class SQLPredicate(NamedTuple):
+    #: The SQL, suitable for a `WHERE` clause.
+    sql: str
+    #: Parameters for the placeholders in the SQL.
+    params: tuple[Any, ...]
+
+
+_COMPARISON_OPS = {
+    ast.Eq: "{} IS NOT DISTINCT FROM {}",
+    ast.NotEq: "{} IS DISTINCT FROM {}",
+    ast.Gt: "{} > {}",
+    ast.GtE: "{} >= {}",
+    ast.Lt: "{} < {}",
+    ast.LtE: "{} <= {}",
+}
+
+_ARITHMETIC_OPS = {
+    ast.Add: "({} + {})",
+    ast.Sub: "({} - {})",
+    ast.Mult: "({} * {})",
+    # Avoid integer division.
+    ast.Div: "({} * 1.0 / {})",
+}
+
+
+# Types of constants that can be passed as parameters.
+_SCALAR_TYPES = (type(None), bool, int, float, str)
+
+
+def quote_identifier(name: str) -> str:
+    """
+    Quote a (possibly table-qualified) column name for SQL.
+    """
+    return ".".join('"' + part.replace('"', '""') + '"' for part in name.split("."))
+
+
+class SQLTranslator(ast.NodeVisitor):
+    """
+    Translate compiled expression trees to parameterized SQL predicates.
+
+    The predicate matches the rows the expression would evaluate truthy for
+    with the default `EvaluationUniverse` semantics, where missing values and
+    JSON nulls are `None`. Rows the evaluation would raise an error for
+    (e.g. comparing `None` to a number) may or may not be matched.
+
+    Anything that can't be translated faithfully raises `Untranslatable`,
+    so the caller can fall back to evaluating the expression in Python.
+    This includes using the truth value of anything other than a comparison
+    (e.g. `a and b`), `in` with anything other than a literal container,
+    and calls to functions not in the `functions` mapping.
+
+    The default SQL works with SQLite (3.39 and newer); for other databases,
+    override the class attributes and `format_json_path` in a subclass.
+    Instances are not thread-safe.
+    """
+
+    comparison_ops: Mapping[type[ast.cmpop], str] = _COMPARISON_OPS
+    arithmetic_ops: Mapping[type[ast.operator], str] = _ARITHMETIC_OPS
+    #: Template for accessing a JSON path; the path is passed as a parameter.
+    json_template = "json_extract({column}, {path})"
+    #: Placeholder for parameters ("qmark" style).
+    placeholder = "?"
+
+    def __init__(
+        self,
+        schema: Schema,
+        *,
+        functions: Mapping[str, str] | None = None,
+        loose_is_operator: bool = True,
+        loose_not_operator: bool = True,
+    ) -> None:
+        """
+        Initialize a translator.
+
+        :param schema: Mapping of value names to columns or JSON paths.
+        :param functions: Mapping of allowed function names to SQL function names.
+        :param loose_is_operator: Whether the evaluator uses loose `is` operators,
+                                  i.e. whether `x is None` is true for missing `x`.
+        :param loose_not_operator: Whether the evaluator uses loose `not` operators,
+                                   i.e. whether `not x` is true if `x` refers to
+                                   missing values.
+        """
+        self.schema = schema
+        self.functions = dict(functions or {})
+        self.loose_is_operator = loose_is_operator
+        self.loose_not_operator = loose_not_operator
+        self.params: list[Any] = []
+
+    def translate(self, tree: ast.AST) -> SQLPredicate:
+        """
+        Translate a compiled expression tree to a SQL predicate.
+        """
+        self.params = []
+        sql = self.predicate(tree.body if isinstance(tree, ast.Expression) else tree)
+        return SQLPredicate(sql=sql, params=tuple(self.params))
+
+    def add_param(self, value: Any) -> str:
+        """
+        Add a parameter, returning the placeholder for it.
+        """
+        self.params.append(value)
+        return self.placeholder
+
+    def format_json_path(self, path: tuple[str, ...]) -> Any:
+        """
+        Format a path of keys into the parameter for `json_template`.
+        """
+        bits = ["$"]
+        for part in path:
+            if '"' in part:
+                raise Untranslatable(f"Can't use {part!r} in a JSON path")
+            bits.append(f".{part}" if part.isidentifier() else f'."{part}"')
+        return "".join(bits)
+
+    def get_column(self, name: Name, node: ast.AST) -> str:
+        """
+        Get the SQL for accessing the value with the given name.
+        """
+        target = self.schema.get(name)
+        rest: tuple[str, ...] = ()
+        if target is None and isinstance(name, tuple):
+            for i in range(len(name) - 1, 0, -1):
+                target = self.schema.get(name[:i])
+                if target is None and i == 1:
+                    target = self.schema.get(name[0])
+                if isinstance(target, JsonColumn):
+                    rest = name[i:]
+                    break
+                target = None
+        if target is None:
+            raise Untranslatable(f"No column for {name}", node=node)
+        if isinstance(target, str):
+            return quote_identifier(target)
+        return self.json_template.format(
+            column=quote_identifier(target.column),
+            path=self.add_param(self.format_json_path(target.path + rest)),
+        )
+
+    def predicate(self, node: ast.AST) -> str:
+        """
+        Translate a node whose truth value is used.
+        """
+        if isinstance(node, (ast.Compare, ast.BoolOp)) or (
+            isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not)
+        ):
+            return self.visit(node)
+        if isinstance(node, ast.Constant) and type(node.value) is bool:
+            return "(1 = 1)" if node.value else "(1 = 0)"
+        raise Untranslatable(
+            f"Can't use the truth value of {type(node).__name__} in SQL",
+            node=node,
+        )
+
+    def generic_visit(self, node: ast.AST) -> str:  # noqa: D102
+        raise Untranslatable(f"Can't translate {type(node).__name__} to SQL", node=node)
+
+    def visit_BoolOp(self, node: ast.BoolOp) -> str:  # noqa: D102
+        joiner = " AND " if isinstance(node.op, ast.And) else " OR "
+        return "(" + joiner.join(self.predicate(value) for value in node.values) + ")"
+
+    def visit_UnaryOp(self, node: ast.UnaryOp) -> str:  # noqa: D102
+        if isinstance(node.op, ast.Not):
+            operand_sql = self.predicate(node.operand)
+            if self.loose_not_operator:
+                # Missing values make the operand NULL, and `NOT NULL` is NULL,
+                # but the evaluation would consider `not` of them true.
+                return f"(NOT COALESCE({operand_sql}, FALSE))"
+            return f"(NOT {operand_sql})"
+        if isinstance(node.op, ast.USub):
+            return f"(-{self.visit(node.operand)})"
+        if isinstance(node.op, ast.UAdd):
+            return self.visit(node.operand)
+        return self.generic_visit(node)
+
+    def visit_Compare(self, node: ast.Compare) -> str:  # noqa: D102
+        if len(node.ops) != 1:
+            raise Untranslatable("Only simple comparisons are supported", node=node)
+        op = node.ops[0]
+        left, right = node.left, node.comparators[0]
+        if isinstance(op, (ast.Is, ast.IsNot)):
+            return self._translate_is(op, left, right, node)
+        if isinstance(op, (ast.In, ast.NotIn)):
+            sql = self._translate_in(left, right)
+            return sql if isinstance(op, ast.In) else f"(NOT {sql})"
+        template = self.comparison_ops.get(type(op))
+        if template is None:
+            return self.generic_visit(node)
+        return "(" + template.format(self.visit(left), self.visit(right)) + ")"
+
+    def _translate_is(
+        self,
+        op: ast.cmpop,
+        left: ast.expr,
+        right: ast.expr,
+        node: ast.AST,
+    ) -> str:
+        if _is_none(left):
+            left, right = right, left
+        if not _is_none(right):
+            raise Untranslatable("`is` is only supported with None", node=node)
+        if not self.loose_is_operator and isinstance(left, (ast.Name, ast.Attribute)):
+            # The evaluator would raise an error for missing values,
+            # but we can't tell missing values apart from nulls.
+            raise Untranslatable("`is` requires loose `is` operators", node=node)
+        return (
+            f"({self.visit(left)} IS{' NOT' if isinstance(op, ast.IsNot) else ''} NULL)"
+        )
+
+    def _translate_in(self, left: ast.expr, right: ast.expr) -> str:
+        elts: list[Any]
+        if isinstance(right, FrozenValue) and isinstance(
+            right.value,
+            (tuple, frozenset),
+        ):
+            if not all(isinstance(item, _SCALAR_TYPES) for item in right.value):
+                raise Untranslatable("`in` is only supported with scalar items")
+            elts = [ast.Constant(value=item) for item in right.value]
+        elif isinstance(right, (ast.Tuple, ast.Set)):
+            elts = right.elts
+        else:
+            raise Untranslatable("`in` is only supported with literal containers")
+        # Nulls never compare equal in SQL, so they are checked separately.
+        # The placeholders must be generated in the order they appear in.
+        null_sql = (
+            f"{self.visit(left)} IS NULL OR " if any(_is_none(e) for e in elts) else ""
+        )
+        left_sql = self.visit(left)
+        items = [self.visit(elt) for elt in elts if not _is_none(elt)]
+        sql = (
+            f"COALESCE({left_sql} IN ({', '.join(items)}), FALSE)" if items else "FALSE"
+        )
+        return f"({null_sql}{sql})" if null_sql else sql
+
+    def visit_BinOp(self, node: ast.BinOp) -> str:  # noqa: D102
+        template = self.arithmetic_ops.get(type(node.op))
+        if template is None:
+            return self.generic_visit(node)
+        return template.format(self.visit(node.left), self.visit(node.right))
+
+    def visit_Call(self, node: ast.Call) -> str:  # noqa: D102
+        sql_name = (
+            self.functions.get(node.func.id)
+            if isinstance(node.func, ast.Name)
+            else None
+        )
+        if sql_name is None or node.keywords:
+            raise Untranslatable("Can't translate function call to SQL", node=node)
+        return f"{sql_name}({', '.join(self.visit(arg) for arg in node.args)})"
+
+    def visit_Name(self, node: ast.Name) -> str:  # noqa: D102
+        return self.get_column(node.id, node)
+
+    def visit_Attribute(self, node: ast.Attribute) -> str:  # noqa: D102
+        return self.get_column(expand_name(node), node)
+
+    def visit_Constant(self, node: ast.Constant) -> str:  # noqa: D102
+        if node.value is None:
+            return "NULL"
+        return self.add_param(node.value)
+
+
+def _is_none(node: ast.AST) -> bool:
+    return isinstance(node, ast.Constant) and node.value is None
+
+
+def translate_expression(
+    expression: str,
+    schema: Schema,
+    *,
+    functions: Mapping[str, str] | None = None,
+    evaluator: Evaluator | None = None,
+) -> SQLPredicate:
+    """
+    Verify an expression and translate it to a SQL predicate.
+
+    Raises `Untranslatable` if the expression can't be translated;
+    see `SQLTranslator` for details.
+
+    :param expression: The expression to translate.
+    :param schema: Mapping of value names to columns or JSON paths.
+    :param functions: Mapping of allowed function names to SQL function names.
+    :param evaluator: The evaluator to parse and verify the expression with;
+                      its universe should be a verifier universe.
+    """
+    if evaluator is None:
+        evaluator = Evaluator(VerifierUniverse())
+    tree = evaluator.compile_expression(expression)
+    evaluator.evaluate_tree(tree)
+    translator = SQLTranslator(
+        schema,
+        functions=functions,
+        loose_is_operator=evaluator.loose_is_operator,
+        loose_not_operator=evaluator.loose_not_operator,
+    )
+    return translator.translate(tree)
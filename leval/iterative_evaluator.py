@@ -0,0 +1,232 @@
+"""
+An evaluator that walks the tree with an explicit stack instead of recursion.
+"""
+
+from __future__ import annotations
+
+import ast
+from functools import partial
+from typing import Any, Callable, Generator
+
+from leval.evaluator import Evaluator
+from leval.excs import InvalidOperation, NoSuchValue
+from leval.nodes import FrozenValue, SharedSubexpression
+from leval.universe.base import MISSING
+from leval.universe.default import EvaluationUniverse
+
+# Generators evaluating a node; they yield child nodes to evaluate,
+# are sent the children's values (or thrown their errors),
+# and return the node's value.
+NodeGenerator = Generator[ast.AST, Any, Any]
+
+
+def _find_node_handlers(
+    cls: type[IterativeEvaluator],
+) -> tuple[dict[type, Callable[..., NodeGenerator]], dict[type, Callable]]:
+    """
+    Find the generator functions and leaf visitors to use for node types.
+
+    Node types missing from both are evaluated with `visit`.
+    """
+    handlers: dict[type, Callable[..., NodeGenerator]] = {}
+    leaves: dict[type, Callable] = {}
+    if cls.visit is not Evaluator.visit:
+        return handlers, leaves
+    for node_type in (
+        ast.Expression,
+        ast.BinOp,
+        ast.BoolOp,
+        ast.Compare,
+        ast.UnaryOp,
+        ast.Call,
+        ast.Set,
+        ast.Tuple,
+        SharedSubexpression,
+    ):
+        name = node_type.__name__
+        if getattr(cls, f"visit_{name}") is getattr(Evaluator, f"visit_{name}"):
+            handlers[node_type] = getattr(cls, f"_iterate_{name}")
+    for leaf_type in (ast.Constant, ast.Name, ast.Attribute, FrozenValue):
+        leaves[leaf_type] = getattr(cls, f"visit_{leaf_type.__name__}")
+    return handlers, leaves
+
+
+class IterativeEvaluator(Evaluator):
+    """
+    An evaluator that does not recurse through Python frames for each node.
+
+    Evaluation is driven by a loop over a stack of generators, one for each node
+    being evaluated, so deep trees don't risk `RecursionError`, and `max_depth`
+    can be set far higher than with `Evaluator`. The semantics (including
+    short-circuiting, the lazy argument getters passed to the universe, and
+    the depth and time limits) are the same.
+
+    `and`/`or` operations are short-circuited within the loop if the universe
+    uses the default `evaluate_bool_op`; otherwise, and for function arguments,
+    the universe gets getters that evaluate the operands with a nested loop.
+    Nodes whose `visit_*` methods are overridden by a subclass are evaluated
+    with those methods (and thus recursively).
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:  # noqa: D107
+        super().__init__(*args, **kwargs)
+        self._handlers, self._leaves = _find_node_handlers(type(self))
+        self._inline_bool_ops = False
+
+    def evaluate_tree(self, tree: ast.AST) -> Any:  # noqa: D102
+        if not self._handlers:
+            return super().evaluate_tree(tree)
+        self.begin_evaluation()
+        self._inline_bool_ops = (
+            type(self.universe).evaluate_bool_op is EvaluationUniverse.evaluate_bool_op
+        )
+        return self._run(tree, 0)
+
+    def _run(self, root: ast.AST, base_depth: int) -> Any:
+        """
+        Evaluate the subtree at `root`, whose depth in the whole tree is `base_depth`.
+        """
+        handlers, leaves = self._handlers, self._leaves
+        stack: list[NodeGenerator] = []
+        # The depths of the children of the nodes on the stack.
+        child_depths: list[int] = []
+        node: ast.AST | None = root
+        value: Any = None
+        error: Exception | None = None
+        while True:
+            if node is not None:
+                # Start evaluating a node; either a generator is pushed on the stack,
+                # or the value (or error) is known right away.
+                depth = child_depths[-1] if stack else base_depth
+                self.depth = depth
+                try:
+                    self.check_limits(node)
+                    handler = handlers.get(type(node))
+                    if handler is not None:
+                        stack.append(handler(self, node, depth))
+                        # Shared subexpressions don't count towards the depth.
+                        shared = type(node) is SharedSubexpression
+                        child_depths.append(depth if shared else depth + 1)
+                        value = None
+                    else:
+                        leaf = leaves.get(type(node))
+                        value = leaf(self, node) if leaf else self.visit(node)
+                except Exception as exc:  # noqa: BLE001
+                    error = exc
+                node = None
+            if not stack:
+                if error is not None:
+                    raise error
+                return value
+            # Resume the innermost node being evaluated with the value (or error).
+            try:
+                if error is not None:
+                    thrown, error = error, None
+                    node = stack[-1].throw(thrown)
+                else:
+                    node = stack[-1].send(value)
+            except StopIteration as stop:
+                stack.pop()
+                child_depths.pop()
+                value = stop.value
+            except Exception as exc:  # noqa: BLE001
+                stack.pop()
+                child_depths.pop()
+                error = exc
+
+    def _get_lookup_or_missing(self, node: ast.AST, depth: int) -> Any:
+        self.depth = depth
+        return self._get_value_or_missing(node)  # type: ignore[arg-type]
+
+    def _iterate_or_none(self, node: ast.AST, depth: int) -> NodeGenerator:
+        if isinstance(node, (ast.Name, ast.Attribute)):
+            value = self._get_lookup_or_missing(node, depth + 1)
+            return None if value is MISSING else value
+        try:
+            return (yield node)
+        except NoSuchValue:
+            return None
+
+    def _iterate_SharedSubexpression(
+        self,
+        node: SharedSubexpression,
+        depth: int,
+    ) -> NodeGenerator:
+        results = self.shared_results
+        if node.key in results:
+            return results[node.key]
+        value = results[node.key] = yield node.value
+        return value
+
+    def _iterate_Expression(self, node: ast.Expression, depth: int) -> NodeGenerator:
+        return (yield node.body)
+
+    def _iterate_BinOp(self, node: ast.BinOp, depth: int) -> NodeGenerator:
+        left = yield node.left
+        right = yield node.right
+        return self.universe.evaluate_binary_op(node.op, left, right)
+
+    def _iterate_BoolOp(self, node: ast.BoolOp, depth: int) -> NodeGenerator:
+        if self._inline_bool_ops and isinstance(node.op, (ast.And, ast.Or)):
+            # Same as `all(...)`/`any(...)` in `EvaluationUniverse.evaluate_bool_op`.
+            is_and = isinstance(node.op, ast.And)
+            for value_node in node.values:
+                if bool((yield value_node)) is not is_and:
+                    return not is_and
+            return is_and
+        value_getters: list[Callable[[], Any]] = [
+            partial(self._run, v, depth + 1) for v in node.values
+        ]
+        return self.universe.evaluate_bool_op(node.op, value_getters)
+
+    def _iterate_Compare(self, node: ast.Compare, depth: int) -> NodeGenerator:
+        if len(node.ops) != 1:
+            raise InvalidOperation("Only simple comparisons are supported", node=node)
+        op = node.ops[0]
+        if self.loose_is_operator and isinstance(op, (ast.Is, ast.IsNot)):
+            left = yield from self._iterate_or_none(node.left, depth)
+            right = yield from self._iterate_or_none(node.comparators[0], depth)
+        else:
+            left = yield node.left
+            right = yield node.comparators[0]
+        return self.universe.evaluate_binary_op(op, left, right)
+
+    def _iterate_UnaryOp(self, node: ast.UnaryOp, depth: int) -> NodeGenerator:
+        loose_not = self.loose_not_operator and isinstance(node.op, ast.Not)
+        if loose_not and isinstance(node.operand, (ast.Name, ast.Attribute)):
+            operand = self._get_lookup_or_missing(node.operand, depth + 1)
+            return True if operand is MISSING else not operand
+        try:
+            operand = yield node.operand
+        except NoSuchValue:
+            if loose_not:
+                return True
+            raise
+        return self.apply_unary_op(node, operand)
+
+    def _iterate_Call(self, node: ast.Call, depth: int) -> NodeGenerator:
+        if not isinstance(node.func, ast.Name):
+            raise InvalidOperation(f"Invalid call to func {node.func}", node=node)
+        if node.keywords:
+            raise InvalidOperation("Kwarg calls are not allowed", node=node)
+        arg_getters: list[Callable[[], Any]] = [
+            partial(self._run, arg, depth + 1) for arg in node.args
+        ]
+        return self.universe.evaluate_function(node.func.id, arg_getters)
+        yield  # pragma: no cover  # Make this a generator.
+
+    def _iterate_Set(self, node: ast.Set, depth: int) -> NodeGenerator:
+        if set not in self.allowed_container_types:
+            raise InvalidOperation("Set construction not allowed", node=node)
+        items = []
+        for elt in node.elts:
+            items.append((yield elt))
+        return self.universe.build_container(set, items)
+
+    def _iterate_Tuple(self, node: ast.Tuple, depth: int) -> NodeGenerator:
+        if tuple not in self.allowed_container_types:
+            raise InvalidOperation("Tuple construction not allowed", node=node)
+        items = []
+        for elt in node.elts:
+            items.append((yield elt))
+        return self.universe.build_container(tuple, items)
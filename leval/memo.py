@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import functools
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterable, NamedTuple
+
+SCOPE_EVALUATION = "evaluation"
+#: Results are kept as long as the `FunctionMemo` (and thus the universes sharing it).
+SCOPE_UNIVERSE = "universe"
+SCOPE_PROCESS = "process"
+MEMO_SCOPES = frozenset((SCOPE_EVALUATION, SCOPE_UNIVERSE, SCOPE_PROCESS))
+
+_missing = object()
+
+
+class CacheStats(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    maxsize: int
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        The fraction of lookups that were hits (0 if there were no lookups).
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class LRUCache:
+    """
+    A bounded, thread-safe least-recently-used cache with hit/miss statistics.
+    """
+
+    def __init__(self, maxsize: int = 128) -> None:  # noqa: D107
+        if maxsize < 1:
+            raise ValueError(f"maxsize must be positive, not {maxsize}")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: OrderedDict[Hashable, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:  # noqa: D105
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:  # noqa: D105
+        return key in self._data
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get the value for `key` (marking it recently used), or `default`.
+        """
+        with self._lock:
+            value = self._data.get(key, _missing)
+            if value is _missing:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Store a value, evicting the least recently used entry if the cache is full.
+        """
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def items(self) -> list[tuple[Hashable, Any]]:
+        """
+        Return a snapshot of the cached items, least recently used first.
+        """
+        with self._lock:
+            return list(self._data.items())
+
+    def clear(self) -> None:
+        """
+        Drop all entries. Statistics are retained.
+        """
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> CacheStats:  # noqa: D102
+        return CacheStats(
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            size=len(self._data),
+            maxsize=self.maxsize,
+        )
+
+
+def pure(func: Callable) -> Callable:
+    """
+    Mark a function as pure, i.e. its result only depends on its arguments.
+
+    Results of pure functions may be memoized or otherwise reused by the
+    evaluation machinery. The function is wrapped, not modified, so this
+    can also be used on builtins (e.g. `pure(abs)`).
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args):
+        return func(*args)
+
+    wrapper.__leval_pure__ = True  # type: ignore[attr-defined]
+    return wrapper
+
+
+def is_pure(func: Callable | None) -> bool:
+    """
+    Return whether the function has been marked pure with `pure()`.
+    """
+    return bool(getattr(func, "__leval_pure__", False))
+
+
+# Caches for memos with the process scope, keyed by function and maximum size.
+# Functions are referenced weakly, so their caches go away with them.
+_process_caches: weakref.WeakKeyDictionary[Callable, dict[int, LRUCache]] = (
+    weakref.WeakKeyDictionary()
+)
+_process_caches_lock = threading.Lock()
+
+
+def _get_process_cache(func: Callable, maxsize: int) -> LRUCache:
+    with _process_caches_lock:
+        try:
+            caches = _process_caches.setdefault(func, {})
+        except TypeError:  # The function can't be referenced weakly.
+            return LRUCache(maxsize)
+        cache = caches.get(maxsize)
+        if cache is None:
+            cache = caches[maxsize] = LRUCache(maxsize)
+        return cache
+
+
+class FunctionMemo:
+    def __init__(
+        self,
+        *,
+        pure_functions: Iterable[str] = (),
+        maxsize: int = 256,
+        scope: str = SCOPE_UNIVERSE,
+    ) -> None:
+        """
+        Initialize a memo for pure function results.
+
+        Functions are memoized if they are named in `pure_functions`
+        or have been marked with `pure()`.
+
+        :param pure_functions: Names of functions to consider pure.
+        :param maxsize: Maximum number of results to keep per function.
+        :param scope: How long results are kept: for a single evaluation
+                      ("evaluation"), for the lifetime of this memo ("universe";
+                      i.e. of the universes using it, if it isn't shared), or
+                      shared by all memos in the process ("process"). Process-wide
+                      results are kept per function and `maxsize`, for as long
+                      as the function exists; if the function can't be
+                      referenced weakly, results are kept for this memo only.
+        """
+        if scope not in MEMO_SCOPES:
+            raise ValueError(f"Invalid memo scope {scope!r}")
+        self.pure_functions = frozenset(pure_functions)
+        self.maxsize = maxsize
+        self.scope = scope
+        # Caches by function name, and by function for that name, as a shared memo
+        # may be used by universes with different functions of the same name.
+        self._caches: dict[str, list[tuple[Callable, LRUCache]]] = {}
+
+    def is_pure(self, name: str, func: Callable | None) -> bool:
+        """
+        Return whether the function named `name` should be considered pure.
+        """
+        return name in self.pure_functions or is_pure(func)
+
+    def begin_evaluation(self) -> None:
+        """
+        Signal that a new evaluation begins; drops evaluation-scoped results.
+        """
+        if self.scope == SCOPE_EVALUATION:
+            for entries in self._caches.values():
+                for _, cache in entries:
+                    cache.clear()
+
+    def _get_cache(self, name: str, func: Callable) -> LRUCache:
+        entries = self._caches.get(name)
+        if entries is None:
+            entries = self._caches[name] = []
+        for cached_func, cache in entries:
+            if cached_func is func:
+                return cache
+        if self.scope == SCOPE_PROCESS:
+            cache = _get_process_cache(func, self.maxsize)
+        else:
+            cache = LRUCache(self.maxsize)
+        entries.append((func, cache))
+        return cache
+
+    def call(self, name: str, func: Callable, args: list[Any]) -> Any:
+        """
+        Call `func` with `args`, reusing a previous result if it is pure.
+
+        Calls with unhashable arguments are not memoized.
+        """
+        if not self.is_pure(name, func):
+            return func(*args)
+        # Types are part of the key so e.g. `f(1)`, `f(1.0)` and `f(True)` differ.
+        key = tuple((type(arg), arg) for arg in args)
+        try:
+            hash(key)
+        except TypeError:
+            return func(*args)
+        cache = self._get_cache(name, func)
+        value = cache.get(key, _missing)
+        if value is _missing:
+            value = func(*args)
+            cache.put(key, value)
+        return value
+
+    def stats(self) -> dict[str, CacheStats]:
+        """
+        Get cache statistics for each memoized function by name.
+
+        If different functions have been memoized under the same name,
+        their statistics are added up.
+        """
+        return {
+            name: CacheStats(
+                *(sum(values) for values in zip(*(c.stats() for _, c in entries))),
+            )
+            for (name, entries) in self._caches.items()
+        }
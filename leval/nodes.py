@@ -0,0 +1,54 @@
+"""
+Additional AST node types produced by the optimization passes.
+"""
+
+from __future__ import annotations
+
+import ast
+from typing import Any, Iterable
+
+
+class FrozenValue(ast.expr):
+    """
+    A value computed ahead of evaluation, e.g. a constant container literal.
+
+    `container_types` lists the container types that were constructed to produce
+    the value, so the evaluator can still enforce its allowed container types.
+    """
+
+    _fields = ("value",)
+
+    def __init__(  # noqa: D107
+        self,
+        value: Any = None,
+        *,
+        container_types: Iterable[type] = (),
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(**kwargs)
+        self.value = value
+        self.container_types = frozenset(container_types)
+
+
+class SharedSubexpression(ast.expr):
+    """
+    A subtree that occurs several times in an expression, but is computed only once.
+
+    All occurrences refer to the same `value` subtree and `key`; the evaluator
+    caches the result by the key for the duration of a single evaluation.
+    The node itself does not count towards the evaluation depth.
+    """
+
+    _fields = ("value",)
+
+    def __init__(  # noqa: D107
+        self,
+        value: ast.expr | None = None,
+        *,
+        key: int = 0,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(**kwargs)
+        # The value is only None while unpickling.
+        self.value: ast.expr = value  # type: ignore[assignment]
+        self.key = key
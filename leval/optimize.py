@@ -0,0 +1,303 @@
+"""
+Optimization passes for parsed expressions.
+
+The passes transform a parsed tree into an equivalent one that is cheaper to
+evaluate repeatedly; see `Evaluator.compile_expression`.
+"""
+
+from __future__ import annotations
+
+import ast
+from collections import Counter
+from typing import Any, Callable, Hashable, Iterable, Iterator
+
+from leval.nodes import FrozenValue, SharedSubexpression
+
+
+def iter_post_order(tree: ast.AST) -> Iterator[ast.AST]:
+    """
+    Yield the nodes of `tree`, children before their parents, without recursion.
+    """
+    stack: list[tuple[ast.AST, bool]] = [(tree, False)]
+    while stack:
+        node, children_done = stack.pop()
+        if children_done:
+            yield node
+            continue
+        stack.append((node, True))
+        stack.extend((kid, False) for kid in ast.iter_child_nodes(node))
+
+
+def transform_post_order(
+    tree: ast.AST,
+    transform: Callable[[ast.AST], ast.AST],
+) -> ast.AST:
+    """
+    Replace each node in `tree` with `transform(node)`, children first.
+
+    Unlike `ast.NodeTransformer`, this does not recurse, so it works on trees
+    of any depth. The tree is modified in place, and the new root is returned.
+    """
+    # Entries are (node, parent, field, index in list field, children done).
+    stack: list[tuple[ast.AST, ast.AST | None, str, int | None, bool]] = [
+        (tree, None, "", None, False),
+    ]
+    new_root = tree
+    while stack:
+        node, parent, field, index, children_done = stack.pop()
+        if not children_done:
+            stack.append((node, parent, field, index, True))
+            for name, value in ast.iter_fields(node):
+                if isinstance(value, list):
+                    stack.extend(
+                        (item, node, name, i, False)
+                        for (i, item) in enumerate(value)
+                        if isinstance(item, ast.AST)
+                    )
+                elif isinstance(value, ast.AST):
+                    stack.append((value, node, name, None, False))
+            continue
+        new_node = transform(node)
+        if new_node is node:
+            continue
+        if parent is None:
+            new_root = new_node
+        elif index is None:
+            setattr(parent, field, new_node)
+        else:
+            getattr(parent, field)[index] = new_node
+    return new_root
+
+
+class ConstantContainerHoister:
+    """
+    Replace set and tuple literals consisting only of constants with `FrozenValue`s.
+
+    Sets become frozensets, so membership tests against them don't need to
+    rebuild the container on each evaluation. Since a frozenset doesn't behave
+    exactly like a set (e.g. it is hashable), only sets that are the right operand
+    of an `in` or `not in` are hoisted; other set literals are left as they are.
+
+    The tree is walked without recursion, so this works on trees of any depth.
+    """
+
+    def __init__(self, *, allowed_constant_types: Iterable[type]) -> None:  # noqa: D107
+        self.allowed_constant_types = tuple(allowed_constant_types)
+        # Ids of the set literals that may be hoisted.
+        self._membership_sets: set[int] = set()
+
+    def _get_element_values(self, node: ast.Set | ast.Tuple):
+        values: list[Any] = []
+        container_types: set[type] = set()
+        for elt in node.elts:
+            if isinstance(elt, ast.Constant):
+                if not isinstance(elt.value, self.allowed_constant_types):
+                    return None  # Leave it for the evaluator to complain about.
+                values.append(elt.value)
+            elif isinstance(elt, FrozenValue) and elt.container_types == {tuple}:
+                values.append(elt.value)  # Nested constant tuple.
+                container_types.add(tuple)
+            else:
+                return None
+        return values, container_types
+
+    def visit(self, node: ast.AST) -> ast.AST:
+        """
+        Transform the tree rooted at `node` (in place), returning the new root.
+        """
+        self._membership_sets = _find_membership_sets(node)
+        try:
+            return transform_post_order(node, self._transform)
+        finally:
+            self._membership_sets = set()
+
+    def _transform(self, node: ast.AST) -> ast.AST:
+        if isinstance(node, ast.Set):
+            if id(node) not in self._membership_sets:
+                return node
+            return self._hoist(node, set)
+        if isinstance(node, ast.Tuple):
+            return self._hoist(node, tuple)
+        return node
+
+    def _hoist(self, node: ast.Set | ast.Tuple, container_type: type) -> ast.AST:
+        # The children of the node have already been transformed.
+        result = self._get_element_values(node)
+        if result is None:
+            return node
+        values, container_types = result
+        try:
+            value = frozenset(values) if container_type is set else tuple(values)
+        except TypeError:  # unhashable set members
+            return node
+        container_types.add(container_type)
+        return ast.copy_location(
+            FrozenValue(value, container_types=container_types),
+            node,
+        )
+
+
+def _find_membership_sets(tree: ast.AST) -> set[int]:
+    """
+    Find the (ids of) set literals that are the container of an `in` or `not in`.
+    """
+    found: set[int] = set()
+    for node in iter_post_order(tree):
+        # Chained comparisons aren't supported by the evaluator.
+        if (
+            isinstance(node, ast.Compare)
+            and len(node.ops) == 1
+            and isinstance(node.ops[0], (ast.In, ast.NotIn))
+            and isinstance(node.comparators[0], ast.Set)
+        ):
+            found.add(id(node.comparators[0]))
+    return found
+
+
+def hoist_constant_containers(
+    tree: ast.AST,
+    *,
+    allowed_constant_types: Iterable[type],
+) -> ast.AST:
+    """
+    Replace constant set and tuple literals in `tree` with precomputed values.
+    """
+    hoister = ConstantContainerHoister(allowed_constant_types=allowed_constant_types)
+    return hoister.visit(tree)
+
+
+# Node types that are cheaper to evaluate again than to share.
+_UNSHARED_TYPES = (ast.Constant, ast.Name, FrozenValue, SharedSubexpression)
+
+
+def _get_field_key(value: Any, node_keys: dict[int, int]) -> Hashable:
+    if isinstance(value, ast.AST):
+        return node_keys[id(value)]
+    if isinstance(value, list):
+        return tuple(_get_field_key(item, node_keys) for item in value)
+    if isinstance(value, (float, complex)):
+        return (type(value), repr(value))  # Keep e.g. 0.0 and -0.0 apart.
+    return (type(value), value)
+
+
+class CommonSubexpressionSharer:
+    """
+    Replace repeated, structurally identical subtrees with `SharedSubexpression`s.
+
+    Only subtrees that are pure (i.e. only call functions for which
+    `is_pure_function` returns True) are shared, and only the largest
+    repeated subtrees; names and constants are cheap enough to not be shared.
+    The tree is walked without recursion.
+    """
+
+    def __init__(self, *, is_pure_function: Callable[[str], bool]) -> None:  # noqa: D107
+        self.is_pure_function = is_pure_function
+
+    def _analyze(self, tree: ast.AST) -> tuple[dict[int, int], set[int]]:
+        """
+        Find structural keys for all nodes, and the (ids of) pure nodes.
+        """
+        node_keys: dict[int, int] = {}
+        key_ids: dict[Hashable, int] = {}
+        pure: set[int] = set()
+        for node in iter_post_order(tree):
+            parts: list[Any] = [type(node)]
+            if isinstance(node, FrozenValue):
+                value_key: Any = (node.value, node.container_types)
+                try:
+                    hash(value_key)
+                except TypeError:  # Unhashable values are never considered equal.
+                    value_key = id(node)
+                parts.append(value_key)
+            else:
+                parts.extend(
+                    _get_field_key(value, node_keys)
+                    for (_, value) in ast.iter_fields(node)
+                )
+            node_keys[id(node)] = key_ids.setdefault(tuple(parts), len(key_ids))
+            if all(id(kid) in pure for kid in ast.iter_child_nodes(node)) and (
+                not isinstance(node, ast.Call)
+                or (
+                    isinstance(node.func, ast.Name)
+                    and not node.keywords
+                    and self.is_pure_function(node.func.id)
+                )
+            ):
+                pure.add(id(node))
+        return node_keys, pure
+
+    def visit(self, tree: ast.AST) -> ast.AST:
+        """
+        Transform the tree (in place), returning it.
+        """
+        node_keys, pure = self._analyze(tree)
+        counts = Counter(node_keys[id(node)] for node in iter_post_order(tree))
+        shared: dict[int, SharedSubexpression] = {}
+        # Replaced occurrences per key, as (wrapper, parent, field, index in list).
+        uses: dict[int, list[tuple[SharedSubexpression, ast.AST, str, int | None]]] = {}
+        # Walk top-down, so the largest repeated subtrees are shared first.
+        stack: list[ast.AST] = [tree]
+        while stack:
+            parent = stack.pop()
+            for node, field, list_index in _iter_child_slots(parent):
+                key = node_keys[id(node)]
+                if (
+                    counts[key] < 2
+                    or id(node) not in pure
+                    or not isinstance(node, ast.expr)
+                    or isinstance(node, _UNSHARED_TYPES)
+                ):
+                    stack.append(node)
+                    continue
+                wrapper = shared.get(key)
+                if wrapper is None:
+                    # First occurrence; subtrees of it may be shared elsewhere.
+                    wrapper = shared[key] = SharedSubexpression(node, key=len(shared))
+                    stack.append(node)
+                else:
+                    wrapper = SharedSubexpression(wrapper.value, key=wrapper.key)
+                ast.copy_location(wrapper, node)
+                _replace_field(parent, field, list_index, wrapper)
+                uses.setdefault(key, []).append((wrapper, parent, field, list_index))
+        for key_uses in uses.values():
+            if len(key_uses) == 1:
+                # The other occurrences were within an even larger shared subtree.
+                wrapper, parent, field, list_index = key_uses[0]
+                _replace_field(parent, field, list_index, wrapper.value)
+        return tree
+
+
+def _iter_child_slots(parent: ast.AST) -> Iterator[tuple[ast.AST, str, int | None]]:
+    """
+    Yield the child nodes of `parent` with their field names and list indices.
+    """
+    for field, value in ast.iter_fields(parent):
+        if isinstance(value, list):
+            for index, item in enumerate(value):
+                if isinstance(item, ast.AST):
+                    yield item, field, index
+        elif isinstance(value, ast.AST):
+            yield value, field, None
+
+
+def _replace_field(
+    parent: ast.AST,
+    field: str,
+    index: int | None,
+    node: ast.AST | None,
+) -> None:
+    if index is None:
+        setattr(parent, field, node)
+    else:
+        getattr(parent, field)[index] = node
+
+
+def share_common_subexpressions(
+    tree: ast.AST,
+    *,
+    is_pure_function: Callable[[str], bool],
+) -> ast.AST:
+    """
+    Arrange for repeated pure subtrees of `tree` to be computed only once.
+    """
+    return CommonSubexpressionSharer(is_pure_function=is_pure_function).visit(tree)
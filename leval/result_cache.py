@@ -0,0 +1,154 @@
+"""
+Caching of evaluation results by the values an expression actually refers to.
+"""
+
+from __future__ import annotations
+
+import ast
+import itertools
+import math
+import threading
+import weakref
+from typing import Any, NamedTuple
+
+from leval.dependencies import Name
+from leval.evaluator import Evaluator
+from leval.excs import InvalidAttribute
+from leval.memo import CacheStats, LRUCache
+from leval.universe.base import MISSING
+from leval.utils import expand_name
+
+_missing = object()
+
+# Types of values that can be part of a cache key as they are: equal values of
+# these types behave the same. (Floats need their sign too, for `0.0 != -0.0`.)
+_KEYABLE_TYPES = frozenset((type(None), bool, int, str, bytes))
+
+
+class ResultCacheStats(NamedTuple):
+    cache: CacheStats
+    #: Number of evaluations that could not use the cache, because the expression
+    #: calls impure functions or one of the values it refers to is not a scalar.
+    bypasses: int
+
+
+class _Plan(NamedTuple):
+    #: Identifies the tree in cache keys; unlike `id()`, never reused.
+    token: int
+    names: tuple[Name, ...]
+
+
+def get_referenced_names(
+    evaluator: Evaluator,
+    tree: ast.AST,
+) -> tuple[Name, ...] | None:
+    """
+    Find the value names the tree refers to, or None if its result can't be cached.
+
+    A result can't be cached if the tree calls functions the evaluator's
+    universe doesn't consider pure, or refers to attributes of non-names.
+    """
+    names: dict[Name, None] = {}
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, ast.Name):
+            names[node.id] = None
+        elif isinstance(node, ast.Attribute):
+            try:
+                names[expand_name(node)] = None
+            except InvalidAttribute:
+                return None
+        elif isinstance(node, ast.Call):
+            func = node.func
+            if not (
+                isinstance(func, ast.Name)
+                and evaluator.universe.is_pure_function(func.id)
+            ):
+                return None
+            stack.extend(node.args)
+        else:
+            stack.extend(ast.iter_child_nodes(node))
+    return tuple(names)
+
+
+class ResultCache:
+    def __init__(self, maxsize: int = 4096) -> None:
+        """
+        Initialize a bounded cache of evaluation results.
+
+        Results are keyed by the tree being evaluated and the values of only the
+        names it refers to, so evaluating a tree against values that differ only
+        in names it doesn't refer to skips the evaluation entirely. Trees that call
+        impure functions are never cached, and neither are errors. Only scalar
+        values (None, booleans, numbers, strings and bytes) are used in keys;
+        evaluations referring to other values (e.g. containers, whose equal
+        values may behave differently) bypass the cache.
+
+        The values are looked up with the universe's `get_value_or_missing` before
+        the evaluation begins, so the universe must already hold the values then
+        (universes that swap their values in `begin_evaluation`, such as
+        `SnapshotUniverse`, can't be used). A cache should only be used with
+        evaluators with the same configuration. Cached results are shared between
+        evaluations, so they must not be modified. The cache can be shared
+        between threads.
+
+        :param maxsize: Maximum number of results to keep; the least recently
+                        used ones are evicted first.
+        """
+        self._results = LRUCache(maxsize)
+        self._plans: weakref.WeakKeyDictionary[ast.AST, _Plan | None] = (
+            weakref.WeakKeyDictionary()
+        )
+        self._tokens = itertools.count()
+        self._bypasses = 0
+        self._lock = threading.Lock()
+
+    def _get_plan(self, evaluator: Evaluator, tree: ast.AST) -> _Plan | None:
+        with self._lock:
+            plan = self._plans.get(tree, _missing)
+            if plan is _missing:
+                names = get_referenced_names(evaluator, tree)
+                plan = _Plan(next(self._tokens), names) if names is not None else None
+                self._plans[tree] = plan
+            return plan  # type: ignore[return-value]
+
+    def _bypass(self, evaluator: Evaluator, tree: ast.AST) -> Any:
+        with self._lock:
+            self._bypasses += 1
+        return evaluator.evaluate_tree(tree)
+
+    def evaluate_tree(self, evaluator: Evaluator, tree: ast.AST) -> Any:
+        """
+        Evaluate the tree with the evaluator, reusing a previous result if possible.
+        """
+        plan = self._get_plan(evaluator, tree)
+        if plan is None:
+            return self._bypass(evaluator, tree)
+        get_value = evaluator.universe.get_value_or_missing
+        key: list[Any] = [plan.token]
+        for name in plan.names:
+            value = get_value(name)
+            value_type = type(value)
+            # Types are part of the key so e.g. `1`, `1.0` and `True` differ.
+            if value_type is float:
+                key.append((float, value, math.copysign(1.0, value)))
+            elif value_type in _KEYABLE_TYPES or value is MISSING:
+                key.append((value_type, value))
+            else:
+                return self._bypass(evaluator, tree)
+        key_tuple = tuple(key)
+        result = self._results.get(key_tuple, _missing)
+        if result is _missing:
+            result = evaluator.evaluate_tree(tree)
+            self._results.put(key_tuple, result)
+        return result
+
+    def clear(self) -> None:
+        """
+        Drop all cached results. Statistics are retained.
+        """
+        self._results.clear()
+
+    def stats(self) -> ResultCacheStats:  # noqa: D102
+        return ResultCacheStats(cache=self._results.stats(), bypasses=self._bypasses)
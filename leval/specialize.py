@@ -0,0 +1,262 @@
+"""
+Partial evaluation of expressions against a subset of known values.
+"""
+
+from __future__ import annotations
+
+import ast
+import copy
+from typing import TYPE_CHECKING, Any, Callable, Mapping
+
+from leval.excs import NoSuchValue
+from leval.nodes import FrozenValue
+from leval.universe.base import BaseEvaluationUniverse
+from leval.universe.default import EvaluationUniverse
+from leval.universe.simple import SimpleUniverse
+from leval.universe.verifier import VerifierUniverse
+from leval.utils import estimate_size
+
+if TYPE_CHECKING:
+    from leval.evaluator import Evaluator
+
+# Types of values that can be represented as `ast.Constant` nodes.
+_LITERAL_TYPES = (str, int, float, bool, type(None))
+
+
+class _Unknown(Exception):
+    """
+    Raised when a subtree depends on something that is not known yet.
+    """
+
+
+class _PartialUniverse(BaseEvaluationUniverse):
+    """
+    A universe that knows only some values, and can only call pure functions.
+
+    Operations are delegated to the real universe, so their semantics are unchanged.
+    """
+
+    def __init__(
+        self,
+        universe: BaseEvaluationUniverse,
+        known_values: Mapping[str | tuple, Any],
+        *,
+        use_ops: bool = False,
+    ) -> None:
+        self.universe = universe
+        self.known = SimpleUniverse(functions={}, values=dict(known_values))
+        # Whether to compute binary operations with the universe's `ops` table
+        # instead of `evaluate_binary_op`, which e.g. a verifier universe
+        # doesn't actually compute.
+        self.ops = getattr(universe, "ops", None) if use_ops else None
+
+    def get_value(self, name):
+        try:
+            return self.known.get_value(name)
+        except NoSuchValue:
+            raise _Unknown(name) from None
+
+    def evaluate_function(self, name, arg_getters):
+        if not self.universe.is_pure_function(name):
+            raise _Unknown(name)
+        return self.universe.evaluate_function(name, arg_getters)
+
+    def is_pure_function(self, name):
+        return self.universe.is_pure_function(name)
+
+    def evaluate_binary_op(self, op, left, right):
+        if self.ops is not None:
+            bin_op = self.ops.get(type(op))
+            if bin_op is None:
+                raise _Unknown(op)
+            return bin_op(left, right)
+        return self.universe.evaluate_binary_op(op, left, right)
+
+    def evaluate_bool_op(self, op, value_getters):
+        return self.universe.evaluate_bool_op(op, value_getters)
+
+
+def is_constant_node(node: ast.AST) -> bool:
+    """
+    Return whether the node is a constant or a precomputed value.
+    """
+    return isinstance(node, (ast.Constant, FrozenValue))
+
+
+class Specializer(ast.NodeTransformer):
+    """
+    Fold subtrees that only depend on known values and pure functions into constants.
+
+    Folding is done by evaluating the subtrees with a copy of the given evaluator,
+    so the results are exactly what full evaluation would produce. Subtrees that
+    would raise an error are left as-is, so the error is raised at evaluation time.
+
+    With `use_ops`, binary operations are computed with the universe's `ops` table,
+    and `and`/`or` of a verifier universe are assumed to have the usual semantics;
+    this allows folding with the verifier universe expressions are compiled with.
+    Results whose estimated size exceeds `max_size` bytes (if set) are not folded.
+    """
+
+    def __init__(  # noqa: D107
+        self,
+        evaluator: Evaluator,
+        known_values: Mapping[str | tuple, Any],
+        *,
+        use_ops: bool = False,
+        max_size: int = 0,
+    ) -> None:
+        universe = evaluator.universe
+        self.allowed_constant_types = tuple(evaluator.allowed_constant_types)
+        self.max_size = max_size
+        self.evaluator = copy.copy(evaluator)
+        self.evaluator.universe = _PartialUniverse(
+            universe,
+            known_values,
+            use_ops=use_ops,
+        )
+        # `and`/`or` with constant operands can only be simplified if we know
+        # the universe evaluates them with the usual short-circuiting semantics.
+        bool_op_methods: list[Callable] = [EvaluationUniverse.evaluate_bool_op]
+        if use_ops:
+            bool_op_methods.append(VerifierUniverse.evaluate_bool_op)
+        self.simplify_bool_ops = type(universe).evaluate_bool_op in bool_op_methods
+
+    def _make_constant(self, value: Any, node: ast.AST) -> ast.AST:
+        if type(value) in _LITERAL_TYPES and isinstance(
+            value,
+            self.allowed_constant_types,
+        ):
+            new_node: ast.AST = ast.Constant(value=value)
+        else:
+            new_node = FrozenValue(value)
+        return ast.copy_location(new_node, node)
+
+    def _fold(self, node: ast.AST) -> ast.AST:
+        try:
+            value = self.evaluator.evaluate_tree(node)
+        except Exception:  # noqa: BLE001
+            return node  # Not known, or an error to be raised at evaluation time.
+        if self.max_size and estimate_size(value) > self.max_size:
+            return node
+        if isinstance(value, set):
+            # A frozenset doesn't behave exactly like a set (e.g. it's hashable),
+            # so sets are built at evaluation time; see `visit_Compare`.
+            return node
+        return self._make_constant(value, node)
+
+    def _fold_if_constant(self, node: ast.AST, children: list[ast.expr]) -> ast.AST:
+        if all(is_constant_node(child) for child in children):
+            return self._fold(node)
+        return node
+
+    def generic_visit(self, node: ast.AST) -> ast.AST:  # noqa: D102
+        # Node types we don't know about are left for the evaluator to deal with.
+        return node
+
+    def visit_Expression(self, node: ast.Expression) -> ast.AST:  # noqa: D102
+        node.body = self.visit(node.body)
+        return node
+
+    def visit_Name(self, node: ast.Name) -> ast.AST:  # noqa: D102
+        return self._fold(node)
+
+    def visit_Attribute(self, node: ast.Attribute) -> ast.AST:  # noqa: D102
+        return self._fold(node)
+
+    def visit_BinOp(self, node: ast.BinOp) -> ast.AST:  # noqa: D102
+        node.left = self.visit(node.left)
+        node.right = self.visit(node.right)
+        return self._fold_if_constant(node, [node.left, node.right])
+
+    def visit_UnaryOp(self, node: ast.UnaryOp) -> ast.AST:  # noqa: D102
+        node.operand = self.visit(node.operand)
+        return self._fold_if_constant(node, [node.operand])
+
+    def visit_Compare(self, node: ast.Compare) -> ast.AST:  # noqa: D102
+        node.left = self.visit(node.left)
+        node.comparators = [self.visit(c) for c in node.comparators]
+        children = [node.left, *node.comparators]
+        if (
+            len(node.ops) == 1
+            and isinstance(node.ops[0], (ast.In, ast.NotIn))
+            and isinstance(node.comparators[0], ast.Set)
+        ):
+            # Membership in a set of constants can still be folded.
+            children[1:] = node.comparators[0].elts
+        return self._fold_if_constant(node, children)
+
+    def visit_Call(self, node: ast.Call) -> ast.AST:  # noqa: D102
+        node.args = [self.visit(arg) for arg in node.args]
+        if node.keywords:
+            return node
+        return self._fold_if_constant(node, node.args)
+
+    def _visit_container(self, node: ast.Set | ast.Tuple) -> ast.AST:
+        node.elts = [self.visit(elt) for elt in node.elts]
+        return self._fold_if_constant(node, node.elts)
+
+    def visit_Set(self, node: ast.Set) -> ast.AST:  # noqa: D102
+        return self._visit_container(node)
+
+    def visit_Tuple(self, node: ast.Tuple) -> ast.AST:  # noqa: D102
+        return self._visit_container(node)
+
+    def visit_BoolOp(self, node: ast.BoolOp) -> ast.AST:  # noqa: D102
+        values = [self.visit(value) for value in node.values]
+        if not self.simplify_bool_ops:
+            node.values = values
+            return self._fold_if_constant(node, values)
+        node.values = simplify_bool_op_values(node.op, values)
+        if all(is_constant_node(value) for value in node.values):
+            # Either all operands were neutral, or the first one was decisive.
+            is_and = isinstance(node.op, ast.And)
+            return self._make_constant(is_and if not node.values else not is_and, node)
+        return node
+
+
+def simplify_bool_op_values(
+    op: ast.boolop,
+    values: list[ast.expr],
+) -> list[ast.expr]:
+    """
+    Simplify the operands of an `and`/`or` with short-circuiting semantics.
+
+    Constant operands that can't affect the result are dropped, and operands after
+    a constant operand that decides the result are dropped, since they would never be
+    evaluated. Operands before a deciding constant are kept, since they may still
+    raise errors.
+    """
+    is_and = isinstance(op, ast.And)
+    kept: list[ast.expr] = []
+    for value in values:
+        if is_constant_node(value):
+            if bool(value.value) == is_and:  # type: ignore[attr-defined]
+                continue
+            kept.append(value)
+            break
+        kept.append(value)
+    return kept
+
+
+def specialize_tree(
+    evaluator: Evaluator,
+    tree: ast.AST,
+    known_values: Mapping[str | tuple, Any],
+) -> ast.AST:
+    """
+    Fold the parts of `tree` that only depend on `known_values`.
+
+    The tree is modified in place and returned.
+    """
+    return Specializer(evaluator, known_values).visit(tree)
+
+
+def fold_constants(evaluator: Evaluator, tree: ast.AST, *, max_size: int) -> ast.AST:
+    """
+    Fold the parts of `tree` that only consist of constants.
+
+    The evaluator's universe may be a verifier universe; binary operations are
+    computed with its `ops` table. Results larger than `max_size` bytes (estimated)
+    are left unfolded. The tree is modified in place and returned.
+    """
+    return Specializer(evaluator, {}, use_ops=True, max_size=max_size).visit(tree)
@@ -0,0 +1,142 @@
+"""
+Tiered evaluation: interpret rarely used expressions, compile frequently used ones.
+"""
+
+from __future__ import annotations
+
+import ast
+from collections import OrderedDict
+from typing import Any, NamedTuple
+
+from leval.evaluator import Evaluator
+
+# Count of an expression that failed to compile, and is never promoted.
+_UNPROMOTABLE = -1
+
+
+class TieredStats(NamedTuple):
+    #: Number of evaluations done by parsing and walking the expression.
+    interpreted: int
+    #: Number of evaluations done with a compiled tree.
+    compiled: int
+    #: Number of expressions compiled after reaching the threshold.
+    promotions: int
+    #: Number of compiled trees dropped to make room for others.
+    demotions: int
+    #: Number of expressions whose evaluations are being counted.
+    tracked: int
+    #: Number of expressions currently compiled.
+    promoted: int
+    #: Number of expressions that failed to compile, and are only interpreted.
+    failed_promotions: int = 0
+
+
+class TieredEvaluator:
+    def __init__(
+        self,
+        evaluator: Evaluator,
+        *,
+        threshold: int = 100,
+        max_promoted: int = 1024,
+        max_tracked: int = 65536,
+    ) -> None:
+        """
+        Initialize a tiered evaluator around an evaluator.
+
+        Expressions are evaluated by parsing and walking them (as with
+        `Evaluator.evaluate_expression`) until they have been evaluated `threshold`
+        times; after that, they are compiled with `Evaluator.compile_expression`,
+        and the compiled tree is reused. This way, expressions that are only
+        evaluated a few times don't pay for compilation, or take up memory.
+        Expressions that fail to compile (e.g. because compiling checks the depth
+        of branches that are never evaluated) keep being interpreted, so both tiers
+        give the same results.
+
+        Like the evaluator, this is not thread-safe.
+
+        :param evaluator: The evaluator to evaluate and compile expressions with.
+        :param threshold: Number of times an expression is interpreted before it's
+                          promoted, i.e. compiled. With 0, expressions are compiled
+                          on first use.
+        :param max_promoted: Maximum number of compiled trees to keep. When full,
+                             the least recently used expression is demoted, and has
+                             to reach the threshold again to be compiled again.
+        :param max_tracked: Maximum number of expressions to keep counts for; the
+                            counts of the least recently used ones are forgotten.
+        """
+        if max_promoted < 1 or max_tracked < 1:
+            raise ValueError("max_promoted and max_tracked must be positive")
+        self.evaluator = evaluator
+        self.threshold = threshold
+        self.max_promoted = max_promoted
+        self.max_tracked = max_tracked
+        self._counts: OrderedDict[str, int] = OrderedDict()
+        self._promoted: OrderedDict[str, ast.AST] = OrderedDict()
+        self.reset_stats()
+
+    def evaluate_expression(self, expression: str) -> Any:
+        """
+        Evaluate the expression with the tier it has reached.
+        """
+        tree = self._promoted.get(expression)
+        if tree is not None:
+            self._promoted.move_to_end(expression)
+        else:
+            count = self._counts.pop(expression, 0)
+            if count >= self.threshold:
+                tree = self._promote(expression)
+                if tree is None:
+                    count = _UNPROMOTABLE
+            if tree is None:
+                if count != _UNPROMOTABLE:
+                    count += 1
+                self._counts[expression] = count
+                while len(self._counts) > self.max_tracked:
+                    self._counts.popitem(last=False)
+                self._interpreted += 1
+                return self.evaluator.evaluate_expression(expression)
+        self._compiled += 1
+        return self.evaluator.evaluate_tree(tree)
+
+    def _promote(self, expression: str) -> ast.AST | None:
+        try:
+            tree = self.evaluator.compile_expression(expression)
+        except Exception:  # noqa: BLE001
+            # Compiling checks things (e.g. the depth of branches that aren't
+            # evaluated) eagerly, so interpreting may still succeed; any errors
+            # are raised by interpreting, so both tiers behave the same.
+            self._failed_promotions += 1
+            return None
+        self._promoted[expression] = tree
+        self._promotions += 1
+        while len(self._promoted) > self.max_promoted:
+            self._promoted.popitem(last=False)
+            self._demotions += 1
+        return tree
+
+    def is_promoted(self, expression: str) -> bool:
+        """
+        Return whether the expression is currently evaluated in compiled form.
+        """
+        return expression in self._promoted
+
+    def stats(self) -> TieredStats:  # noqa: D102
+        return TieredStats(
+            interpreted=self._interpreted,
+            compiled=self._compiled,
+            promotions=self._promotions,
+            demotions=self._demotions,
+            tracked=len(self._counts),
+            promoted=len(self._promoted),
+            failed_promotions=self._failed_promotions,
+        )
+
+    def reset_stats(self) -> None:
+        """
+        Reset the counters in the statistics; counts per expression are kept.
+        """
+        self._interpreted = 0
+        self._compiled = 0
+        self._promotions = 0
+        self._demotions = 0
+        self._failed_promotions = 0
@@ -1,13 +1,29 @@
 from __future__ import annotations
 
 import ast
-from typing import Any, Callable
+from typing import Any, Callable, Iterable
 
 from leval.excs import InvalidOperation, NoSuchFunction, NoSuchValue
 
 
+class _Missing:
+    def __repr__(self) -> str:
+        return "MISSING"
+
+
+#: Returned by `get_value_or_missing` for values that don't exist.
+MISSING: Any = _Missing()
+
+
 class BaseEvaluationUniverse:
-    def get_value(self, name: str | tuple[str]) -> Any:
+    def begin_evaluation(self) -> None:
+        """
+        Prepare for a new evaluation; called by the evaluator.
+
+        Does nothing by default, but can be overridden to reset per-evaluation state.
+        """
+
+    def get_value(self, name: str | tuple[str, ...]) -> Any:
         """
         Get the value for a given name.
 
@@ -16,6 +32,19 @@ class BaseEvaluationUniverse:
         """
         raise NoSuchValue(f"No value {name}")  # pragma: no cover
 
+    def get_value_or_missing(self, name: str | tuple[str, ...]) -> Any:
+        """
+        Get the value for a given name, or `MISSING` if there is no such value.
+
+        This is used where missing values are expected (e.g. loose `is` and `not`
+        operators), so universes where raising `NoSuchValue` is relatively costly
+        should override this.
+        """
+        try:
+            return self.get_value(name)
+        except NoSuchValue:
+            return MISSING
+
     def evaluate_function(self, name: str, arg_getters: list[Callable[[], Any]]) -> Any:
         """
         Evaluate a function with the given arguments.
@@ -25,6 +54,14 @@ class BaseEvaluationUniverse:
         """
         raise NoSuchFunction(f"No function {name}")  # pragma: no cover
 
+    def is_pure_function(self, name: str) -> bool:
+        """
+        Return whether the named function's result only depends on its arguments.
+
+        Results of pure functions may be reused instead of calling the function again.
+        """
+        return False
+
     def evaluate_binary_op(  # noqa: D102
         self,
         op: ast.AST,
@@ -36,6 +73,12 @@ class BaseEvaluationUniverse:
             node=op,
         )
 
+    def build_container(self, container_type: type, items: Iterable[Any]) -> Any:
+        """
+        Build a container (e.g. a set or a tuple) of the given items.
+        """
+        return container_type(items)
+
     def evaluate_bool_op(self, op: ast.AST, value_getters: list[Callable[[], Any]]):
         """
         Evaluate a boolean operation with the given arguments.
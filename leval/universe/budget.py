@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import ast
+import sys
+from typing import Any, Callable
+
+from leval.excs import MemoryBudgetExceeded
+from leval.universe.base import BaseEvaluationUniverse
+from leval.utils import estimate_size
+
+
+def _allocated_size(
+    value: Any,
+    inputs: tuple[Any, ...] = (),
+    *,
+    deep: bool = False,
+) -> int:
+    """
+    Estimate the memory newly allocated for a value produced from `inputs`.
+
+    A value that is one of its inputs (e.g. `max(s, s)`) allocates nothing.
+    Unless `deep` is set, a container only allocates itself, since its items
+    are references to values that have been accounted for when they were
+    produced; that doesn't hold for e.g. the results of functions.
+    """
+    if any(value is item for item in inputs):
+        return 0
+    return estimate_size(value) if deep else sys.getsizeof(value)
+
+
+def _recording(getter: Callable[[], Any], values: list[Any]) -> Callable[[], Any]:
+    # Wrap an argument getter to record the values it returns.
+    def get() -> Any:
+        value = getter()
+        values.append(value)
+        return value
+
+    return get
+
+
+class MemoryBudgetMixin(BaseEvaluationUniverse):
+    """
+    Mix in limits for the memory allocated by operations during an evaluation.
+
+    The memory newly allocated by binary operations, function calls and container
+    construction is estimated (references to existing values are free; the items
+    of containers returned by functions are included), and
+    `MemoryBudgetExceeded` is raised if a single new value is larger than
+    `max_value_size`, or if the allocations during one evaluation add up to more
+    than `max_memory` bytes. A limit of 0 disables it.
+    """
+
+    max_memory: int = 0
+    max_value_size: int = 0
+
+    def __init__(
+        self,
+        *args: Any,
+        max_memory: int | None = None,
+        max_value_size: int | None = None,
+        **kwargs: Any,
+    ) -> None:
+        """
+        Initialize the universe, optionally overriding the class-level limits.
+        """
+        super().__init__(*args, **kwargs)
+        if max_memory is not None:
+            self.max_memory = max_memory
+        if max_value_size is not None:
+            self.max_value_size = max_value_size
+        self.memory_used = 0
+
+    def begin_evaluation(self) -> None:  # noqa: D102
+        super().begin_evaluation()
+        self.memory_used = 0
+
+    def _check_budget(self, size: int) -> None:
+        if self.max_value_size and size > self.max_value_size:
+            raise MemoryBudgetExceeded(
+                f"Value is too large ({size} > {self.max_value_size} bytes)",
+            )
+        if self.max_memory and self.memory_used + size > self.max_memory:
+            raise MemoryBudgetExceeded(
+                f"Evaluation exceeded memory budget "
+                f"({self.memory_used + size} > {self.max_memory} bytes)",
+            )
+
+    def account(
+        self,
+        value: Any,
+        inputs: tuple[Any, ...] = (),
+        *,
+        deep: bool = False,
+    ) -> Any:
+        """
+        Count the memory allocated for a value made from `inputs` against the budget.
+
+        With `deep`, the items of a container value are counted too.
+        """
+        if self.max_memory or self.max_value_size:
+            size = _allocated_size(value, inputs, deep=deep)
+            self._check_budget(size)
+            self.memory_used += size
+        return value
+
+    def evaluate_binary_op(self, op, left, right):  # noqa: D102
+        if (
+            (self.max_memory or self.max_value_size)
+            and isinstance(op, ast.Add)
+            and isinstance(left, (str, bytes))
+            and isinstance(right, (str, bytes))
+        ):
+            # Refuse to even allocate e.g. an overly long concatenated string.
+            self._check_budget(sys.getsizeof(left) + sys.getsizeof(right))
+        result = super().evaluate_binary_op(op, left, right)
+        return self.account(result, (left, right))
+
+    def evaluate_function(self, name, arg_getters):  # noqa: D102
+        if not (self.max_memory or self.max_value_size):
+            return super().evaluate_function(name, arg_getters)
+        args = []
+        result = super().evaluate_function(
+            name,
+            [_recording(getter, args) for getter in arg_getters],
+        )
+        return self.account(result, tuple(args), deep=True)
+
+    def build_container(self, container_type, items):  # noqa: D102
+        return self.account(super().build_container(container_type, items))
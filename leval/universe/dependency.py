@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from typing import Callable
+
+from leval.universe.verifier import VerifierUniverse
+
+
+class DependencyRecordingUniverse(VerifierUniverse):
+    """
+    A verifier universe that records the names and functions it is asked for.
+    """
+
+    def __init__(self) -> None:  # noqa: D107
+        super().__init__()
+        self.names: set[str | tuple[str, ...]] = set()
+        self.functions: set[str] = set()
+
+    def get_value(self, name):  # noqa: D102
+        self.names.add(name)
+        return super().get_value(name)
+
+    def evaluate_function(self, name: str, arg_getters: list[Callable]):  # noqa: D102
+        self.functions.add(name)
+        return super().evaluate_function(name, arg_getters)
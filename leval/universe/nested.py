@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Iterable, Mapping, Union
+
+from leval.excs import NoSuchValue
+from leval.memo import FunctionMemo
+from leval.universe.base import MISSING, BaseEvaluationUniverse
+from leval.universe.simple import SimpleUniverse
+
+_missing = object()
+
+
+class ValueTrie:
+    """
+    A prefix tree of values keyed by name parts.
+
+    A trie can be built once and shared by many universes,
+    so the source data does not need to be flattened to tuple keys.
+    """
+
+    __slots__ = ("children", "value")
+
+    def __init__(self) -> None:  # noqa: D107
+        self.children: dict[str, ValueTrie] = {}
+        self.value: Any = _missing
+
+    @classmethod
+    def from_mapping(cls, values: Mapping) -> ValueTrie:
+        """
+        Build a trie from a mapping.
+
+        Names resolve the same way as with the mapping itself in a `NestedUniverse`:
+        nested mappings become subtrees (e.g. `{"a": {"b": 1}}` is `a.b`), while
+        also remaining values themselves (`a` is `{"b": 1}`), and top-level tuple
+        keys are inserted as paths (e.g. `{("a", "b"): 1}`), unless the path is
+        also reached through nested mappings, which take precedence.
+        """
+        trie = cls()
+        trie.update(values)
+        return trie
+
+    def update(self, values: Mapping) -> None:
+        """
+        Insert the values from (possibly nested) `values` into this trie.
+        """
+        # Tuple keys first, so values reached through nested mappings replace them.
+        for key, value in values.items():
+            if isinstance(key, tuple):
+                self._get_or_create_path(key).value = value
+        stack: list[tuple[ValueTrie, Mapping]] = [(self, values)]
+        while stack:
+            node, mapping = stack.pop()
+            for key, value in mapping.items():
+                if not isinstance(key, str):
+                    continue  # Only top-level tuple keys are paths.
+                child = node.children.get(key)
+                if child is None:
+                    child = node.children[key] = ValueTrie()
+                child.value = value
+                if isinstance(value, Mapping):
+                    stack.append((child, value))
+
+    def insert(self, parts: Iterable[str], value: Any) -> None:
+        """
+        Insert a single value at the given path.
+        """
+        self._get_or_create_path(parts).value = value
+
+    def _get_or_create_path(self, parts: Iterable[str]) -> ValueTrie:
+        node = self
+        for part in parts:
+            child = node.children.get(part)
+            if child is None:
+                child = node.children[part] = ValueTrie()
+            node = child
+        return node
+
+    def lookup(self, name: str | tuple[str, ...]) -> Any:
+        """
+        Look up the value for a plain or dotted name, raising `KeyError` if not found.
+        """
+        value = self.get(name, _missing)
+        if value is _missing:
+            raise KeyError(name)
+        return value
+
+    def get(self, name: str | tuple[str, ...], default: Any = None) -> Any:
+        """
+        Look up the value for a plain or dotted name, returning `default` if not found.
+        """
+        node: ValueTrie | None
+        if isinstance(name, str):
+            node = self.children.get(name)
+        else:
+            node = self
+            for part in name:
+                node = node.children.get(part)
+                if node is None:
+                    break
+        if node is None or node.value is _missing:
+            return default
+        return node.value
+
+
+NestedValues = Union[Mapping[str, Any], ValueTrie]
+
+
+def _lookup_nested(values: Mapping, name: str | tuple[str, ...]) -> Any:
+    """
+    Look up a plain or dotted name in nested mappings, returning `MISSING` if absent.
+
+    A dotted name is resolved by walking the nested mappings (`{"a": {"b": ...}}`
+    for `a.b`) one part at a time. Only if that fails, it's looked up as a tuple key
+    (`("a", "b")`) in the top-level mapping.
+    """
+    if isinstance(name, str):
+        return values.get(name, MISSING)
+    value: Any = values
+    for part in name:
+        if not isinstance(value, Mapping):
+            break
+        value = value.get(part, MISSING)
+    else:
+        if value is not MISSING:
+            return value
+    return values.get(name, MISSING)
+
+
+class NestedUniverse(SimpleUniverse):
+    def __init__(
+        self,
+        *,
+        functions: dict[str, Callable],
+        values: NestedValues,
+        memo: FunctionMemo | None = None,
+    ):
+        """
+        Initialize a universe that resolves dotted names through nested mappings.
+
+        Instead of flattening e.g. `{"a": {"b": 1}}` to `{("a", "b"): 1}` ahead of time,
+        the lookup of `a.b` walks the mappings. Top-level tuple keys can also be used;
+        they are only looked up if walking the mappings doesn't find the name. Only
+        mappings are walked; attributes of other objects are never accessed.
+
+        :param functions: Mapping of function names to functions.
+        :param values: Nested mapping of values, or a prebuilt `ValueTrie`.
+        :param memo: Optional memo for the results of pure functions.
+        """
+        super().__init__(functions=functions, values=values, memo=memo)  # type: ignore[arg-type]
+
+    def get_value(self, name):  # noqa: D102
+        values = self.values
+        if isinstance(values, ValueTrie):
+            value = values.get(name, MISSING)
+        else:
+            value = _lookup_nested(values, name)
+        if value is MISSING:
+            raise NoSuchValue(f"No value {name}")
+        return value
+
+    def get_value_or_missing(self, name):  # noqa: D102
+        if type(self).get_value is not NestedUniverse.get_value:
+            # A subclass has customized lookups, so we can't take the shortcut.
+            return BaseEvaluationUniverse.get_value_or_missing(self, name)
+        values = self.values
+        if isinstance(values, ValueTrie):
+            return values.get(name, MISSING)
+        return _lookup_nested(values, name)
@@ -3,6 +3,8 @@ from __future__ import annotations
 from typing import Any, Callable
 
 from leval.excs import NoSuchFunction, NoSuchValue
+from leval.memo import FunctionMemo, is_pure
+from leval.universe.base import MISSING
 from leval.universe.default import EvaluationUniverse
 
 
@@ -12,6 +14,7 @@ class SimpleUniverse(EvaluationUniverse):
         *,
         functions: dict[str, Callable],
         values: dict[str | tuple, Any],
+        memo: FunctionMemo | None = None,
     ):
         """
         Initialize a simple evaluation universe.
@@ -21,10 +24,22 @@ class SimpleUniverse(EvaluationUniverse):
 
         :param functions: Mapping of function names to functions.
         :param values: Mapping of value names to values.
+        :param memo: Optional memo for the results of pure functions.
         """
         super().__init__()
         self.functions = functions
         self.values = values
+        self.memo = memo
+
+    def bind_values(self, values: dict[str | tuple, Any]) -> None:
+        """
+        Replace the values of this universe, so it can be reused for new values.
+        """
+        self.values = values
+
+    def begin_evaluation(self) -> None:  # noqa: D102
+        if self.memo is not None:
+            self.memo.begin_evaluation()
 
     def get_value(self, name):  # noqa: D102
         try:
@@ -32,8 +47,30 @@ class SimpleUniverse(EvaluationUniverse):
         except KeyError:
             raise NoSuchValue(f"No value {name}") from None
 
+    def get_value_or_missing(self, name):  # noqa: D102
+        if type(self).get_value is not SimpleUniverse.get_value:
+            # A subclass has customized lookups, so we can't take the shortcut.
+            return super().get_value_or_missing(name)
+        return self.values.get(name, MISSING)
+
     def evaluate_function(self, name, arg_getters):  # noqa: D102
         func = self.functions.get(name)
         if not func:
             raise NoSuchFunction(f"No function {name}")
-        return func(*[getter() for getter in arg_getters])
+        return self.call_function(name, func, [getter() for getter in arg_getters])
+
+    def call_function(self, name: str, func: Callable, args: list[Any]) -> Any:
+        """
+        Call the function `func` (registered as `name`) with evaluated arguments.
+        """
+        if self.memo is not None:
+            return self.memo.call(name, func, args)
+        return func(*args)
+
+    def is_pure_function(self, name: str) -> bool:  # noqa: D102
+        func = self.functions.get(name)
+        if func is None:
+            return False
+        if self.memo is not None:
+            return self.memo.is_pure(name, func)
+        return is_pure(func)
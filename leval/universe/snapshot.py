@@ -0,0 +1,403 @@
+"""
+Read-only values snapshots in shared memory, for sharing values between processes.
+
+A `SnapshotPublisher` serializes a values mapping into a shared memory segment in
+a compact hashed layout, and `SnapshotReader`s in other processes look values up
+in it without unpickling (or copying) the whole mapping; only the looked up values
+are decoded. Publishing a new version swaps the segment that readers see.
+
+Values other than `None`, booleans, integers, floats and strings are pickled,
+and unpickled from the shared memory, so only read snapshots published by
+trusted processes.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+import struct
+import time
+from multiprocessing import shared_memory
+from typing import Any, Callable, Iterator, Mapping
+
+from leval.memo import FunctionMemo
+from leval.universe.simple import SimpleUniverse
+
+_MAGIC = b"LVS1"
+# Magic, number of entries, number of hash table slots.
+_HEADER = struct.Struct("<4sQQ")
+# Hash of the key (never 0, which marks an empty slot), offset of the record.
+_SLOT = struct.Struct("<QQ")
+_LENGTH = struct.Struct("<I")
+_INT = struct.Struct("<q")
+_FLOAT = struct.Struct("<d")
+_TAG_INT, _TAG_FLOAT, _TAG_STR, _TAG_PICKLE = b"ifsp"
+_CONSTANTS = {ord("n"): None, ord("T"): True, ord("F"): False}
+# The control segment has a sequence number (odd while being updated), and a pointer
+# to the current snapshot: its version, and the length of its segment's name,
+# followed by the name.
+_SEQUENCE = struct.Struct("<Q")
+_POINTER = struct.Struct("<QB")
+_CONTROL = struct.Struct("<QQB")
+_CONTROL_SIZE = _CONTROL.size + 255
+
+_missing = object()
+
+# Names of the segments created by this process; see `_attach`.
+_created_segments: set[str] = set()
+
+
+def _encode_key(key: str | tuple[str, ...]) -> bytes:
+    if isinstance(key, str):
+        return b"s" + key.encode("utf-8")
+    if isinstance(key, tuple) and all(isinstance(part, str) for part in key):
+        encoded_parts = [part.encode("utf-8") for part in key]
+        return b"t" + b"".join(_LENGTH.pack(len(p)) + p for p in encoded_parts)
+    raise TypeError(f"Snapshot keys must be strings or tuples of strings: {key!r}")
+
+
+def _decode_key(data: bytes) -> str | tuple[str, ...]:
+    if data[:1] == b"s":
+        return data[1:].decode("utf-8")
+    parts = []
+    offset = 1
+    while offset < len(data):
+        (length,) = _LENGTH.unpack_from(data, offset)
+        offset += _LENGTH.size
+        parts.append(data[offset : offset + length].decode("utf-8"))
+        offset += length
+    return tuple(parts)
+
+
+def _encode_value(value: Any) -> bytes:
+    # Common scalars are stored as is; they are smaller and faster to decode.
+    value_type = type(value)
+    if value is None:
+        return b"n"
+    if value_type is bool:
+        return b"T" if value else b"F"
+    if value_type is int and -(2**63) <= value < 2**63:
+        return b"i" + _INT.pack(value)
+    if value_type is float:
+        return b"f" + _FLOAT.pack(value)
+    if value_type is str:
+        return b"s" + value.encode("utf-8")
+    return b"p" + pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _decode_value(data: memoryview) -> Any:
+    tag = data[0]
+    if tag == _TAG_INT:
+        return _INT.unpack_from(data, 1)[0]
+    if tag == _TAG_FLOAT:
+        return _FLOAT.unpack_from(data, 1)[0]
+    if tag == _TAG_STR:
+        return str(data[1:], "utf-8")
+    if tag == _TAG_PICKLE:
+        return pickle.loads(data[1:])
+    return _CONSTANTS[tag]
+
+
+def _hash_key(encoded_key: bytes) -> int:
+    # Unlike `hash()`, this is the same in every process.
+    digest = hashlib.blake2b(encoded_key, digest_size=8).digest()
+    return int.from_bytes(digest, "little") or 1
+
+
+def build_snapshot(values: Mapping[str | tuple[str, ...], Any]) -> bytes:
+    """
+    Serialize the values into the snapshot layout.
+
+    The layout is a header, an open addressing hash table (with linear probing),
+    and the records (the encoded key and value) the table points to.
+    """
+    records = bytearray()
+    entries = []
+    for key, value in values.items():
+        encoded_key = _encode_key(key)
+        encoded_value = _encode_value(value)
+        entries.append((_hash_key(encoded_key), len(records)))
+        records += _LENGTH.pack(len(encoded_key)) + encoded_key
+        records += _LENGTH.pack(len(encoded_value)) + encoded_value
+    n_slots = 8
+    while n_slots * 2 < len(entries) * 3:  # Keep the table at most 2/3 full.
+        n_slots *= 2
+    table = bytearray(n_slots * _SLOT.size)
+    records_offset = _HEADER.size + len(table)
+    for key_hash, record_offset in entries:
+        slot = key_hash & (n_slots - 1)
+        while _SLOT.unpack_from(table, slot * _SLOT.size)[0]:
+            slot = (slot + 1) & (n_slots - 1)
+        _SLOT.pack_into(
+            table,
+            slot * _SLOT.size,
+            key_hash,
+            records_offset + record_offset,
+        )
+    return _HEADER.pack(_MAGIC, len(entries), n_slots) + table + records
+
+
+def _get_buffer(segment: shared_memory.SharedMemory) -> memoryview:
+    buf = segment.buf
+    assert buf is not None, "segment is closed"
+    return buf
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """
+    Attach to an existing shared memory segment without taking ownership of it.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # type: ignore[call-arg]
+    except TypeError:  # Python < 3.13 has no `track`.
+        pass
+    segment = shared_memory.SharedMemory(name=name)
+    if os.name == "posix" and name not in _created_segments:
+        # Otherwise the resource tracker would unlink the segment
+        # when this process exits, although the publisher still owns it.
+        from multiprocessing import resource_tracker
+
+        resource_tracker.unregister(segment._name, "shared_memory")  # type: ignore[attr-defined]
+    return segment
+
+
+def _close_segment(segment: shared_memory.SharedMemory) -> None:
+    try:
+        segment.close()
+    except BufferError:
+        pass  # Views of it are still alive; it's unmapped once they're gone.
+
+
+class ValuesSnapshot(Mapping):
+    """
+    A read-only mapping over a snapshot in a shared memory segment.
+    """
+
+    def __init__(self, segment: shared_memory.SharedMemory, version: int) -> None:
+        """
+        Initialize a mapping over the snapshot in the segment.
+
+        :param segment: The shared memory segment containing the snapshot.
+        :param version: The version of the snapshot.
+        """
+        header = _HEADER.unpack_from(_get_buffer(segment), 0)
+        magic, self._length, self._n_slots = header
+        if magic != _MAGIC:
+            raise ValueError(f"Shared memory segment {segment.name} is not a snapshot")
+        self.segment = segment
+        self.version = version
+
+    def _read_bytes(self, offset: int) -> tuple[memoryview, int]:
+        buf = _get_buffer(self.segment)
+        (length,) = _LENGTH.unpack_from(buf, offset)
+        offset += _LENGTH.size
+        return buf[offset : offset + length], offset + length
+
+    def get(self, key: Any, default: Any = None) -> Any:  # noqa: D102
+        try:
+            encoded_key = _encode_key(key)
+        except TypeError:
+            return default
+        key_hash = _hash_key(encoded_key)
+        buf = _get_buffer(self.segment)
+        mask = self._n_slots - 1
+        slot = key_hash & mask
+        while True:
+            slot_hash, offset = _SLOT.unpack_from(buf, _HEADER.size + slot * _SLOT.size)
+            if not slot_hash:
+                return default
+            if slot_hash == key_hash:
+                record_key, offset = self._read_bytes(offset)
+                if record_key == encoded_key:
+                    return _decode_value(self._read_bytes(offset)[0])
+            slot = (slot + 1) & mask
+
+    def __getitem__(self, key: Any) -> Any:  # noqa: D105
+        value = self.get(key, _missing)
+        if value is _missing:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: Any) -> bool:  # noqa: D105
+        return self.get(key, _missing) is not _missing
+
+    def __len__(self) -> int:  # noqa: D105
+        return self._length
+
+    def __iter__(self) -> Iterator[str | tuple[str, ...]]:  # noqa: D105
+        buf = _get_buffer(self.segment)
+        for slot in range(self._n_slots):
+            slot_hash, offset = _SLOT.unpack_from(buf, _HEADER.size + slot * _SLOT.size)
+            if slot_hash:
+                yield _decode_key(bytes(self._read_bytes(offset)[0]))
+
+
+class SnapshotPublisher:
+    def __init__(self, name: str | None = None) -> None:
+        """
+        Initialize a publisher of values snapshots.
+
+        The publisher owns the shared memory segments; they are removed when it is
+        closed. Readers find the current snapshot through a small control segment
+        with the given name (a random one by default; see `name`). Keep names short,
+        as some platforms limit their length.
+
+        :param name: Name of the control segment.
+        """
+        self._control = shared_memory.SharedMemory(
+            name=name,
+            create=True,
+            size=_CONTROL_SIZE,
+        )
+        _created_segments.add(self._control.name)
+        self.name = self._control.name
+        self.version = 0
+        self._segment: shared_memory.SharedMemory | None = None
+
+    def publish(self, values: Mapping[str | tuple[str, ...], Any]) -> int:
+        """
+        Publish a new snapshot of the values, returning its version.
+
+        Readers see either the previous snapshot or the new one, never a mix.
+        The previous segment is unlinked; readers that still use it can do so
+        until they switch to the new one.
+        """
+        data = build_snapshot(values)
+        segment = shared_memory.SharedMemory(create=True, size=len(data))
+        _created_segments.add(segment.name)
+        _get_buffer(segment)[: len(data)] = data
+        encoded_name = segment.name.encode("utf-8")
+        buf = _get_buffer(self._control)
+        (sequence,) = _SEQUENCE.unpack_from(buf, 0)
+        # A seqlock; readers retry if the sequence is odd or changes while reading.
+        _SEQUENCE.pack_into(buf, 0, sequence + 1)
+        self.version += 1
+        _POINTER.pack_into(buf, _SEQUENCE.size, self.version, len(encoded_name))
+        buf[_CONTROL.size : _CONTROL.size + len(encoded_name)] = encoded_name
+        _SEQUENCE.pack_into(buf, 0, sequence + 2)
+        self._release_segment()
+        self._segment = segment
+        return self.version
+
+    def _release_segment(self) -> None:
+        if self._segment is not None:
+            self._segment.close()
+            self._segment.unlink()
+            _created_segments.discard(self._segment.name)
+            self._segment = None
+
+    def close(self) -> None:
+        """
+        Remove the published snapshot and the control segment.
+        """
+        self._release_segment()
+        self._control.close()
+        self._control.unlink()
+        _created_segments.discard(self._control.name)
+
+
+class SnapshotReader:
+    #: Number of times to try reading the snapshot pointer while it's being updated
+    #: (yielding to other threads in between) before giving up.
+    max_attempts = 10_000
+
+    def __init__(self, name: str) -> None:
+        """
+        Initialize a reader of the snapshots published under the given name.
+
+        Readers can be pickled (e.g. to be passed to worker processes);
+        the unpickled reader attaches to the same snapshots.
+
+        :param name: The name of the publisher's control segment.
+        """
+        self.name = name
+        self._control = _attach(name)
+        self._sequence = -1
+        self._snapshot: ValuesSnapshot | None = None
+
+    def __reduce__(self) -> tuple[type, tuple[str]]:  # noqa: D105
+        return (type(self), (self.name,))
+
+    def current(self) -> ValuesSnapshot:
+        """
+        Get the most recently published snapshot.
+
+        Checking for a new version is cheap, so this can be called often. When a new
+        version is picked up, the previous snapshot is closed, so a snapshot must
+        not be used after the next call; use a separate reader in each thread.
+        """
+        buf = _get_buffer(self._control)
+        for attempt in range(self.max_attempts):
+            if attempt:
+                time.sleep(0)  # Let the publisher finish its update.
+            sequence, version, name_length = _CONTROL.unpack_from(buf, 0)
+            if sequence == self._sequence and self._snapshot is not None:
+                return self._snapshot
+            if sequence % 2:
+                continue  # Being updated.
+            if not version:
+                raise LookupError(f"Nothing has been published to {self.name}")
+            name = bytes(buf[_CONTROL.size : _CONTROL.size + name_length])
+            if _SEQUENCE.unpack_from(buf, 0)[0] != sequence:
+                continue  # Updated while we were reading.
+            try:
+                segment = _attach(name.decode("utf-8"))
+            except FileNotFoundError:
+                continue  # Already replaced by a newer version.
+            previous = self._snapshot
+            self._snapshot = ValuesSnapshot(segment, version)
+            self._sequence = sequence
+            if previous is not None:
+                _close_segment(previous.segment)
+            return self._snapshot
+        raise TimeoutError(
+            f"Could not read the current snapshot of {self.name} "
+            f"in {self.max_attempts} attempts",
+        )
+
+    def close(self) -> None:
+        """
+        Detach from the control segment and the current snapshot.
+        """
+        if self._snapshot is not None:
+            _close_segment(self._snapshot.segment)
+            self._snapshot = None
+        self._control.close()
+
+
+class SnapshotUniverse(SimpleUniverse):
+    def __init__(
+        self,
+        *,
+        functions: dict[str, Callable],
+        reader: SnapshotReader | str,
+        memo: FunctionMemo | None = None,
+    ):
+        """
+        Initialize a universe whose values come from a shared memory snapshot.
+
+        The most recent snapshot is picked up at the beginning of each evaluation,
+        so a single evaluation always sees a single version of the values.
+
+        :param functions: Mapping of function names to functions.
+        :param reader: The snapshot reader, or the name of the snapshots to read.
+        :param memo: Optional memo for the results of pure functions.
+        """
+        if isinstance(reader, str):
+            reader = SnapshotReader(reader)
+        self.reader = reader
+        super().__init__(functions=functions, values=reader.current(), memo=memo)  # type: ignore[arg-type]
+
+    def __getstate__(self) -> dict[str, Any]:  # noqa: D105
+        state = self.__dict__.copy()
+        del state["values"]  # Re-read from the reader when unpickled.
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:  # noqa: D105
+        self.__dict__.update(state)
+        self.values = self.reader.current()  # type: ignore[assignment]
+
+    def begin_evaluation(self) -> None:  # noqa: D102
+        self.values = self.reader.current()  # type: ignore[assignment]
+        super().begin_evaluation()
@@ -2,8 +2,9 @@ from __future__ import annotations
 
 import ast
 import io
+import sys
 import tokenize
-from typing import Iterable
+from typing import Any, Iterable
 
 from leval.excs import InvalidAttribute
 
@@ -15,26 +16,24 @@ def expand_name(node: ast.Attribute) -> tuple[str, ...]:
     e.g. `foo.bar.quux` -> `('foo', 'bar', 'quux')`
     """
     attr_bits = []
-
-    def walk_attr(kid):
-        if isinstance(kid, ast.Attribute):
-            attr_bits.append(kid.attr)
-            walk_attr(kid.value)
-        elif isinstance(kid, ast.Name):
-            attr_bits.append(kid.id)
-        elif isinstance(kid, ast.Constant):
-            raise InvalidAttribute(
-                f"Accessing attributes of constants ({kid}) is not allowed",
-                node=node,
-            )
-        else:
-            raise InvalidAttribute(  # pragma: no cover
-                f"Unsupported attribute structure in {node}",
-                node=node,
-            )
-
-    walk_attr(node)
-    return tuple(str(bit) for bit in attr_bits[::-1])
+    kid: ast.AST = node
+    while isinstance(kid, ast.Attribute):
+        attr_bits.append(kid.attr)
+        kid = kid.value
+    if isinstance(kid, ast.Name):
+        attr_bits.append(kid.id)
+    elif isinstance(kid, ast.Constant):
+        raise InvalidAttribute(
+            f"Accessing attributes of constants ({kid}) is not allowed",
+            node=node,
+        )
+    else:
+        raise InvalidAttribute(  # pragma: no cover
+            f"Unsupported attribute structure in {node}",
+            node=node,
+        )
+    attr_bits.reverse()
+    return tuple(attr_bits)
 
 
 def tokenize_expression(expression: str) -> Iterable[tokenize.TokenInfo]:
@@ -44,3 +43,18 @@ def tokenize_expression(expression: str) -> Iterable[tokenize.TokenInfo]:
     Will likely misbehave if the expression is e.g. multi-line.
     """
     return tokenize.generate_tokens(io.StringIO(expression).readline)
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Estimate the memory footprint of a value in bytes.
+
+    The contents of tuples, lists, sets and dicts are included,
+    even if they are shared with other values.
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, (tuple, list, set, frozenset)):
+        size += sum(estimate_size(item) for item in value)
+    elif isinstance(value, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for (k, v) in value.items())
+    return size
@@ -0,0 +1,78 @@
+import pytest
+
+from leval.extras.batch import (
+    BatchResult,
+    VerificationReport,
+    evaluate_batch,
+    get_expression_hash,
+    iter_evaluate_batch,
+    verify_many,
+)
+from leval.extras.common_boolean_evaluator import CommonBooleanEvaluator
+
+rows = [{"a": i, "b-c": i % 3} for i in range(50)] + [{"a": 1}]
+expression = "b-c == 0 and a > 10"
+
+
+def expected_result(row):
+    if "b-c" not in row:
+        return BatchResult(None, "NoSuchValue", "No value b‿‿c")
+    return BatchResult(row["a"] > 10 and row["b-c"] == 0)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_evaluate_batch(workers):
+    results = evaluate_batch(expression, rows, workers=workers, chunk_size=7)
+    assert results == [expected_result(row) for row in rows]
+
+
+def test_iter_evaluate_batch_is_lazy():
+    results = iter_evaluate_batch(expression, iter(rows), workers=1)
+    assert next(results) == BatchResult(False)
+
+
+def test_iter_evaluate_batch_compiles_eagerly():
+    with pytest.raises(SyntaxError):
+        iter_evaluate_batch("a >", rows)  # Without consuming the results.
+
+
+def test_evaluate_batch_verifies_first():
+    with pytest.raises(SyntaxError):
+        evaluate_batch("a >", rows, workers=2)
+
+
+def double(x):
+    return x * 2
+
+
+def test_evaluate_batch_custom_evaluator():
+    evaluator = CommonBooleanEvaluator()
+    evaluator.functions = {"double": double}
+    results = evaluate_batch(
+        "double(a) == 4",
+        rows[:3],
+        evaluator=evaluator,
+        workers=2,
+    )
+    assert [r.value for r in results] == [False, False, True]
+
+
+def test_verify_many():
+    expressions = ["a > 1", "b <", "os.system()", "1 +" + "+1" * 30, "a > 1"]
+    reports = verify_many(expressions, workers=2, chunk_size=1)
+    assert [r.ok for r in reports] == [True, False, False, False, True]
+    assert reports[0] == VerificationReport("a > 1", True)
+    assert reports[1].error_class == "SyntaxError"
+    assert reports[1].lineno == 1
+    assert reports[2].error_class == "InvalidOperation"
+    assert reports[2].node == "Call"
+    assert (reports[2].lineno, reports[2].col_offset) == (1, 0)
+    assert reports[3].error_class == "TooComplex"
+
+
+def test_verify_many_cache():
+    cache = {}
+    verify_many(["a > 1"], cache=cache, workers=1)
+    assert cache[get_expression_hash("a > 1")].ok
+    cache[get_expression_hash("b <")] = VerificationReport("b <", True)
+    assert verify_many(["b <", "a > 1"], cache=cache, workers=1)[0].ok  # from cache
@@ -0,0 +1,82 @@
+import pytest
+
+from leval.evaluator import Evaluator
+from leval.excs import MemoryBudgetExceeded, TooComplex
+from leval.extras.common_boolean_evaluator import CommonBooleanEvaluator
+from leval.universe.budget import MemoryBudgetMixin
+from leval.universe.weakly_typed import WeaklyTypedSimpleUniverse
+
+
+class BudgetedUniverse(MemoryBudgetMixin, WeaklyTypedSimpleUniverse):
+    pass
+
+
+def make_evaluator(**kwargs):
+    universe = BudgetedUniverse(
+        functions={
+            "repeat": lambda s, n: s * n,
+            "repeat_list": lambda s, n: [s * 10 for _ in range(n)],
+            "max": max,
+        },
+        values={"s": "x" * 1000, "big": "y" * 100_000},
+        **kwargs,
+    )
+    return Evaluator(universe, max_depth=50)
+
+
+def test_string_concatenation_chain_is_bounded():
+    evl = make_evaluator(max_memory=10_000)
+    assert len(evl.evaluate_expression("s + s + s")) == 3000
+    chain = " + ".join(["s"] * 20)
+    with pytest.raises(MemoryBudgetExceeded):
+        evl.evaluate_expression(chain)
+    # The budget is per evaluation.
+    assert len(evl.evaluate_expression("s + s + s")) == 3000
+
+
+def test_single_concatenation_is_refused_before_allocation():
+    with pytest.raises(MemoryBudgetExceeded):
+        make_evaluator(max_memory=50_000).evaluate_expression("big + 'z'")
+
+
+def test_comparisons_of_large_values_are_fine():
+    assert make_evaluator(max_memory=50_000).evaluate_expression("big == big")
+
+
+def test_max_value_size():
+    evl = make_evaluator(max_value_size=5_000)
+    with pytest.raises(MemoryBudgetExceeded):
+        evl.evaluate_expression("repeat(s, 10)")
+    with pytest.raises(TooComplex):  # MemoryBudgetExceeded is a TooComplex
+        evl.evaluate_expression("repeat(s, 6) == ''")
+    assert evl.evaluate_expression("repeat(s, 2) == s + s")
+
+
+def test_references_to_existing_values_are_free():
+    evl = make_evaluator(max_memory=5_000)
+    assert evl.evaluate_expression("s in (s, s, s, s, s, s)")
+    assert evl.evaluate_expression("max(s, s) == max(s, s)")
+    # Containers of new values still count the new values.
+    with pytest.raises(MemoryBudgetExceeded):
+        evl.evaluate_expression("(s + s, s + s, s + s)")
+
+
+def test_function_results_count_their_items():
+    evl = make_evaluator(max_memory=50_000)
+    assert evl.evaluate_expression("repeat_list(s, 2) != ()")
+    with pytest.raises(MemoryBudgetExceeded):
+        evl.evaluate_expression("repeat_list(s, 10) != ()")
+
+
+def test_common_boolean_evaluator_budget():
+    values = {"s": "x" * 3_000_000}
+    evaluator = CommonBooleanEvaluator()
+    # The budget is off by default.
+    assert evaluator.evaluate("s + s + s + s + s != ''", values)
+    evaluator = CommonBooleanEvaluator()
+    evaluator.max_memory = 16 * 1024 * 1024
+    with pytest.raises(MemoryBudgetExceeded):
+        evaluator.evaluate("s + s + s + s + s == ''", values)
+    assert evaluator.evaluate("s + s != ''", values)
+    assert evaluator.evaluate("s in (s, s, s, s, s, s)", values)
+    assert evaluator.evaluate("max(s, s) == max(s, s)", values)
@@ -0,0 +1,98 @@
+import ast
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from leval.canonical import ProgramInterner, canonical_key, canonicalize
+from leval.evaluator import Evaluator
+from leval.excs import InvalidOperation, TooComplex
+from leval.extras.common_boolean_evaluator import CommonBooleanEvaluator
+from leval.universe.verifier import VerifierUniverse
+
+
+def canon(expression, **kwargs):
+    tree = ast.parse(expression, mode="eval")
+    return canonical_key(canonicalize(tree, **kwargs))
+
+
+@pytest.mark.parametrize(
+    ("a", "b"),
+    [
+        ("a > 1 and (b > 2 and c > 3)", "(a > 1 and b > 2) and c > 3"),
+        ("x is None or y is not None", "y is not None or x is None"),
+        ("a > 1 and (x is None and y is None)", "a > 1 and y is None and x is None"),
+        (
+            "a > 1 or x.y is None or True or b > 1",
+            "a > 1 or True or x.y is None or b > 1",
+        ),
+    ],
+)
+def test_equivalent_forms(a, b):
+    assert canon(a) == canon(b)
+
+
+@pytest.mark.parametrize(
+    ("a", "b"),
+    [
+        ("a > 1 and b > 2", "b > 2 and a > 1"),  # may raise NoSuchValue
+        ("x is None and a > 1 and y is None", "y is None and a > 1 and x is None"),
+        ("a or b", "a and b"),
+        ("(1).x is None or x is None", "x is None or (1).x is None"),
+    ],
+)
+def test_unsafe_forms_are_not_reordered(a, b):
+    assert canon(a) != canon(b)
+
+
+def test_strict_is_is_not_reordered():
+    assert canon("x is None or y is None", loose_is_operator=False) != canon(
+        "y is None or x is None",
+        loose_is_operator=False,
+    )
+
+
+def test_interner():
+    interner = ProgramInterner(Evaluator(VerifierUniverse()), verify=True)
+    tree = interner.intern("x is None or y > 1")
+    assert interner.intern("x is None or y > 1") is tree
+    assert interner.intern("( x  is None ) or (y>1)") is tree
+    assert interner.intern("x is None or y > 2") is not tree
+    stats = interner.stats()
+    assert stats.programs.size == 2
+    assert stats.sources.size == 3
+    with pytest.raises(TooComplex):
+        interner.intern("1" + " + 1" * 20)
+
+
+class SlowVerifierUniverse(VerifierUniverse):
+    def get_value(self, name):
+        time.sleep(0.001)
+        return super().get_value(name)
+
+
+def test_interner_is_thread_safe():
+    interner = ProgramInterner(
+        Evaluator(SlowVerifierUniverse(), max_depth=5),
+        verify=True,
+    )
+    barrier = threading.Barrier(4)
+
+    def intern(i):
+        barrier.wait()
+        # Each of these is just within the depth limit.
+        return interner.intern(f"a{i} + (b + (c + {i}))")
+
+    with ThreadPoolExecutor(4) as executor:
+        assert len(list(executor.map(intern, range(4)))) == 4
+
+
+def test_common_boolean_evaluator_interner():
+    evl = CommonBooleanEvaluator()
+    evl.interner = evl.make_interner()
+    tree = evl.compile("foo-bar > 1 and (class is None or baz-quux is None)")
+    assert evl.compile("foo-bar>1 and (baz-quux is None or class is None)") is tree
+    assert evl.evaluate_compiled(tree, {"foo-bar": 2, "class": 1})
+    with pytest.raises(InvalidOperation):  # still verified
+        evl.compile("os.system()")
@@ -0,0 +1,129 @@
+import json
+
+import pytest
+
+from leval.cli import (
+    MODES,
+    Engine,
+    _evaluate_rows,
+    flatten_values,
+    main,
+    percentile,
+)
+from leval.evaluator import Evaluator
+from leval.excs import TooComplex
+from leval.extras.common_boolean_evaluator import CommonBooleanEvaluator
+
+
+@pytest.fixture
+def expressions_file(tmp_path):
+    path = tmp_path / "expressions.txt"
+    path.write_text("a > 1\n# A comment\n\nfoo(\nb.c == 'x'\n", encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture
+def values_file(tmp_path):
+    path = tmp_path / "values.jsonl"
+    rows = [{"a": 2, "b": {"c": "x"}}, {"a": 0, "b": {"c": "y"}}]
+    path.write_text("".join(json.dumps(row) + "\n" for row in rows), encoding="utf-8")
+    return str(path)
+
+
+def read_output(capsys):
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+def test_flatten_values():
+    row = {"a": 1, "b": {"c": 2, "d": {"e": 3}}}
+    assert flatten_values(row) == {"a": 1, ("b", "c"): 2, ("b", "d", "e"): 3}
+
+
+def test_percentile():
+    values = [float(i) for i in range(1, 101)]
+    assert percentile(values, 0.5) == 50
+    assert percentile(values, 0.99) == 99
+    assert percentile(values, 1) == 100
+    assert percentile([], 0.5) == 0
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_verify(capsys, expressions_file, workers):
+    assert main(["verify", expressions_file, "--workers", str(workers)]) == 1
+    reports = read_output(capsys)
+    assert [report["ok"] for report in reports] == [True, False, True]
+    assert reports[1]["error_class"] == "SyntaxError"
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_evaluate(capsys, expressions_file, values_file, workers):
+    args = ["evaluate", "-f", expressions_file, values_file]
+    assert main([*args, "--workers", str(workers), "--chunk-size", "1"]) == 0
+    results = read_output(capsys)
+    assert [(r["row"], r.get("value")) for r in results] == [
+        (0, True),
+        (0, None),
+        (0, True),
+        (1, False),
+        (1, None),
+        (1, False),
+    ]
+    assert results[1]["error_class"] == "SyntaxError"
+
+
+def test_evaluate_simple_mode(capsys, values_file):
+    assert main(["evaluate", "--mode", "simple", "-e", "a + 1", values_file]) == 0
+    assert [result["value"] for result in read_output(capsys)] == [3, 1]
+
+
+def test_evaluate_text_format(capsys, values_file):
+    assert main(["evaluate", "-e", "a > 1", "--format", "text", values_file]) == 0
+    assert capsys.readouterr().out.splitlines()[0].split("\t")[:3] == [
+        "0",
+        "a > 1",
+        "True",
+    ]
+
+
+def test_bench(capsys, values_file):
+    args = ["bench", "-e", "a > 1", "-e", "nope(", values_file, "--iterations", "5"]
+    assert main(args) == 0
+    valid, invalid = read_output(capsys)
+    assert valid["evaluations"] == 10
+    assert valid["errors"] == 0
+    assert 0 < valid["p50_us"] <= valid["p99_us"] <= valid["max_us"]
+    assert invalid["errors"] == 10
+
+
+def test_bench_without_values(capsys, monkeypatch):
+    monkeypatch.setattr("sys.stdin", None)  # Must not be read.
+    assert main(["bench", "-e", "a is None", "--iterations", "3"]) == 0
+    (stats,) = read_output(capsys)
+    assert stats["evaluations"] == 3
+    assert stats["errors"] == 0
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_max_depth(mode):
+    engine = Engine(mode, max_depth=0)
+    assert engine.max_depth == 0
+    with pytest.raises(TooComplex):
+        engine.verify("a > 1")
+
+
+def test_default_max_depth():
+    assert Engine("simple").max_depth == Evaluator.default_max_depth
+    assert Engine("common").common.max_depth == CommonBooleanEvaluator.max_depth
+
+
+def test_no_expressions(values_file):
+    with pytest.raises(SystemExit):
+        main(["evaluate", values_file])
+
+
+def test_compile_errors_are_not_reraised():
+    error = SyntaxError("bad")
+    rows = [(i, {}) for i in range(100)]
+    results = _evaluate_rows(Engine(), [("x >", error)], rows)
+    assert {result["error_class"] for result in results} == {"SyntaxError"}
+    assert error.__traceback__ is None
@@ -1,7 +1,13 @@
+import pickle
+
 import pytest
 
 from leval.excs import InvalidOperation, NoSuchValue, TooComplex
-from leval.extras.common_boolean_evaluator import CommonBooleanEvaluator
+from leval.extras.common_boolean_evaluator import (
+    CommonBooleanEvaluator,
+    PreparedNameCache,
+    _prepare_values,
+)
 
 
 @pytest.mark.parametrize(
@@ -47,3 +53,87 @@ def test_expressions(expression, values, expected):
             CommonBooleanEvaluator().evaluate(expression, values)
     else:
         assert CommonBooleanEvaluator().evaluate(expression, values) == expected
+
+
+def test_evaluator_reuse():
+    cbe = CommonBooleanEvaluator()
+    assert cbe.evaluate("a > 1", {"a": 2})
+    evaluator = cbe._local.evaluator
+    assert not cbe.evaluate("a > 1", {"a": 0})
+    with pytest.raises(NoSuchValue):
+        cbe.evaluate("a > 1", {})
+    assert cbe._local.evaluator is evaluator
+    assert evaluator.universe.values == {}
+    assert pickle.loads(pickle.dumps(cbe)).evaluate("a > 1", {"a": 2})
+
+
+def test_prepare_values_copies_only_if_needed():
+    values = {"a": 1, ("b", "c"): 2}
+    assert _prepare_values(values) is values
+    assert _prepare_values(values, PreparedNameCache()) is values
+    values = {"a": 1, "b-c": 2, ("if", "d"): 3, "e": 4}
+    assert list(_prepare_values(values).items()) == [
+        ("a", 1),
+        ("b\u203f\u203fc", 2),
+        (("K\u203fif", "d"), 3),
+        ("e", 4),
+    ]
+
+
+def test_evaluator_reuse_is_reentrant():
+    cbe = CommonBooleanEvaluator()
+    cbe.functions = {"inner": lambda x: cbe.evaluate("a < 5", {"a": x})}
+    assert cbe.evaluate("inner(a) and a == 3", {"a": 3})
+    assert not cbe.evaluate("inner(a) or a == 3", {"a": 7})
+
+
+def test_prepared_name_cache():
+    cbe = CommonBooleanEvaluator()
+    cbe.name_cache = cache = PreparedNameCache(maxsize=2)
+    values = {("foo", "baz-quux"): 9, "continue": True}
+    for _ in range(3):
+        assert cbe.evaluate("foo.baz-quux > 8 and continue", values)
+    stats = cache.stats()
+    assert stats.cache.hits == 4
+    assert stats.cache.misses == 2
+    assert stats.cache.hit_rate == pytest.approx(2 / 3)
+    assert stats.memory > 0
+    assert cache.prepare_key(("a-b", "if")) == ("a‿‿b", "K‿if")
+    assert cache.stats().cache.evictions == 1
+    with pytest.raises(TypeError):
+        cache.prepare_key(1)
+
+
+def test_prepared_name_cache_per_instance():
+    class NoCacheEvaluator(CommonBooleanEvaluator):
+        name_cache = None
+
+    first, second = CommonBooleanEvaluator(), CommonBooleanEvaluator()
+    assert first.evaluate("a-b > 1", {"a-b": 2})
+    assert first.name_cache is not second.name_cache
+    assert first.name_cache.stats().cache.size == 1
+    assert second.name_cache.stats().cache.size == 0
+    assert NoCacheEvaluator().name_cache is None
+    assert NoCacheEvaluator().evaluate("a-b > 1", {"a-b": 2})
+
+
+def test_constant_folding():
+    cbe = CommonBooleanEvaluator()
+    cbe.fold_constants = True
+    tree = cbe.compile("run-time > 60 * 60 and '1' + 1 == 2")
+    # The second operand is weakly typed (like evaluation), so it's just True.
+    (comparison,) = tree.body.values
+    assert comparison.comparators[0].value == 3600
+    assert cbe.evaluate_compiled(tree, {"run-time": 4000})
+
+
+def test_bound():
+    cbe = CommonBooleanEvaluator()
+    trees = [cbe.compile("foo-bar > 1"), cbe.compile("foo-bar < 3")]
+    with cbe.bound({"foo-bar": 2}) as evaluator:
+        assert [evaluator.evaluate_tree(tree) for tree in trees] == [True, True]
+    assert evaluator.universe.values == {}
+    # The evaluator is reused once released.
+    with cbe.bound({"foo-bar": 0}) as second:
+        assert second is evaluator
+        assert not second.evaluate_tree(trees[0])
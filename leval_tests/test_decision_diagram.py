@@ -0,0 +1,101 @@
+import itertools
+
+import pytest
+
+from leval.decision_diagram import compile_decision_diagram
+from leval.evaluator import Evaluator
+from leval.excs import TooComplex
+from leval.memo import pure
+from leval.universe.simple import SimpleUniverse
+
+EXPRESSIONS = [
+    "a > 1 and b < 2",
+    "a > 1 or b < 2 or (a > 1 and c)",
+    "(a > 1 and b < 2) or (not a > 1 and b < 2) or c",
+    "not (a > 1 or not c) and (b < 2 or a > 1)",
+    "a == 3 and (b == 1 or c) and not (a == 3 and not c)",
+    "a + b > 2 or a + b > 3",
+    "c or True and not False",
+]
+
+
+def make_evaluator(values, **kwargs):
+    universe = SimpleUniverse(functions={}, values=values)
+    return Evaluator(universe, max_depth=20, **kwargs)
+
+
+@pytest.mark.parametrize("expression", EXPRESSIONS)
+@pytest.mark.parametrize("loose_not_operator", [False, True])
+def test_decision_diagram_matches_evaluation(expression, loose_not_operator):
+    values = {}
+    evl = make_evaluator(values, loose_not_operator=loose_not_operator)
+    diagram = compile_decision_diagram(evl, expression)
+    for a, b, c in itertools.product([0, 3], [1, 2], [False, True]):
+        values.update(a=a, b=b, c=c)
+        expected = bool(evl.evaluate_expression(expression))
+        assert diagram.evaluate(evl) is expected, (a, b, c)
+
+
+def test_atoms_are_evaluated_at_most_once():
+    calls = []
+
+    def f(x):
+        calls.append(x)
+        return x
+
+    universe = SimpleUniverse(functions={"f": pure(f)}, values={"x": 5})
+    evl = Evaluator(universe)
+    diagram = compile_decision_diagram(
+        evl,
+        "(f(x) > 3 and x < 10) or (f(x) > 3 and x > 2)",
+    )
+    assert len(diagram.atoms) == 3
+    assert diagram.evaluate(evl) is True
+    assert calls == [5]
+
+
+def test_impure_atoms_are_not_merged():
+    calls = []
+
+    def f(x):
+        calls.append(x)
+        return x
+
+    evl = Evaluator(SimpleUniverse(functions={"f": f}, values={}))
+    diagram = compile_decision_diagram(evl, "f(1) == 0 or f(1) == 1")
+    assert len(diagram.atoms) == 2
+    assert diagram.evaluate(evl) is True
+    assert calls == [1, 1]
+
+
+@pytest.mark.parametrize(
+    ("expression", "expected"),
+    [
+        ("a > 1 or not a > 1", True),
+        ("a > 1 and not a > 1", False),
+        ("(a > 1 and b) or (not a > 1 and b) or not b", True),
+    ],
+)
+def test_tautologies_are_removed(expression, expected):
+    evl = make_evaluator({}, loose_not_operator=False)
+    diagram = compile_decision_diagram(evl, expression)
+    assert diagram.is_constant
+    assert diagram.size == 0
+    assert diagram.evaluate(evl) is expected
+
+
+def test_redundant_branches_are_removed():
+    evl = make_evaluator({}, loose_not_operator=False)
+    diagram = compile_decision_diagram(evl, "(a and b) or (a and not b) or c")
+    assert diagram.size == 2  # a, then c
+
+
+def test_max_nodes():
+    # With the atoms ordered x0, y0, x1, y1, ... this would stay small,
+    # but ordered x0..x5 and then y0..y5, the diagram grows exponentially.
+    xs = " and ".join(f"x{i}" for i in range(6))
+    expression = f"({xs}) or " + " or ".join(f"(x{i} and y{i})" for i in range(6))
+    evl = make_evaluator({})
+    assert compile_decision_diagram(evl, expression, max_nodes=1000).size > 20
+    with pytest.raises(TooComplex):
+        compile_decision_diagram(evl, expression, max_nodes=20)
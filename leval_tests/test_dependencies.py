@@ -0,0 +1,29 @@
+import pytest
+
+from leval.dependencies import get_dependencies
+from leval.excs import InvalidOperation
+from leval.extras.common_boolean_evaluator import CommonBooleanEvaluator
+
+
+def test_get_dependencies():
+    deps = get_dependencies("abs(foo.bar - baz) > 3 or quux is None or not min(1, 2)")
+    assert deps.names == {("foo", "bar"), "baz", "quux"}
+    assert deps.functions == {"abs", "min"}
+
+
+def test_get_dependencies_walks_short_circuited_branches():
+    deps = get_dependencies("True or a.b.c")
+    assert deps.names == {("a", "b", "c")}
+
+
+def test_get_dependencies_verifies():
+    with pytest.raises(InvalidOperation):
+        get_dependencies("foo[0]")
+
+
+def test_common_dependencies_are_user_facing():
+    deps = CommonBooleanEvaluator().get_dependencies(
+        "foo.baz-quux > 8 and (class-act or continue) and max(v1, v2-x) > 1",
+    )
+    assert deps.names == {("foo", "baz-quux"), "continue", "class-act", "v1", "v2-x"}
+    assert deps.functions == {"max"}
@@ -0,0 +1,72 @@
+import random
+
+import pytest
+
+from benchmarks.fuzz import (
+    Measurement,
+    find_superlinear,
+    generate_seed,
+    load_corpus,
+    measure,
+)
+from leval.evaluator import Evaluator
+from leval.excs import EvaluatorError, TooComplex
+from leval.extras.common_boolean_evaluator import CommonBooleanEvaluator
+from leval.iterative_evaluator import IterativeEvaluator
+from leval.universe.simple import SimpleUniverse
+
+VALUES = {"x": True, "a": 1, "b": 1, ("a", "b"): 1}
+LENGTHS = (2000, 8000)
+
+
+def make_universe():
+    return SimpleUniverse(functions={"f": lambda *args: 1}, values=VALUES)
+
+
+EVALUATOR_FACTORIES = {
+    "default": lambda: Evaluator(make_universe()),
+    "iterative": lambda: IterativeEvaluator(make_universe(), max_depth=100_000),
+    "common": lambda: CommonBooleanEvaluator()._make_evaluator(VALUES),
+}
+
+
+@pytest.mark.parametrize("evaluator_name", ["iterative", "common"])
+def test_corpus_does_not_exhaust_resources(evaluator_name):
+    # Timings are too noisy to check here; see `benchmarks/fuzz_hostile.py`.
+    evaluator = EVALUATOR_FACTORIES[evaluator_name]()
+    rng = random.Random(42)
+    corpus = load_corpus()
+    seeds = corpus + [generate_seed(rng, corpus) for _ in range(5)]
+    measurements = measure(evaluator, seeds, LENGTHS, repeats=1)
+    errors = {m.error for m in measurements}
+    assert not errors & {"RecursionError", "MemoryError"}
+
+
+def test_find_superlinear():
+    assert find_superlinear([]) == []
+    linear = [Measurement("s", "parse", n, n / 1e5, None) for n in (1000, 4000)]
+    quadratic = [
+        Measurement("q", "parse", n, (n / 1e3) ** 2, None) for n in (1000, 4000)
+    ]
+    assert find_superlinear(linear) == []
+    assert len(find_superlinear(linear + quadratic)) == 1
+
+
+@pytest.mark.parametrize("expression", ["-" * 20000 + "1", "not " * 20000 + "x"])
+@pytest.mark.parametrize("evaluator_name", EVALUATOR_FACTORIES)
+def test_deeply_nested_input_is_too_complex(expression, evaluator_name):
+    evaluator = EVALUATOR_FACTORIES[evaluator_name]()
+    with pytest.raises(TooComplex):
+        evaluator.evaluate_expression(expression)
+
+
+@pytest.mark.parametrize("expression", ["a" + ".b" * 20000, "1" + " + 1" * 20000])
+@pytest.mark.parametrize("evaluator_name", EVALUATOR_FACTORIES)
+def test_long_chains_do_not_overflow(expression, evaluator_name):
+    # Depending on the Python version, these may parse fine or be too complex,
+    # but the parser running out of stack must not leak through.
+    evaluator = EVALUATOR_FACTORIES[evaluator_name]()
+    try:
+        evaluator.evaluate_expression(expression)
+    except EvaluatorError:
+        pass
@@ -0,0 +1,122 @@
+import time
+
+import pytest
+
+from leval.evaluator import Evaluator
+from leval.excs import NoSuchValue, Timeout, TooComplex
+from leval.iterative_evaluator import IterativeEvaluator
+from leval.universe.simple import SimpleUniverse
+from leval_tests.test_leval import error_cases, functions, success_cases, values
+
+
+def make_evaluator(evaluator_class, **kwargs):
+    universe = SimpleUniverse(functions=functions, values=values)
+    return evaluator_class(universe, **kwargs)
+
+
+@pytest.mark.parametrize(
+    ("description", "case", "expected"),
+    success_cases,
+    ids=[c[0] for c in success_cases],
+)
+def test_success(description, case, expected):
+    evaluator = make_evaluator(IterativeEvaluator)
+    assert evaluator.evaluate_expression(case) == expected
+    tree = evaluator.compile_expression(case)
+    assert evaluator.evaluate_tree(tree) == expected
+
+
+@pytest.mark.parametrize(
+    ("description", "case", "expected"),
+    error_cases,
+    ids=[c[0] for c in error_cases],
+)
+def test_error(description, case, expected):
+    with pytest.raises(expected):
+        make_evaluator(IterativeEvaluator, max_depth=5).evaluate_expression(case)
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "not " * 1000 + "foo",
+        " + ".join(["foo"] * 2000),
+        " and ".join(["(foo > 1 or bar)"] * 1000),
+        "-" * 1000 + "foo",
+        "not " * 1000 + "(1, -2) in {(1, -2)}",
+    ],
+    ids=["not", "add", "and", "negation", "containers"],
+)
+def test_deep_expressions(expression):
+    expected = eval(expression, {}, {"foo": 7, "bar": 8})
+    evaluator = make_evaluator(IterativeEvaluator, max_depth=5000)
+    assert evaluator.evaluate_tree(evaluator.compile_expression(expression)) == expected
+
+
+def test_depth_limit_matches_evaluator():
+    for depth in range(2, 8):
+        expression = "-" * depth + "foo"
+        results = []
+        for evaluator_class in (Evaluator, IterativeEvaluator):
+            try:
+                make_evaluator(evaluator_class, max_depth=5).evaluate_expression(
+                    expression,
+                )
+                results.append(None)
+            except TooComplex as exc:
+                results.append(str(exc))
+        assert results[0] == results[1]
+
+
+def test_short_circuit_and_lazy_getters():
+    calls = []
+
+    def record(x):
+        calls.append(x)
+        return x
+
+    universe = SimpleUniverse(functions={"record": record}, values={})
+    evaluator = IterativeEvaluator(universe)
+    assert evaluator.evaluate_expression("record(0) or record(2) or record(3)") is True
+    assert evaluator.evaluate_expression("record(0) and nope") is False
+    assert calls == [0, 2, 0]
+    with pytest.raises(NoSuchValue):
+        evaluator.evaluate_expression("record(5) and nope")
+
+
+def test_custom_bool_op_universe():
+    class AllEvaluatingUniverse(SimpleUniverse):
+        def evaluate_bool_op(self, op, value_getters):
+            values = [getter() for getter in value_getters]
+            return all(values) if op.__class__.__name__ == "And" else any(values)
+
+    universe = AllEvaluatingUniverse(functions={}, values={"a": 0})
+    evaluator = IterativeEvaluator(universe)
+    assert evaluator.evaluate_expression("a or not a") is True
+    with pytest.raises(NoSuchValue):
+        evaluator.evaluate_expression("a and nope > 1")
+
+
+def test_time_limit():
+    def slow():
+        time.sleep(0.2)
+        return 1
+
+    universe = SimpleUniverse(functions={"slow": slow}, values={})
+    evaluator = IterativeEvaluator(universe, max_time=0.3)
+    with pytest.raises(Timeout):
+        evaluator.evaluate_expression("slow() + slow() + slow()")
+
+
+def test_overridden_visitors_are_used():
+    class ConstantsAreNegated(IterativeEvaluator):
+        def visit_Constant(self, node):
+            return -super().visit_Constant(node)
+
+    class CallsAreOne(IterativeEvaluator):
+        def visit_Call(self, node):
+            return 1
+
+    universe = SimpleUniverse(functions={}, values={})
+    assert ConstantsAreNegated(universe).evaluate_expression("1 + 2") == -3
+    assert CallsAreOne(universe).evaluate_expression("nope(1) + 1") == 2
@@ -0,0 +1,136 @@
+import gc
+
+import pytest
+
+from leval import memo as memo_module
+from leval.evaluator import Evaluator
+from leval.extras.common_boolean_evaluator import CommonBooleanEvaluator
+from leval.memo import FunctionMemo, LRUCache, is_pure, pure
+from leval.universe.simple import SimpleUniverse
+
+
+class CallCounter:
+    def __init__(self, func):  # noqa: D107
+        self.func = func
+        self.calls = 0
+
+    def __call__(self, *args):
+        self.calls += 1
+        return self.func(*args)
+
+
+def test_lru_cache():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)  # evicts "b", which is least recently used
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert cache.stats() == (2, 1, 1, 2, 2)
+
+
+def test_pure_marker():
+    pure_abs = pure(abs)
+    assert is_pure(pure_abs)
+    assert not is_pure(abs)
+    assert pure_abs(-3) == 3
+
+
+@pytest.mark.parametrize(
+    ("scope", "expected_calls"),
+    [("evaluation", 2), ("universe", 1), ("process", 1)],
+)
+def test_memo_scopes(scope, expected_calls):
+    counter = CallCounter(lambda x: x * 2)
+    memo = FunctionMemo(pure_functions={"double"}, scope=scope)
+    universe = SimpleUniverse(functions={"double": counter}, values={}, memo=memo)
+    evl = Evaluator(universe)
+    for _ in range(2):
+        assert evl.evaluate_expression("double(4) + double(4)") == 16
+    assert counter.calls == expected_calls
+    assert memo.stats()["double"].hits == 4 - expected_calls
+
+
+@pytest.mark.parametrize("scope", ["evaluation", "universe", "process"])
+def test_shared_memo_keeps_functions_of_the_same_name_apart(scope):
+    memo = FunctionMemo(pure_functions={"f"}, scope=scope)
+    evaluators = [
+        Evaluator(SimpleUniverse(functions={"f": func}, values={}, memo=memo))
+        for func in (lambda x: x * 2, lambda x: x * 3)
+    ]
+    for _ in range(2):
+        assert [evl.evaluate_expression("f(2)") for evl in evaluators] == [4, 6]
+    stats = memo.stats()["f"]
+    expected = (0, 4) if scope == "evaluation" else (2, 2)
+    assert (stats.hits, stats.misses) == expected
+
+
+def test_process_caches_are_per_maxsize_and_released():
+    def double(x):
+        return x * 2
+
+    small = FunctionMemo(pure_functions={"double"}, scope="process", maxsize=1)
+    large = FunctionMemo(pure_functions={"double"}, scope="process", maxsize=8)
+    for memo in (small, large):
+        memo.call("double", double, [1])
+        memo.call("double", double, [2])
+    assert small.stats()["double"].size == 1
+    assert large.stats()["double"].size == 2
+    count = len(memo_module._process_caches)
+    del small, large, memo, double
+    gc.collect()
+    assert len(memo_module._process_caches) == count - 1
+
+
+def test_memo_keys_are_typed():
+    memo = FunctionMemo(pure_functions={"kind"})
+    universe = SimpleUniverse(
+        functions={"kind": lambda x: type(x).__name__},
+        values={},
+        memo=memo,
+    )
+    evl = Evaluator(universe)
+    assert evl.evaluate_expression("(kind(1), kind(1.0), kind(True))") == (
+        "int",
+        "float",
+        "bool",
+    )
+
+
+def test_impure_and_unhashable_calls_are_not_memoized():
+    counter = CallCounter(len)
+    memo = FunctionMemo(pure_functions={"size"})
+    universe = SimpleUniverse(
+        functions={"size": counter, "impure": counter},
+        values={},
+        memo=memo,
+    )
+    evl = Evaluator(universe)
+    assert evl.evaluate_expression("impure('ab') + impure('ab')") == 4
+    assert evl.evaluate_expression("size({1, 2}) + size({1, 2})") == 4
+    assert counter.calls == 4
+    assert universe.is_pure_function("size")
+    assert not universe.is_pure_function("impure")
+
+
+def test_memo_with_pure_marked_function():
+    counter = CallCounter(abs)
+    universe = SimpleUniverse(
+        functions={"abs": pure(counter)},
+        values={},
+        memo=FunctionMemo(),
+    )
+    assert Evaluator(universe).evaluate_expression("abs(-5) + abs(-5)") == 10
+    assert counter.calls == 1
+
+
+def test_common_boolean_evaluator_memo():
+    counter = CallCounter(max)
+
+    evl = CommonBooleanEvaluator()
+    evl.functions = {"max": counter}
+    evl.memo = FunctionMemo(pure_functions={"max"})
+    assert evl.evaluate("max(a, 3) > 2", {"a": 1})
+    assert evl.evaluate("max(a, 3) < 4", {"a": 1})
+    assert counter.calls == 1
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import pytest
+
+from leval.evaluator import Evaluator
+from leval.excs import NoSuchValue
+from leval.universe.base import MISSING
+from leval.universe.nested import NestedUniverse, ValueTrie
+from leval.universe.simple import SimpleUniverse
+
+
+class CountingUniverse(SimpleUniverse):
+    def __init__(self, **kwargs):  # noqa: D107
+        super().__init__(**kwargs)
+        self.lookups = 0
+
+    def get_value(self, name):
+        self.lookups += 1
+        return super().get_value(name)
+
+
+def test_get_value_or_missing():
+    universe = SimpleUniverse(functions={}, values={"a": None, ("b", "c"): 1})
+    assert universe.get_value_or_missing("a") is None
+    assert universe.get_value_or_missing(("b", "c")) == 1
+    assert universe.get_value_or_missing("x") is MISSING
+
+
+@pytest.mark.parametrize(
+    "values",
+    [{"a": {"b": 1}}, ValueTrie.from_mapping({"a": {"b": 1}})],
+    ids=["mapping", "trie"],
+)
+def test_nested_get_value_or_missing(values):
+    universe = NestedUniverse(functions={}, values=values)
+    assert universe.get_value_or_missing(("a", "b")) == 1
+    assert universe.get_value_or_missing(("a", "x")) is MISSING
+    assert universe.get_value_or_missing(("a", "b", "c")) is MISSING
+    assert universe.get_value_or_missing("x") is MISSING
+
+
+@pytest.mark.parametrize(
+    ("expression", "expected"),
+    [
+        ("x is None", True),
+        ("x.y is not None", False),
+        ("not x", True),
+        ("not a", False),
+        ("not x.y and a", True),
+    ],
+)
+def test_loose_operators_with_missing_values(expression, expected):
+    universe = SimpleUniverse(functions={}, values={"a": 1})
+    evaluator = Evaluator(universe, loose_is_operator=True, loose_not_operator=True)
+    assert evaluator.evaluate_expression(expression) == expected
+
+
+def test_missing_values_still_raise():
+    universe = SimpleUniverse(functions={}, values={})
+    evaluator = Evaluator(universe, loose_is_operator=True, loose_not_operator=True)
+    with pytest.raises(NoSuchValue):
+        evaluator.evaluate_expression("x == None")
+    with pytest.raises(NoSuchValue):
+        evaluator.evaluate_expression("-x")
+
+
+def test_custom_get_value_is_respected():
+    universe = CountingUniverse(functions={}, values={"a": 1})
+    evaluator = Evaluator(universe, loose_is_operator=True, loose_not_operator=True)
+    assert evaluator.evaluate_expression("x is None and not y and a is not None")
+    assert universe.lookups == 3
@@ -0,0 +1,78 @@
+from types import SimpleNamespace
+
+import pytest
+
+from leval.evaluator import Evaluator
+from leval.excs import NoSuchValue
+from leval.universe.nested import NestedUniverse, ValueTrie
+
+nested_values = {
+    "loss": 0.5,
+    "metrics": {
+        "train": {"loss": 0.25, "accuracy": 0.9},
+        "val": {"loss": 0.75},
+    },
+    ("metrics", "test", "loss"): 1.5,
+    ("prefix", "deeper"): {"value": 2},
+    "shadowed": {"value": 1},
+    ("shadowed", "value"): 2,
+    ("fallback", "value"): 3,
+    "fallback": {"other": 4},
+    "obj": SimpleNamespace(secret=1),
+}
+
+
+@pytest.fixture(params=["mapping", "trie"])
+def evaluator(request):
+    values = nested_values
+    if request.param == "trie":
+        values = ValueTrie.from_mapping(values)
+    return Evaluator(NestedUniverse(functions={"abs": abs}, values=values))
+
+
+@pytest.mark.parametrize(
+    ("expression", "expected"),
+    [
+        ("loss", 0.5),
+        ("metrics.train.loss + metrics.val.loss", 1.0),
+        ("abs(metrics.train.accuracy - 1) < 0.2", True),
+        ("metrics.nope is None", True),
+        ("metrics.test.loss", 1.5),
+        ("metrics.test.loss is None", False),
+        ("metrics.test is None", True),
+        ("metrics is None", False),
+        ("prefix.deeper.value is None", True),  # Values of tuple keys aren't walked.
+        ("prefix.deeper", {"value": 2}),
+        ("shadowed.value", 1),  # Nested mappings take precedence over tuple keys.
+        ("fallback.value + fallback.other", 7),
+    ],
+)
+def test_nested_lookup(evaluator, expression, expected):
+    assert evaluator.evaluate_expression(expression) == expected
+
+
+@pytest.mark.parametrize(
+    "expression",
+    ["metrics.train.loss.real", "metrics.nope", "metrics.test", "nope", "obj.secret"],
+)
+def test_nested_lookup_failures(evaluator, expression):
+    with pytest.raises(NoSuchValue):
+        evaluator.evaluate_expression(expression)
+
+
+@pytest.mark.parametrize("mode", ["mapping", "trie"])
+def test_nested_mappings_take_precedence_regardless_of_order(mode):
+    for values in ({"a": {"b": 1}, ("a", "b"): 2}, {("a", "b"): 2, "a": {"b": 1}}):
+        if mode == "trie":
+            values = ValueTrie.from_mapping(values)
+        universe = NestedUniverse(functions={}, values=values)
+        assert Evaluator(universe).evaluate_expression("a.b") == 1
+
+
+def test_trie_accepts_tuple_keys():
+    trie = ValueTrie.from_mapping(nested_values)
+    assert trie.lookup(("metrics", "test", "loss")) == 1.5
+    trie.insert(("a", "b"), 2)
+    assert trie.lookup(("a", "b")) == 2
+    with pytest.raises(KeyError):
+        trie.lookup("a")
@@ -0,0 +1,240 @@
+import ast
+
+import pytest
+
+from leval.evaluator import Evaluator
+from leval.excs import InvalidConstant, InvalidOperation, TooComplex
+from leval.iterative_evaluator import IterativeEvaluator
+from leval.memo import pure
+from leval.nodes import FrozenValue, SharedSubexpression
+from leval.universe.simple import SimpleUniverse
+from leval.universe.verifier import VerifierUniverse
+from leval.universe.weakly_typed import WeaklyTypedSimpleUniverse
+
+values = {"x": "b", "n": 3}
+
+
+def make_evaluator(**kwargs):
+    return Evaluator(SimpleUniverse(functions={}, values=values), **kwargs)
+
+
+@pytest.mark.parametrize(
+    ("expression", "expected"),
+    [
+        ("x in {'a', 'b', 'c'}", True),
+        ("x not in {'a', 'c'}", True),
+        ("n in (1, 2, (3, 4))", False),
+        ("(3, 4) in {(1, 2), (3, 4)}", True),
+        ("n in (1, 2, n)", True),  # not hoisted, but still works
+        ("() == ()", True),
+    ],
+)
+def test_compiled_containers(expression, expected):
+    evl = make_evaluator()
+    tree = evl.compile_expression(expression)
+    assert evl.evaluate_tree(tree) == expected
+    assert evl.evaluate_tree(tree) == evl.evaluate_expression(expression)
+
+
+def test_constant_containers_are_hoisted():
+    evl = make_evaluator()
+    tree = evl.compile_expression("x in {'a', 'b', ('c', 'd')}")
+    frozen = tree.body.comparators[0]
+    assert isinstance(frozen, FrozenValue)
+    assert frozen.value == frozenset({"a", "b", ("c", "d")})
+    assert frozen.container_types == {set, tuple}
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "{1, 2}",
+        "{ {1} }",
+        "n in {(1, {2})}",
+        "{1} in d",
+        "n in ({3},)",
+        "{1} == {1}",
+        "(1, {2})",
+    ],
+)
+def test_only_membership_sets_are_frozen(expression):
+    evl = Evaluator(SimpleUniverse(functions={}, values={**values, "d": {}}))
+    tree = evl.compile_expression(expression)
+    try:
+        expected = evl.evaluate_expression(expression)
+    except TypeError:
+        with pytest.raises(TypeError):
+            evl.evaluate_tree(tree)
+    else:
+        result = evl.evaluate_tree(tree)
+        assert result == expected
+        assert type(result) is type(expected)
+        if isinstance(result, tuple):
+            assert [type(item) for item in result] == [type(item) for item in expected]
+
+
+def test_hoisted_containers_are_still_checked():
+    tree = make_evaluator().compile_expression("x in {'a', ('b',)}")
+    with pytest.raises(InvalidOperation, match="Tuple construction"):
+        make_evaluator(allowed_container_types={set}).evaluate_tree(tree)
+
+
+def test_invalid_constants_are_not_hoisted():
+    evl = make_evaluator(allowed_constant_types={int})
+    tree = evl.compile_expression("n in {1, 'a'}")
+    assert not isinstance(tree.body.comparators[0], FrozenValue)
+    with pytest.raises(InvalidConstant):
+        evl.evaluate_tree(tree)
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "n * 60 * 60 * 24",
+        "-(-5) + n",
+        "True and n > 1",
+        "n > 1 or (False or 1 > 2)",
+        "x in ('a', 'b', 'c' + 'd')",
+        "n / 0",
+        "1 / 0 + n",
+        "'ab' * 3 == x",
+    ],
+)
+@pytest.mark.parametrize("universe", ["simple", "verifier"])
+def test_constant_folding(expression, universe):
+    evl = make_evaluator()
+    if universe == "verifier":
+        compiler = Evaluator(VerifierUniverse(), fold_constants=True)
+    else:
+        compiler = make_evaluator(fold_constants=True)
+    tree = compiler.compile_expression(expression)
+    try:
+        expected = evl.evaluate_expression(expression)
+    except Exception as exc:  # noqa: BLE001
+        # Errors are left for evaluation time.
+        with pytest.raises(type(exc)):
+            evl.evaluate_tree(tree)
+    else:
+        assert evl.evaluate_tree(tree) == expected
+
+
+def test_constant_folding_results():
+    evl = Evaluator(VerifierUniverse(), fold_constants=True)
+    tree = evl.compile_expression("n * (60 * 60 * 24)")
+    assert tree.body.right.value == 86400
+    tree = evl.compile_expression("-(-5) < n")
+    assert tree.body.left.value == 5
+    tree = evl.compile_expression("True and n > 1")
+    assert [type(v) for v in tree.body.values] == [ast.Compare]
+    tree = evl.compile_expression("not (1 > 2 or 3 > 4)")
+    assert tree.body.value is True
+
+
+def test_constant_folding_uses_universe_ops():
+    class WeakVerifierUniverse(VerifierUniverse):
+        ops = WeaklyTypedSimpleUniverse.ops
+
+    tree = make_evaluator(fold_constants=True).compile_expression("'2' + 3 == n")
+    assert isinstance(tree.body.left, ast.BinOp)
+    evl = Evaluator(WeakVerifierUniverse(), fold_constants=True)
+    tree = evl.compile_expression("'2' + 3 == n")
+    assert tree.body.left.value == 5.0
+
+
+def test_constant_folding_size_cap():
+    evl = Evaluator(
+        WeaklyTypedSimpleUniverse(functions={}, values=values),
+        fold_constants=True,
+        max_folded_size=100,
+    )
+    tree = evl.compile_expression("x == 'a' + 'b'")
+    assert tree.body.comparators[0].value == "ab"
+    tree = evl.compile_expression(f"x == '{'a' * 200}' + 'b'")
+    assert isinstance(tree.body.comparators[0], ast.BinOp)
+
+
+def make_counting_evaluator(evaluator_class=Evaluator, **kwargs):
+    calls = []
+
+    @pure
+    def loss_gap(a, b):
+        calls.append((a, b))
+        return abs(a - b)
+
+    def impure_gap(a, b):
+        calls.append((a, b))
+        return abs(a - b)
+
+    universe = SimpleUniverse(
+        functions={"loss_gap": loss_gap, "impure_gap": impure_gap},
+        values={("m", "loss"): 0.5, ("m", "val_loss"): 0.75, ("m", "acc"): None},
+    )
+    return evaluator_class(universe, share_subexpressions=True, **kwargs), calls
+
+
+@pytest.mark.parametrize("evaluator_class", [Evaluator, IterativeEvaluator])
+def test_common_subexpressions_are_shared(evaluator_class):
+    evl, calls = make_counting_evaluator(evaluator_class)
+    expression = (
+        "loss_gap(m.loss, m.val_loss) > 0.1 and "
+        "loss_gap(m.loss, m.val_loss) < 0.5 and "
+        "(loss_gap(m.loss, m.val_loss) * 2 != "
+        "loss_gap(m.loss, m.val_loss) * 2) == False"
+    )
+    tree = evl.compile_expression(expression)
+    shared = [n for n in ast.walk(tree) if isinstance(n, SharedSubexpression)]
+    assert len({n.key for n in shared}) == 2  # The call, and the multiplication.
+    assert evl.evaluate_tree(tree) is True
+    assert calls == [(0.5, 0.75)]
+    # Results are not carried over between evaluations.
+    evl.universe.values[("m", "loss")] = 2.0
+    assert evl.evaluate_tree(tree) is False
+    assert calls == [(0.5, 0.75), (2.0, 0.75)]
+
+
+def test_impure_subexpressions_are_not_shared():
+    evl, calls = make_counting_evaluator()
+    tree = evl.compile_expression("impure_gap(1, 2) == impure_gap(1, 2)")
+    assert not any(isinstance(n, SharedSubexpression) for n in ast.walk(tree))
+    assert evl.evaluate_tree(tree) is True
+    assert len(calls) == 2
+
+
+@pytest.mark.parametrize("evaluator_class", [Evaluator, IterativeEvaluator])
+def test_shared_subexpressions_keep_semantics(evaluator_class):
+    evl, _ = make_counting_evaluator(evaluator_class)
+    for expression in [
+        "(m.acc is None and m.acc is None) or m.loss > 1",
+        "not (m.missing + 1) or (m.missing + 1) > 2",
+        "m.missing is None and not m.missing",
+        "(m.loss + 1, m.loss + 1) == (1.5, 1.5)",
+    ]:
+        tree = evl.compile_expression(expression)
+        plain = Evaluator(evl.universe)
+        try:
+            expected = plain.evaluate_expression(expression)
+        except Exception as exc:  # noqa: BLE001
+            with pytest.raises(type(exc)):
+                evl.evaluate_tree(tree)
+        else:
+            assert evl.evaluate_tree(tree) == expected
+
+
+@pytest.mark.parametrize("evaluator_class", [Evaluator, IterativeEvaluator])
+def test_shared_subexpressions_do_not_change_depth(evaluator_class):
+    expression = "((m.loss + 1) * 2) > 1 and ((m.loss + 1) * 2) < 5"
+    for max_depth in range(1, 8):
+        results = []
+        for share in (False, True):
+            universe = SimpleUniverse(functions={}, values={("m", "loss"): 0.5})
+            evl = evaluator_class(
+                universe,
+                max_depth=max_depth,
+                share_subexpressions=share,
+            )
+            try:
+                tree = evl.compile_expression(expression)
+                results.append(evl.evaluate_tree(tree))
+            except TooComplex:
+                results.append(TooComplex)
+        assert results[0] == results[1]
@@ -0,0 +1,75 @@
+from leval.extras.reactive import ReactiveEvaluator
+from leval.memo import pure
+from leval.universe.simple import SimpleUniverse
+
+
+class CountingUniverse(SimpleUniverse):
+    def __init__(self, **kwargs):  # noqa: D107
+        super().__init__(**kwargs)
+        self.lookups = []
+
+    def get_value(self, name):
+        self.lookups.append(name)
+        return super().get_value(name)
+
+
+class CountingReactiveEvaluator(ReactiveEvaluator):
+    universe_class = CountingUniverse
+
+
+def test_reactive_evaluator():
+    notifications = []
+    rev = CountingReactiveEvaluator(
+        functions={"abs": pure(abs)},
+        values={"a": 1, "b": 2, ("m", "loss"): 0.5},
+    )
+    on_flip = lambda key, result: notifications.append(key)  # noqa: E731
+    assert rev.add("a-big", "a > 5 and abs(m.loss) < 1", on_flip) is False
+    rev.add("b-big", "abs(b) > 5", lambda *args: notifications.append(args))
+    assert rev.get_result("b-big") is False
+    assert rev.add("missing", "c > 1") is None
+    assert isinstance(rev.get_error("missing"), NameError)
+
+    rev.universe.lookups.clear()
+    assert rev.update({"a": 10, "z": 1}) == ["a-big"]
+    assert notifications == ["a-big"]
+    # Only `a-big` was re-evaluated, and only `a` and `m.loss` had to be looked up.
+    assert sorted(map(str, rev.universe.lookups)) == ["('m', 'loss')", "a"]
+
+    rev.universe.lookups.clear()
+    assert rev.set_value("a", 11) == []  # Still true, so no notification.
+    assert rev.universe.lookups == ["a"]  # `abs(m.loss) < 1` came from the cache.
+
+    assert rev.set_value("b", -6) == ["b-big"]
+    assert notifications[-1] == ("b-big", True)
+    assert rev.set_value("c", 2) == ["missing"]
+    assert rev.get_result("missing") is True
+    assert rev.delete_value("c") == ["missing"]
+    assert rev.get_result("missing") is None
+
+
+def test_reactive_impure_functions_are_not_cached():
+    calls = []
+
+    def impure(x):
+        calls.append(x)
+        return x
+
+    rev = ReactiveEvaluator(functions={"f": impure}, values={"a": 1, "b": 1})
+    rev.add("e", "f(b) > 0 and a > 0")
+    rev.set_value("a", 2)
+    assert calls == [1, 1]
+    rev.remove("e")
+    assert rev.set_value("a", 3) == []
+
+
+def test_reactive_equal_values_of_other_types_are_changes():
+    kind = pure(lambda x: type(x).__name__)
+    rev = ReactiveEvaluator(functions={"kind": kind}, values={"a": 1, "t": (1,)})
+    rev.add("bool", "kind(a) == 'bool'")
+    rev.add("float", "kind(a) == 'float'")
+    assert rev.update({"a": True}) == ["bool"]
+    assert rev.update({"a": 1.0}) == ["bool", "float"]
+    assert rev.update({"a": 1.0}) == []
+    rev.add("tuple-of-bool", "t == (1,) and kind(t) == 'tuple'")
+    assert rev.set_value("t", (True,)) == []  # Re-evaluated, but still true.
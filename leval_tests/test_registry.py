@@ -0,0 +1,72 @@
+import threading
+
+import pytest
+
+from leval.extras.common_boolean_evaluator import CommonBooleanEvaluator
+from leval.extras.registry import RuleRegistry
+
+
+class GatedEvaluator(CommonBooleanEvaluator):
+    def __init__(self):  # noqa: D107
+        self.gate = threading.Event()
+        self.gate.set()
+        self.compiled = []
+
+    def compile(self, expression):
+        self.gate.wait(5)
+        self.compiled.append(expression)
+        return super().compile(expression)
+
+
+def test_load_and_match():
+    registry = RuleRegistry({"big": "x > 10", "small": "x < 3"})
+    assert registry.version == 1
+    assert registry.first_match({"x": 1}) == "small"
+    assert registry.all_matches({"x": 11}) == ["big"]
+    assert registry.top_matches({"x": 11}, 0) == []
+    assert registry.stats()["big"].matches == 1
+
+
+def test_nothing_loaded():
+    registry = RuleRegistry()
+    assert registry.version == 0
+    with pytest.raises(LookupError):
+        registry.first_match({"x": 1})
+
+
+def test_reload_serves_old_version_until_compiled():
+    evaluator = GatedEvaluator()
+    registry = RuleRegistry({"a": "x == 1"}, evaluator=evaluator)
+    evaluator.gate.clear()
+    future = registry.reload({"a": "x == 1", "b": "x == 2"})
+    assert registry.first_match({"x": 2}) is None
+    assert registry.version == 1
+    evaluator.gate.set()
+    assert future.result(5) == 2
+    assert registry.version == 2
+    assert registry.first_match({"x": 2}) == "b"
+    # Unchanged expressions were not compiled again.
+    assert evaluator.compiled == ["x == 1", "x == 2"]
+
+
+def test_failed_reload_keeps_old_version():
+    registry = RuleRegistry({"a": "x == 1"})
+    future = registry.reload({"a": "x == 1", "b": "x =="})
+    with pytest.raises(SyntaxError):
+        future.result(5)
+    with pytest.raises(SyntaxError):
+        registry.load({"b": "x =="})
+    assert registry.version == 1
+    assert registry.first_match({"x": 1}) == "a"
+
+
+def test_latest_reload_wins():
+    evaluator = GatedEvaluator()
+    registry = RuleRegistry(evaluator=evaluator)
+    evaluator.gate.clear()
+    slow = registry.reload({"a": "x == 1"})
+    evaluator.gate.set()
+    assert registry.load({"b": "x == 2"}) == 2
+    assert slow.result(5) == 1
+    assert registry.version == 2
+    assert registry.rule_set.keys == ["b"]
@@ -0,0 +1,153 @@
+import gc
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from leval.evaluator import Evaluator
+from leval.excs import NoSuchValue
+from leval.extras.common_boolean_evaluator import CommonBooleanEvaluator
+from leval.memo import pure
+from leval.result_cache import ResultCache, get_referenced_names
+from leval.universe.simple import SimpleUniverse
+
+
+class CountingUniverse(SimpleUniverse):
+    def __init__(self, **kwargs) -> None:  # noqa: D107
+        super().__init__(**kwargs)
+        self.operations = 0
+
+    def evaluate_binary_op(self, op, left, right):
+        self.operations += 1
+        return super().evaluate_binary_op(op, left, right)
+
+
+def make_evaluator(values, **functions):
+    return Evaluator(CountingUniverse(functions=functions, values=values))
+
+
+def test_referenced_names():
+    evaluator = make_evaluator({}, f=pure(abs), g=abs)
+    tree = evaluator.compile_expression("a.b > 1 and f(c) or a.b == d")
+    assert sorted(get_referenced_names(evaluator, tree), key=str) == [
+        ("a", "b"),
+        "c",
+        "d",
+    ]
+    assert get_referenced_names(evaluator, evaluator.parse("g(c) > 1")) is None
+
+
+def test_reuses_results_for_equal_referenced_values():
+    cache = ResultCache()
+    evaluator = make_evaluator({"a": 1, "b": 2, "unrelated": 0})
+    tree = evaluator.compile_expression("a + b")
+    assert cache.evaluate_tree(evaluator, tree) == 3
+    evaluator.universe.values["unrelated"] = 1
+    assert cache.evaluate_tree(evaluator, tree) == 3
+    assert evaluator.universe.operations == 1  # The evaluation was skipped.
+    evaluator.universe.values["a"] = 2
+    assert cache.evaluate_tree(evaluator, tree) == 4
+    stats = cache.stats()
+    assert (stats.cache.hits, stats.cache.misses, stats.bypasses) == (1, 2, 0)
+
+
+def test_value_types_are_part_of_the_key():
+    cache = ResultCache()
+    evaluator = make_evaluator({"a": 1})
+    tree = evaluator.compile_expression("a / 2")
+    assert cache.evaluate_tree(evaluator, tree) == 0.5
+    evaluator.universe.values["a"] = True
+    assert cache.evaluate_tree(evaluator, tree) == 0.5
+    assert cache.stats().cache.misses == 2
+
+
+def test_equal_values_that_behave_differently():
+    cache = ResultCache()
+    evaluator = make_evaluator({"x": 0.0})
+    tree = evaluator.compile_expression("x")
+    assert str(cache.evaluate_tree(evaluator, tree)) == "0.0"
+    evaluator.universe.values["x"] = -0.0
+    assert str(cache.evaluate_tree(evaluator, tree)) == "-0.0"
+    # Containers of equal but differently typed items bypass the cache.
+    tree = evaluator.compile_expression("x == (1,)")
+    evaluator.universe.values["x"] = (True,)
+    assert cache.evaluate_tree(evaluator, tree)
+    assert cache.stats().bypasses == 1
+
+
+def test_shared_between_threads():
+    cache = ResultCache(maxsize=8)
+    tree = make_evaluator({}).compile_expression("a * 2")
+
+    def evaluate(a):
+        return cache.evaluate_tree(make_evaluator({"a": a % 16}), tree)
+
+    with ThreadPoolExecutor(4) as executor:
+        results = list(executor.map(evaluate, range(400)))
+    assert results == [a % 16 * 2 for a in range(400)]
+    stats = cache.stats().cache
+    assert stats.hits + stats.misses == 400
+
+
+def test_missing_values_are_not_cached():
+    cache = ResultCache()
+    evaluator = make_evaluator({})
+    tree = evaluator.compile_expression("a > 1")
+    for _ in range(2):
+        with pytest.raises(NoSuchValue):
+            cache.evaluate_tree(evaluator, tree)
+    assert cache.stats().cache.size == 0
+
+
+def test_impure_calls_and_unhashable_values_bypass():
+    calls = []
+
+    def impure(x):
+        calls.append(x)
+        return x
+
+    cache = ResultCache()
+    evaluator = make_evaluator({"a": 1, "b": [1]}, impure=impure, pure_abs=pure(abs))
+    for expression in ("impure(a) > 0", "a in b"):
+        tree = evaluator.compile_expression(expression)
+        assert cache.evaluate_tree(evaluator, tree)
+        assert cache.evaluate_tree(evaluator, tree)
+    assert calls == [1, 1]
+    tree = evaluator.compile_expression("pure_abs(a) > 0")
+    assert cache.evaluate_tree(evaluator, tree)
+    assert cache.evaluate_tree(evaluator, tree)
+    stats = cache.stats()
+    assert (stats.cache.hits, stats.bypasses) == (1, 4)
+
+
+def test_bounded():
+    cache = ResultCache(maxsize=2)
+    evaluator = make_evaluator({})
+    tree = evaluator.compile_expression("a * 2")
+    for a in range(5):
+        evaluator.universe.values["a"] = a
+        assert cache.evaluate_tree(evaluator, tree) == a * 2
+    stats = cache.stats().cache
+    assert (stats.size, stats.evictions) == (2, 3)
+
+
+def test_trees_are_not_confused():
+    cache = ResultCache()
+    evaluator = make_evaluator({"a": 1})
+    for n in range(3):
+        # The previous tree may be freed, and its `id()` reused.
+        tree = evaluator.parse(f"a + {n}")
+        assert cache.evaluate_tree(evaluator, tree) == n + 1
+        del tree
+        gc.collect()
+
+
+def test_common_boolean_evaluator():
+    evaluator = CommonBooleanEvaluator()
+    evaluator.result_cache = ResultCache()
+    tree = evaluator.compile("foo-bar > 1 and meta.x == 'y'")
+    rows = [{"foo-bar": 2, ("meta", "x"): "y", "other": i} for i in range(10)]
+    rows.append({"foo-bar": 0, ("meta", "x"): "y"})
+    results = [evaluator.evaluate_compiled(tree, row) for row in rows]
+    assert results == [True] * 10 + [False]
+    stats = evaluator.result_cache.stats().cache
+    assert (stats.hits, stats.misses) == (9, 2)
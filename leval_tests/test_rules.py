@@ -0,0 +1,68 @@
+import pytest
+
+from leval.excs import NoSuchValue
+from leval.extras.rules import RuleSet, RuleStats
+
+rules = {
+    "gpu": "resources.gpu-count > 0",
+    "big": "resources.memory >= 64",
+    "default": "True",
+}
+
+
+@pytest.mark.parametrize(
+    ("values", "first", "all_keys"),
+    [
+        (
+            {("resources", "gpu-count"): 2, ("resources", "memory"): 8},
+            "gpu",
+            ["gpu", "default"],
+        ),
+        (
+            {("resources", "gpu-count"): 0, ("resources", "memory"): 128},
+            "big",
+            ["big", "default"],
+        ),
+        (
+            {("resources", "gpu-count"): 1, ("resources", "memory"): 64},
+            "gpu",
+            ["gpu", "big", "default"],
+        ),
+    ],
+)
+def test_rule_set_matching(values, first, all_keys):
+    rule_set = RuleSet(rules)
+    assert rule_set.first_match(values) == first
+    assert rule_set.all_matches(values) == all_keys
+    assert rule_set.top_matches(values, 2) == all_keys[:2]
+    assert rule_set.top_matches(values, 0) == []
+
+
+def test_rule_set_stats_and_early_exit():
+    rule_set = RuleSet(list(rules.items()))
+    assert rule_set.keys == ["gpu", "big", "default"]
+    for gpus in (1, 1, 0):
+        rule_set.first_match(
+            {("resources", "gpu-count"): gpus, ("resources", "memory"): 1},
+        )
+    assert rule_set.stats() == {
+        "gpu": RuleStats(evaluations=3, matches=2, errors=0),
+        "big": RuleStats(evaluations=1, matches=0, errors=0),
+        "default": RuleStats(evaluations=1, matches=1, errors=0),
+    }
+    assert rule_set.get_hot_keys() == ["gpu", "default", "big"]
+    rule_set.reset_stats()
+    assert rule_set.stats()["gpu"] == RuleStats(0, 0, 0)
+
+
+def test_rule_set_errors():
+    rule_set = RuleSet(rules)
+    assert rule_set.first_match({}) == "default"
+    assert rule_set.stats()["gpu"].errors == 1
+    with pytest.raises(NoSuchValue):
+        RuleSet(rules, raise_errors=True).first_match({})
+
+
+def test_rule_set_verifies_rules():
+    with pytest.raises(SyntaxError):
+        RuleSet({"bad": "a <"})
@@ -0,0 +1,116 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from leval.evaluator import Evaluator
+from leval.excs import NoSuchValue
+from leval.universe.snapshot import (
+    _SEQUENCE,
+    SnapshotPublisher,
+    SnapshotReader,
+    SnapshotUniverse,
+    build_snapshot,
+)
+
+values = {
+    "x": 5,
+    ("m", "loss"): 0.25,
+    ("m", "tags"): ("a", "b"),
+    "m": "not the same as ('m',)",
+    "": None,
+}
+
+
+@pytest.fixture
+def publisher():
+    publisher = SnapshotPublisher()
+    yield publisher
+    publisher.close()
+
+
+def test_snapshot_mapping(publisher):
+    publisher.publish(values)
+    snapshot = SnapshotReader(publisher.name).current()
+    assert dict(snapshot) == values
+    assert snapshot.get(("m", "loss")) == 0.25
+    assert snapshot.get(("m",)) is None
+    assert snapshot.get(["not", "hashable"]) is None
+    assert "x" in snapshot
+    assert "y" not in snapshot
+    with pytest.raises(KeyError):
+        snapshot["y"]
+
+
+def test_snapshot_with_many_values(publisher):
+    many = {("run", str(i), "loss"): i / 10 for i in range(1000)}
+    many.update({str(i): [i] * (i % 3) for i in range(1000)})
+    many.update({"big": 2**70, "flag": True, "nothing": None, "text": "ä"})
+    assert len(build_snapshot(many)) < len(many) * 100
+    publisher.publish(many)
+    snapshot = SnapshotReader(publisher.name).current()
+    assert len(snapshot) == len(many)
+    assert all(snapshot[key] == value for (key, value) in many.items())
+    assert snapshot.get(("run", "1000", "loss")) is None
+
+
+def test_snapshot_universe_sees_new_versions(publisher):
+    publisher.publish(values)
+    universe = SnapshotUniverse(functions={}, reader=publisher.name)
+    evl = Evaluator(universe)
+    assert evl.evaluate_expression("x > 3 and m.loss < 0.5")
+    with pytest.raises(NoSuchValue):
+        evl.evaluate_expression("y")
+    assert publisher.publish({**values, "x": 1, "y": 2}) == 2
+    assert not evl.evaluate_expression("x > 3 and m.loss < 0.5")
+    assert evl.evaluate_expression("y") == 2
+    assert universe.values.version == 2
+
+
+def test_previous_snapshot_is_closed(publisher):
+    publisher.publish(values)
+    reader = SnapshotReader(publisher.name)
+    first = reader.current()
+    publisher.publish(values)
+    second = reader.current()
+    assert first.segment.buf is None
+    assert second["x"] == 5
+    # A view that is still alive doesn't prevent switching.
+    view = second.segment.buf[:1]
+    publisher.publish(values)
+    assert reader.current().version == 3
+    view.release()
+    reader.close()
+
+
+def test_reading_while_updated_gives_up(publisher):
+    publisher.publish(values)
+    buf = publisher._control.buf
+    (sequence,) = _SEQUENCE.unpack_from(buf, 0)
+    _SEQUENCE.pack_into(buf, 0, sequence + 1)  # As if an update never finished.
+    reader = SnapshotReader(publisher.name)
+    reader.max_attempts = 10
+    with pytest.raises(TimeoutError):
+        reader.current()
+    _SEQUENCE.pack_into(buf, 0, sequence + 2)
+    assert reader.current()["x"] == 5
+    reader.close()
+
+
+def test_nothing_published(publisher):
+    with pytest.raises(LookupError):
+        SnapshotReader(publisher.name).current()
+
+
+def _evaluate_in_worker(universe, expression):
+    return Evaluator(universe).evaluate_expression(expression)
+
+
+def test_snapshot_universe_in_workers(publisher):
+    publisher.publish(values)
+    universe = SnapshotUniverse(functions={}, reader=publisher.name)
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        result = executor.submit(_evaluate_in_worker, universe, "m.tags")
+        assert result.result() == ("a", "b")
+    # The worker exiting must not have removed the snapshot.
+    publisher.publish({"x": 6})
+    assert SnapshotReader(publisher.name).current()["x"] == 6
@@ -0,0 +1,82 @@
+import ast
+
+import pytest
+
+from leval.evaluator import Evaluator
+from leval.excs import NoSuchValue
+from leval.memo import pure
+from leval.universe.simple import SimpleUniverse
+from leval.universe.weakly_typed import WeaklyTypedSimpleUniverse
+
+known_values = {"project": "leval", "env": "prod", "limit": 10, ("cfg", "n"): 2}
+record_values = {"loss": 0.5, "tag": "x"}
+functions = {"double": pure(lambda x: x * 2), "impure": lambda x: x}
+
+
+def make_evaluator(universe_class=SimpleUniverse, values=None):
+    universe = universe_class(functions=functions, values=values or {})
+    return Evaluator(universe, max_depth=12)
+
+
+@pytest.mark.parametrize(
+    ("expression", "residual"),
+    [
+        ("project == 'leval' and loss < limit", "BoolOp"),
+        ("project == 'nope' and loss < limit", False),
+        ("env == 'prod' or loss < limit", True),
+        ("loss < limit * cfg.n and env == 'prod'", "BoolOp"),
+        ("loss < double(limit)", "Compare"),
+        ("loss < impure(limit)", "Compare"),
+        ("limit + cfg.n", 12),
+        ("project in {'leval', 'other'}", True),
+        ("project is not None or tag is None", True),
+        ("tag is None or project is not None", "BoolOp"),
+        ("not missing and env == 'prod'", "BoolOp"),
+    ],
+)
+@pytest.mark.parametrize("universe_class", [SimpleUniverse, WeaklyTypedSimpleUniverse])
+def test_specialize(universe_class, expression, residual):
+    evl = make_evaluator(universe_class, {**known_values, **record_values})
+    tree = make_evaluator(universe_class).specialize(expression, known_values)
+    if isinstance(residual, str):
+        assert type(tree.body).__name__ == residual
+    else:
+        assert isinstance(tree.body, ast.Constant)
+        assert tree.body.value == residual
+    assert evl.evaluate_tree(tree) == evl.evaluate_expression(expression)
+
+
+def test_specialize_folds_pure_functions_only():
+    tree = make_evaluator().specialize("double(limit) + impure(limit)", known_values)
+    assert isinstance(tree.body.left, ast.Constant)
+    assert tree.body.left.value == 20
+    assert isinstance(tree.body.right, ast.Call)
+
+
+def test_specialize_keeps_errors_for_evaluation_time():
+    tree = make_evaluator().specialize("loss < 1 and limit / 0", known_values)
+    with pytest.raises(ZeroDivisionError):
+        make_evaluator(values=record_values).evaluate_tree(tree)
+
+
+def test_specialize_keeps_operands_that_may_raise():
+    # `loss` may be missing at evaluation time, so it can't be dropped
+    # even though the result is known to be False.
+    tree = make_evaluator().specialize("loss > 1 and env == 'dev'", known_values)
+    assert len(tree.body.values) == 2
+    with pytest.raises(NoSuchValue):
+        make_evaluator().evaluate_tree(tree)
+
+
+@pytest.mark.parametrize("expression", ["{limit}", "(1, {limit})", "{ {limit} }"])
+def test_specialize_does_not_freeze_sets(expression):
+    evl = make_evaluator(values=known_values)
+    tree = make_evaluator().specialize(expression, known_values)
+    try:
+        expected = evl.evaluate_expression(expression)
+    except TypeError:  # unhashable set members
+        with pytest.raises(TypeError):
+            evl.evaluate_tree(tree)
+    else:
+        assert evl.evaluate_tree(tree) == expected
+        assert repr(evl.evaluate_tree(tree)) == repr(expected)
@@ -0,0 +1,114 @@
+import json
+import sqlite3
+
+import pytest
+
+from leval.evaluator import Evaluator
+from leval.excs import NoSuchValue, Untranslatable
+from leval.extras.sql import JsonColumn, SQLPredicate, translate_expression
+from leval.universe.nested import NestedUniverse
+from leval.universe.verifier import VerifierUniverse
+
+rows = [
+    {"id": 1, "status": "complete", "duration": 10.5, "meta": {"lr": 0.1}},
+    {"id": 2, "status": "error", "duration": 3, "meta": {"lr": 0.01, "tag": "x"}},
+    {"id": 3, "status": "complete", "duration": None, "meta": {"tag": "y"}},
+    {"id": 4, "status": "queued", "duration": 0, "meta": {}},
+]
+
+schema = {
+    "status": "status",
+    "duration": "runs.duration",
+    "meta": JsonColumn("meta"),
+    ("params", "lr"): JsonColumn("meta", ("lr",)),
+}
+
+functions = {"abs": "ABS"}
+
+
+@pytest.fixture(scope="module")
+def db():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE runs (id, status TEXT, duration REAL, meta TEXT)")
+    conn.executemany(
+        "INSERT INTO runs VALUES (?, ?, ?, ?)",
+        [(r["id"], r["status"], r["duration"], json.dumps(r["meta"])) for r in rows],
+    )
+    yield conn
+    conn.close()
+
+
+def python_matches(expression):
+    matched = set()
+    for row in rows:
+        values = {**row, "params": {"lr": row["meta"].get("lr")}}
+        universe = NestedUniverse(functions={"abs": abs}, values=values)
+        try:
+            if Evaluator(universe).evaluate_expression(expression):
+                matched.add(row["id"])
+        except (NoSuchValue, TypeError):
+            pass
+    return matched
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "status == 'complete'",
+        "status != 'complete'",
+        "status in ('complete', 'queued') and duration > 5",
+        "status not in {'error', None}",
+        "duration is None or duration * 2 >= 6",
+        "not (duration is not None)",
+        "not (meta.lr > 0.05)",
+        "not (meta.tag == 'x' and meta.lr < 1)",
+        "meta.lr is not None and meta.lr / 2 < 0.01",
+        "meta.tag == 'x' or meta.nope.deeper is not None",
+        "params.lr == 0.1",
+        "abs(-duration) > 1",
+        "duration in (None, 0)",
+        "meta.tag is None or meta.tag not in ('x',)",
+    ],
+)
+def test_translated_predicates_match_python(db, expression):
+    predicate = translate_expression(expression, schema, functions=functions)
+    cursor = db.execute(f"SELECT id FROM runs WHERE {predicate.sql}", predicate.params)
+    assert {row_id for (row_id,) in cursor} == python_matches(expression)
+
+
+def test_translation_is_parameterized():
+    predicate = translate_expression("meta.a.b == 'x' or status in ('y', 'z')", schema)
+    assert predicate == SQLPredicate(
+        sql=(
+            """((json_extract("meta", ?) IS NOT DISTINCT FROM ?) OR """
+            """COALESCE("status" IN (?, ?), FALSE))"""
+        ),
+        params=("$.a.b", "x", "y", "z"),
+    )
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "unknown == 1",
+        "status",
+        "status and duration > 1",
+        "max(duration, 1) > 1",
+        "status in meta.statuses",
+        "duration // 2 > 1",
+        "status is 'complete'",
+        "status in (('complete', 'x'),)",
+    ],
+)
+def test_untranslatable(expression):
+    with pytest.raises(Untranslatable):
+        translate_expression(expression, schema, functions=functions)
+
+
+def test_strict_not_operator(db):
+    evaluator = Evaluator(VerifierUniverse(), loose_not_operator=False)
+    expression = "not (meta.lr > 0.05)"
+    predicate = translate_expression(expression, schema, evaluator=evaluator)
+    assert "COALESCE" not in predicate.sql
+    cursor = db.execute(f"SELECT id FROM runs WHERE {predicate.sql}", predicate.params)
+    assert {row_id for (row_id,) in cursor} == {2}
@@ -0,0 +1,73 @@
+import pytest
+
+from leval.evaluator import Evaluator
+from leval.excs import NoSuchValue
+from leval.tiered import TieredEvaluator
+from leval.universe.simple import SimpleUniverse
+
+
+def make_tiered(**kwargs):
+    evaluator = Evaluator(SimpleUniverse(functions={}, values={"x": 3}))
+    return TieredEvaluator(evaluator, **kwargs)
+
+
+def test_promotion_after_threshold():
+    tiered = make_tiered(threshold=3)
+    for _ in range(3):
+        assert tiered.evaluate_expression("x in {1, 2, 3}")
+        assert not tiered.is_promoted("x in {1, 2, 3}")
+    for _ in range(2):
+        assert tiered.evaluate_expression("x in {1, 2, 3}")
+        assert tiered.is_promoted("x in {1, 2, 3}")
+    stats = tiered.stats()
+    assert (stats.interpreted, stats.compiled, stats.promotions) == (3, 2, 1)
+    assert (stats.tracked, stats.promoted) == (0, 1)
+
+
+def test_zero_threshold_compiles_eagerly():
+    tiered = make_tiered(threshold=0)
+    assert tiered.evaluate_expression("x + 1") == 4
+    assert tiered.is_promoted("x + 1")
+    assert tiered.stats().interpreted == 0
+
+
+def test_demotion():
+    tiered = make_tiered(threshold=1, max_promoted=2)
+    for expression in ["x + 1", "x + 2", "x + 1", "x + 2", "x + 3", "x + 3"]:
+        tiered.evaluate_expression(expression)
+    assert tiered.is_promoted("x + 3")
+    assert not tiered.is_promoted("x + 1")
+    stats = tiered.stats()
+    assert (stats.promotions, stats.demotions, stats.promoted) == (3, 1, 2)
+    # A demoted expression has to reach the threshold again.
+    tiered.evaluate_expression("x + 1")
+    assert not tiered.is_promoted("x + 1")
+    tiered.reset_stats()
+    assert tiered.stats().promotions == 0
+
+
+def test_tracked_counts_are_bounded():
+    tiered = make_tiered(threshold=2, max_tracked=2)
+    for expression in ["x + 1", "x + 2", "x + 3", "x + 1", "x + 1"]:
+        tiered.evaluate_expression(expression)
+    # The count for `x + 1` was forgotten, so it's not promoted yet.
+    assert not tiered.is_promoted("x + 1")
+    assert tiered.stats().tracked == 2
+
+
+def test_errors_are_the_same_in_both_tiers():
+    tiered = make_tiered(threshold=1)
+    for _ in range(2):
+        with pytest.raises(NoSuchValue):
+            tiered.evaluate_expression("y > 1")
+    assert tiered.is_promoted("y > 1")
+
+
+def test_expressions_failing_to_compile_stay_interpreted():
+    tiered = make_tiered(threshold=1)
+    # Too deep to compile, but the deep branch is never evaluated.
+    expression = "True or -(-(-(-(-(-(-(-(-(-(-1))))))))))"
+    assert [tiered.evaluate_expression(expression) for _ in range(4)] == [True] * 4
+    assert not tiered.is_promoted(expression)
+    stats = tiered.stats()
+    assert (stats.interpreted, stats.failed_promotions) == (4, 1)